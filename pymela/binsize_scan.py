@@ -0,0 +1,124 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+Class definition that holds the Jackknife error of the averaged two- and three-point functions as a function of the binsize,
+used to study the autocorrelations of the data and choose the "Binsize" of the analysis
+'''
+
+import pymela.io.hdf5_io as hdf5io
+import pymela.tools.tag_creators as tags
+import pymela.tools.jackknife as jackknife
+
+import numpy as np
+import h5py
+
+# The default binsizes are all those that leave at least this number of bins
+defaultMinBins = 10
+
+# The class holding the binsize scan
+#
+# This class takes the two- and three-point function objects as input, after their Jackknife analysis
+# The three-point function is optional
+class BinsizeScan():
+    def __init__(self, c2pt, c3pt, dataInfo, analysisInfo):
+        self.c2pt = c2pt
+        self.c3pt = c3pt
+
+        self.dataInfo = dataInfo
+        self.analysisInfo = analysisInfo
+
+        # Real-Imaginary part
+        self.RI = ['Re','Im']
+
+        # The binsizes of each momentum, for each correlator, since the two- and three-point functions may have different Ncfg
+        self.binsizes2pt = {}
+        self.binsizes3pt = {}
+        self.mean2pt = {} # The mean and error of the averaged two-point functions, for each binsize
+        self.mean3pt = {} # The mean and error of the averaged three-point functions, for each binsize
+        for ri in self.RI:
+            self.mean3pt[ri] = {}
+
+        self.minBins = self.dataInfo['Min Bins'] if 'Min Bins' in self.dataInfo.keys() else defaultMinBins
+
+        # The averaged data are available only after the Jackknife analysis
+        if len(self.c2pt.avgMean) == 0 or (self.c3pt is not None and len(self.c3pt.avgMean['Re']) == 0):
+            raise ValueError('\nBinsizeScan: Statistical analysis of the correlation functions must be done first')
+
+        # Chunking, compression and storage precision of the HDF5 output
+        self.outputPolicy = hdf5io.getOutputPolicy(self.analysisInfo)
+    # End __init__() -------------
+
+    # The binsizes of the scan, the ones in the input or all of those that leave at least minBins bins
+    def getBinsizes(self, mTag, Ncfg):
+        if 'Binsizes' in self.dataInfo.keys():
+            binsizes = list(self.dataInfo['Binsizes'])
+        else:
+            binsizes = jackknife.binsizeList(Ncfg, self.minBins)
+        if len(binsizes) == 0:
+            raise ValueError('\nBinsizeScan: No binsize leaves %d bins out of %d configurations for momentum %s'%(self.minBins,Ncfg,mTag))
+        return binsizes
+    #-------------------------------
+
+    def compute(self):
+
+        # The two-point functions, averaged over t0, source-sink operators and rows
+        for mom in self.c2pt.moms:
+            mTag = tags.momString(mom)
+            self.binsizes2pt[mTag] = self.getBinsizes(mTag, self.c2pt.dSetAttr[mTag]['Ncfg'])
+
+            self.mean2pt[mTag] = jackknife.binsizeScan(self.c2pt.avgData[mTag].real, self.binsizes2pt[mTag])
+            print('Two-point binsize scan for momentum %s completed'%(mTag))
+
+        if self.c3pt is None:
+            return
+
+        # The three-point functions, averaged over t0, source-sink operators and rows
+        # All the z3 and insertions of each tsep are scanned at once
+        for mom in self.c3pt.moms:
+            mTag = tags.momString(mom)
+            tsepList = self.c3pt.dSetAttr[mTag]['tsep']
+            dispList = self.c3pt.dSetAttr[mTag]['disp']
+            self.binsizes3pt[mTag] = self.getBinsizes(mTag, self.c3pt.dSetAttr[mTag]['Ncfg'])
+
+            for ri in self.RI:
+                self.mean3pt[ri][mTag] = {}
+                for tsep in tsepList:
+                    avgKeyList = [(tsep,z3,gamma) for z3 in dispList for gamma in self.c3pt.gammaList]
+                    avgStack = np.stack([self.c3pt.avgData[ri][mTag][dkeyAvg] for dkeyAvg in avgKeyList])
+
+                    aveStack,errStack = jackknife.binsizeScan(avgStack, self.binsizes3pt[mTag], axis=1)
+                    for i,dkeyAvg in enumerate(avgKeyList):
+                        self.mean3pt[ri][mTag][dkeyAvg] = (aveStack[:,i],errStack[:,i])
+            print('Three-point binsize scan for momentum %s completed'%(mTag))
+    # End compute() -------------
+
+    # Each dataset holds the mean and error for each binsize, the binsizes are stored next to it
+    def writeHDF5(self):
+
+        def writeScan(h5_file, group, binsizes, meanErr):
+            hdf5io.writeAxes(h5_file, group, {'binsize': binsizes})
+            hdf5io.writeDense(h5_file, group + '/mean', np.stack(meanErr, axis=1), ['binsize','mean-err','t'],
+                              dtype='f', policy=self.outputPolicy)
+        #-------------------------------
+
+        h5_file = h5py.File(self.dataInfo['HDF5 Output File'],'w')
+
+        for mom in self.c2pt.moms:
+            mTag = tags.momString(mom)
+            writeScan(h5_file, '2pt/%s'%(tags.momH5(mom)), self.binsizes2pt[mTag], self.mean2pt[mTag])
+
+        if self.c3pt is not None:
+            for mom in self.c3pt.moms:
+                mTag = tags.momString(mom)
+                mh5Tag = tags.momH5(mom)
+                for ri in self.RI:
+                    for dkeyAvg in self.mean3pt[ri][mTag].keys():
+                        tsep,z3,gamma = dkeyAvg
+                        group = '3pt/%s/%s/%s/%s/%s'%(mh5Tag,tags.disp(z3),tags.tsep(tsep),tags.insertion(gamma),ri)
+                        writeScan(h5_file, group, self.binsizes3pt[mTag], self.mean3pt[ri][mTag][dkeyAvg])
+
+        h5_file.close()
+        print('Binsize scan data written in HDF5.')
+    # End writeHDF5() -------------
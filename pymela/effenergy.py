@@ -8,6 +8,7 @@ Class definition that holds data and manipulates Effective Energy, computed from
 
 import pymela.io.json_io as JSONio
 import pymela.io.file_formats as ioForm
+import pymela.io.hdf5_io as hdf5io
 import pymela.tools.tag_creators as tags
 import pymela.tools.jackknife as jackknife
 import pymela.fit.constant_fit as constFit
@@ -53,6 +54,12 @@ class EffectiveEnergy():
         self.moms = self.c2pt.moms
         self.dSetAttr = self.c2pt.dSetAttr
         self.momAvg = self.c2pt.momAvg
+
+        # Chunking, compression and storage precision of the HDF5 output
+        self.outputPolicy = hdf5io.getOutputPolicy(self.c2pt.analysisInfo)
+
+        # Floating-point precision of the analysis, the same as of the two-point function
+        self.floatType = self.c2pt.floatType
     # End __init__() -------------
 
 
@@ -60,7 +67,7 @@ class EffectiveEnergy():
 
         def logRatio(c2ptBins):
             Nt = self.dSetAttr[mTag]['Nt']
-            binsArr = np.zeros((self.Nbins,Nt),dtype=np.float128)
+            binsArr = np.zeros((self.Nbins,Nt),dtype=self.floatType)
             # Need to check element by element to avoid negative log warnings
             for b in range(self.Nbins):
                 for t in range(Nt):
@@ -68,7 +75,8 @@ class EffectiveEnergy():
                         binsArr[b,t] = np.log(c2ptBins[b,t] / c2ptBins[b,(t+1)%Nt])
                     except RuntimeWarning:
                         binsArr[b,t] = None
-            meanArr = jackknife.mean(binsArr, self.Nbins, Nspl=Nt)
+            # Bins with a negative ratio are left out of the mean and error of each time slice
+            meanArr = jackknife.meanArray(binsArr, ignoreNaN=True)
 
             return binsArr,meanArr
         #---------------------
@@ -79,7 +87,7 @@ class EffectiveEnergy():
             Nrows = self.dSetAttr[mTag]['Nrows']
 
             # Effective Energy for averaged data
-            self.avgBins[mTag], self.avgMean[mTag] = logRatio(self.c2pt.avgBins[mTag])
+            self.avgBins[mTag], self.avgMean[mTag] = logRatio(self.c2pt.avgBins[mTag].bins())
 
             self.plainBins[mTag] = {}
             self.plainMean[mTag] = {}
@@ -93,7 +101,7 @@ class EffectiveEnergy():
 
         for mom in self.momAvg:
             mTag = tags.momString(mom)
-            self.bins[mTag], self.mean[mTag] = logRatio(self.c2pt.bins[mTag])
+            self.bins[mTag], self.mean[mTag] = logRatio(self.c2pt.bins[mTag].bins())
 
         print('Effective Energy computed.')
     # End compute() -------------
@@ -116,8 +124,8 @@ class EffectiveEnergy():
                 tini,tfin = fitSeq['Ranges'][mTag]
 
                 Nf = 0
-                self.fitBins[fType][mTag] = np.zeros(self.Nbins,dtype=np.float128)
-                self.chiBins[fType][mTag] = np.zeros(self.Nbins,dtype=np.float128)
+                self.fitBins[fType][mTag] = np.zeros(self.Nbins,dtype=self.floatType)
+                self.chiBins[fType][mTag] = np.zeros(self.Nbins,dtype=self.floatType)
                 for b in range(self.Nbins):
                     data = self.bins[mTag][b,tini:tfin+1]
                     err  = self.mean[mTag][1][tini:tfin+1]
@@ -156,8 +164,8 @@ class EffectiveEnergy():
             dset_name_bins = avg_group + '/bins'
             dset_name_mean = avg_group + '/mean'
 
-            h5_file.create_dataset(dset_name_bins, data = self.avgBins[mTag])
-            h5_file.create_dataset(dset_name_mean, data = self.avgMean[mTag],dtype='f')
+            hdf5io.createDataset(h5_file, dset_name_bins, self.avgBins[mTag], self.outputPolicy, bins=True)
+            hdf5io.createDataset(h5_file, dset_name_mean, self.avgMean[mTag], self.outputPolicy, dtype='f')
 
             for t0 in t0List:
                 t0Tag = tags.t0(t0)
@@ -174,8 +182,8 @@ class EffectiveEnergy():
                         dset_name_plainBins = plain_group + '/bins'
                         dset_name_plainMean = plain_group + '/mean'
 
-                        h5_file.create_dataset(dset_name_plainBins, data = self.plainBins[mTag][dkey])
-                        h5_file.create_dataset(dset_name_plainMean, data = self.plainMean[mTag][dkey],dtype='f')                                
+                        hdf5io.createDataset(h5_file, dset_name_plainBins, self.plainBins[mTag][dkey], self.outputPolicy, bins=True)
+                        hdf5io.createDataset(h5_file, dset_name_plainMean, self.plainMean[mTag][dkey], self.outputPolicy, dtype='f')                                
         #--------------------------------
 
         # Write the momentum-averaged data
@@ -187,8 +195,8 @@ class EffectiveEnergy():
             dset_name_bins = momAvg_group + '/bins'
             dset_name_mean = momAvg_group + '/mean'
 
-            h5_file.create_dataset(dset_name_bins, data = self.bins[mTag])
-            h5_file.create_dataset(dset_name_mean, data = self.mean[mTag],dtype='f')
+            hdf5io.createDataset(h5_file, dset_name_bins, self.bins[mTag], self.outputPolicy, bins=True)
+            hdf5io.createDataset(h5_file, dset_name_mean, self.mean[mTag], self.outputPolicy, dtype='f')
         #--------------------------------
 
         # Write the Fit data
@@ -203,9 +211,9 @@ class EffectiveEnergy():
                 dset_name_fitMean = fit_group + '/mean'
                 dset_name_chiMean = fit_group + '/chiSquare'
 
-                h5_file.create_dataset(dset_name_fitBins, data = self.fitBins[fType][mTag])
-                h5_file.create_dataset(dset_name_fitMean, data = self.fitMean[fType][mTag],dtype='f')
-                h5_file.create_dataset(dset_name_chiMean, data = self.chiMean[fType][mTag],dtype='f')
+                hdf5io.createDataset(h5_file, dset_name_fitBins, self.fitBins[fType][mTag], self.outputPolicy, bins=True)
+                hdf5io.createDataset(h5_file, dset_name_fitMean, self.fitMean[fType][mTag], self.outputPolicy, dtype='f')
+                hdf5io.createDataset(h5_file, dset_name_chiMean, self.chiMean[fType][mTag], self.outputPolicy, dtype='f')
         #--------------------------------
 
 
@@ -8,6 +8,8 @@ Module that contains functions related to Constant fits
 
 import numpy as np
 
+import pymela.tools.covariance as covar
+
 def fit(data,err):
     Sy = sum( map(lambda x:x,data/(err**2)) )    # Sy = SUM_i data[i]/err[i]**2
     S  = sum( map(lambda x:1.0/(x*x),err) )      # S  = SUM_i ( 1/err[i] )^2
@@ -17,3 +19,16 @@ def fit(data,err):
 def chiSquare(data,err,fVal):
     Ndof = np.shape(data)[0] - 2 # Degrees of freedom = Ndata - Nfit_param - 1
     return sum( map(lambda t:t*t, (data-fVal)/err) ) / Ndof
+
+
+# Correlated constant fit of all the bins at once, dataBins has the bins on the first dimension and the fit points on the second
+# cholFactor is the Cholesky factor of the covariance matrix of the fit points, see covariance.py
+def fitCorrelated(dataBins,cholFactor):
+    w = covar.whiten(cholFactor, np.ones(np.shape(dataBins)[-1])) # The whitened model, L^-1 * 1
+    y = covar.whiten(cholFactor, dataBins)                        # The whitened data,  L^-1 * data
+    return np.dot(y,w) / np.dot(w,w)
+
+
+def chiSquareCorrelated(dataBins,cholFactor,fVal):
+    Ndof = np.shape(dataBins)[-1] - 2 # Degrees of freedom = Ndata - Nfit_param - 1
+    return covar.chiSquare(cholFactor, dataBins - np.asarray(fVal)[...,np.newaxis]) / Ndof
@@ -8,6 +8,8 @@ Module that contains functions related to Linear fits
 
 import numpy as np
 
+import pymela.tools.covariance as covar
+
 # The model of a linear function, y = b + M*x
 def model(x,M,b):
     return b + M*x
@@ -24,3 +26,20 @@ def chiSquare(x, y, err, M, b):
     return chi/Ndof
 #    return sum( map(lambda t:t*t, (y[i]-model(x,M,b))/err) ) / Ndof
 #------------------------
+
+# Correlated linear fit of all the bins at once, yBins has the bins on the first dimension and the fit points on the second
+# cholFactor is the Cholesky factor of the covariance matrix of the fit points, see covariance.py
+# Returns the M and b arrays of the bins
+def fitCorrelated(x, yBins, cholFactor):
+    A = covar.whiten(cholFactor, np.stack([np.asarray(x,dtype=np.float64), np.ones(np.shape(x)[0])])).T # The whitened design matrix
+    y = covar.whiten(cholFactor, yBins)
+    prm = np.linalg.lstsq(A, y.T, rcond=None)[0]
+    return prm[0], prm[1]
+#------------------------
+
+# Correlated chi-square for Linear fit, of all the bins at once
+def chiSquareCorrelated(x, yBins, cholFactor, M, b):
+    Ndof = np.shape(x)[0] - 3 # Degrees of freedom = Ndata - Nfit_param - 1
+    res = yBins - model(np.asarray(x)[np.newaxis,:], np.asarray(M)[...,np.newaxis], np.asarray(b)[...,np.newaxis])
+    return covar.chiSquare(cholFactor, res) / Ndof
+#------------------------
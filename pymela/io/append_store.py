@@ -0,0 +1,104 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+This file contains functions that maintain an HDF5 store of the plain correlation function data, which grows
+as new configurations are appended to the ASCII files.
+For each ASCII file, the store holds the groups:
+  data   : The (Ncfg,Nt) data read so far, resizable along the configurations
+  binsums: The sums of the data within each complete Jackknife bin, resizable along the bins
+and the attributes:
+  File   : The ASCII file the data are read from
+  Ncfg   : The number of configurations read so far
+  Offset : The position in the ASCII file up to which the data have been read, in the decompressed data for compressed files
+The bin sums are valid only for the binsize the store was created with, which is stored as an attribute of the file
+'''
+
+import os
+import h5py
+
+import pymela.io.ascii_io as ASCIIio
+import pymela.tools.jackknife as jackknife
+
+binsizeAttr = 'Binsize'
+
+
+def openStore(fileName, binsize):
+    store = h5py.File(fileName,'a')
+    if binsizeAttr in store.attrs.keys():
+        if store.attrs[binsizeAttr] != binsize:
+            storeBinsize = store.attrs[binsizeAttr]
+            store.close()
+            raise ValueError('Append store %s was created with binsize = %d, got binsize = %d. Remove the store to re-create it'%(fileName,storeBinsize,binsize))
+    else:
+        store.attrs[binsizeAttr] = binsize
+    return store
+#-------------------------------
+
+# Parse Ncfg configurations from an ASCII file, starting at position offset
+# Returns the data and the position of the end of the data that were read
+def readConfigurationsASCII(fileName, offset, Ncfg, Nt, precision='double'):
+    with ASCIIio.openASCII(fileName,'rb') as fp:
+        fp.seek(offset)
+        raw = fp.read()
+    data = ASCIIio.parseCorrelatorASCII(raw.decode(), Ncfg, Nt, precision, fileName)
+    return data, offset + len(raw)
+#-------------------------------
+
+# Bring the store of an ASCII file up to Ncfg configurations
+# Only the configurations added to the file since the last update are read, and only the bins that they complete are summed
+# Returns the full data, the bin sums and the number of configurations that were read
+def appendCorrelator(store, group, fileName, Ncfg, Nt, binsize, precision='double'):
+    absFileName = os.path.abspath(fileName)
+
+    if group not in store:
+        data,offset = readConfigurationsASCII(fileName,0,Ncfg,Nt,precision)
+
+        grp = store.create_group(group)
+        grp.create_dataset('data', data = data, maxshape = (None,Nt), chunks = True)
+        grp.create_dataset('binsums', data = jackknife.binSums(data,binsize), maxshape = (None,Nt), chunks = True)
+        grp.attrs['File'] = absFileName
+        grp.attrs['Ncfg'] = Ncfg
+        grp.attrs['Offset'] = offset
+
+        return data, grp['binsums'][()], Ncfg
+
+    grp = store[group]
+    NcfgOld = int(grp.attrs['Ncfg'])
+    offset  = int(grp.attrs['Offset'])
+
+    if grp.attrs['File'] != absFileName or grp['data'].shape[1] != Nt:
+        raise ValueError('Append store group %s: Was created from file %s with Nt = %d, got file %s with Nt = %d'%(group,grp.attrs['File'],
+                                                                                                                   grp['data'].shape[1],absFileName,Nt))
+    isCompressed = os.path.splitext(fileName)[1] in ASCIIio.compressedOpeners.keys()
+    if Ncfg < NcfgOld or (not isCompressed and ASCIIio.statFile(fileName)[0] < offset):
+        raise ValueError('File %s: Holds fewer data than the %d configurations in the append store. Remove the store to re-create it'%(fileName,NcfgOld))
+
+    Nnew = Ncfg - NcfgOld
+    if Nnew > 0:
+        newData,offset = readConfigurationsASCII(fileName,offset,Nnew,Nt,precision)
+        grp['data'].resize(Ncfg, axis=0)
+        grp['data'][NcfgOld:] = newData
+
+        # The configurations left over from the last complete bin are combined with the new ones into new bins
+        NbinsOld = grp['binsums'].shape[0]
+        newSums = jackknife.binSums(grp['data'][NbinsOld*binsize:Ncfg], binsize)
+        grp['binsums'].resize(NbinsOld + len(newSums), axis=0)
+        grp['binsums'][NbinsOld:] = newSums
+
+        grp.attrs['Ncfg'] = Ncfg
+        grp.attrs['Offset'] = offset
+
+    return grp['data'][()], grp['binsums'][()], Nnew
+#-------------------------------
+
+# Report the number of new configurations read for a momentum, from the number of new configurations of each file
+# Files may lag behind each other, then the range of new configurations is reported
+def reportNewConfigurations(label, mTag, NnewList, Ncfg):
+    NnewMin, NnewMax = min(NnewList, default=0), max(NnewList, default=0)
+    if NnewMin == NnewMax:
+        print('%s data for momentum %s: Read %d new configurations, %d in total'%(label,mTag,NnewMax,Ncfg))
+    else:
+        print('%s data for momentum %s: Read %d to %d new configurations per file, %d in total'%(label,mTag,NnewMin,NnewMax,Ncfg))
+#-------------------------------
@@ -0,0 +1,102 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+This file contains functions that cache parsed ASCII correlation functions in a packed binary store.
+Each store holds all the data of one momentum in a flat .npy array, and a JSON index with the path, size and
+modification time of every source file, along with the position and the shape of its data in the .npy array.
+The store is memory-mapped when it is re-loaded, and it is invalidated when any of the source files changes.
+'''
+
+import os
+import json
+import numpy as np
+
+import pymela.io.ascii_io as ASCIIio
+
+
+def getStoreFileNames(cacheDir, storeTag):
+    return '%s/%s.npy'%(cacheDir,storeTag), '%s/%s.json'%(cacheDir,storeTag)
+#-------------------------------
+
+# The size and modification time identify the state of each source file
+def getFileStamps(fileList):
+    stamps = []
+    for fileName in fileList:
+        size,mtime = ASCIIio.statFile(fileName)
+        stamps.append([os.path.abspath(fileName), size, mtime])
+    return stamps
+#-------------------------------
+
+# Return the memory-mapped list of arrays in the store, or None if the store does not exist or is out of date
+# Nins is the number of insertions held in each file, or None for files of a single correlator
+def readStore(cacheDir, storeTag, fileList, Ncfg, NtList, precision, Nins=None):
+    npyFile, indexFile = getStoreFileNames(cacheDir,storeTag)
+    if not (os.path.exists(npyFile) and os.path.exists(indexFile)):
+        return None
+
+    with open(indexFile) as fp:
+        index = json.load(fp)
+
+    if index['Precision'] != precision or len(index['Files']) != len(fileList):
+        return None
+
+    stamps = getFileStamps(fileList)
+    for entry,stamp,Nt in zip(index['Files'],stamps,NtList):
+        shape = [Ncfg,Nt] if Nins is None else [Nins,Ncfg,Nt]
+        if entry[:3] != stamp or entry[4:] != shape:
+            return None
+
+    store = np.load(npyFile, mmap_mode='r')
+
+    dataList = []
+    for entry in index['Files']:
+        offset = entry[3]
+        shape = entry[4:]
+        dataList.append(store[offset:offset+int(np.prod(shape))].reshape(shape))
+
+    return dataList
+#-------------------------------
+
+# Write the list of arrays that were parsed from the files of fileList in the store
+def writeStore(cacheDir, storeTag, fileList, dataList, precision):
+    npyFile, indexFile = getStoreFileNames(cacheDir,storeTag)
+    os.makedirs(cacheDir, exist_ok=True)
+
+    # Remove the index first, so that an interrupted write leaves an invalid store behind
+    if os.path.exists(indexFile):
+        os.remove(indexFile)
+
+    Ntot = sum([data.size for data in dataList])
+    dType = dataList[0].dtype if len(dataList) > 0 else np.complex128
+    store = np.lib.format.open_memmap(npyFile, mode='w+', dtype=dType, shape=(Ntot,))
+
+    stamps = getFileStamps(fileList)
+    index = {'Precision': precision, 'Files': []}
+    offset = 0
+    for stamp,data in zip(stamps,dataList):
+        store[offset:offset+data.size] = data.ravel()
+        index['Files'].append(stamp + [offset] + list(np.shape(data)))
+        offset += data.size
+    store.flush()
+    del store
+
+    with open(indexFile,'w') as fp:
+        json.dump(index,fp)
+#-------------------------------
+
+# Read a list of correlator files through the cache store
+# The files are parsed, and the store is (re-)written, only if the store is missing or out of date
+# The store always holds all the configurations, the subset selected by cfgSlice is returned
+def readCorrelatorListCached(cacheDir, storeTag, fileList, Ncfg, NtList, precision='double', Nworkers=1, Nins=None, cfgSlice=None):
+    dataList = readStore(cacheDir,storeTag,fileList,Ncfg,NtList,precision,Nins)
+    if dataList is not None:
+        print('Loaded %d datasets from cache store %s/%s'%(len(dataList),cacheDir,storeTag))
+    else:
+        dataList = ASCIIio.readCorrelatorListASCII(fileList,Ncfg,NtList,precision,Nworkers,Nins)
+        writeStore(cacheDir,storeTag,fileList,dataList,precision)
+        print('Wrote %d datasets in cache store %s/%s'%(len(dataList),cacheDir,storeTag))
+
+    return [ASCIIio.selectConfigurations(data,cfgSlice) for data in dataList]
+#-------------------------------
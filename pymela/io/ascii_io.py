@@ -0,0 +1,169 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+This file contains functions that read correlation functions from ASCII files
+'''
+
+import os
+import io
+import gzip
+import bz2
+import lzma
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+import pymela.io.tar_io as tarIO
+import pymela.tools.precision as prec
+
+# Columns of each line in the ASCII files: time, real part, imaginary part
+reCol = 1
+imCol = 2
+
+# Compressed files are found next to the expected file name, with one of these suffixes, and are decoded as a stream
+compressedOpeners = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+# Parse the text of a correlator file into a complex (Ncfg,Nt) array in one bulk operation
+# Each line holds (t, Re, Im), the lines run over time fastest and then over configurations
+# Files that hold Nins insertions have the (Re, Im) pairs of all the insertions on each line, (t, Re_1, Im_1, Re_2, Im_2, ...),
+# and are parsed into a complex (Nins,Ncfg,Nt) array
+# cfgSlice selects a subset of the Ncfg configurations in the file. The lines after the last selected configuration are not parsed
+def parseCorrelatorASCII(text, Ncfg, Nt, precision='double', fileName='', Nins=None, cfgSlice=None):
+    fType = prec.getPrecisionType(precision)
+
+    # Determine the number of columns from the first line
+    Ncol = len(text[:text.find('\n')].split())
+    NcolMin = imCol+1 if Nins is None else imCol+1 + 2*(Nins-1)
+    if Ncol < NcolMin:
+        raise ValueError('File %s: Expected at least %d columns, got %d'%(fileName,NcolMin,Ncol))
+
+    NcfgParse = Ncfg
+    if cfgSlice is not None:
+        cfgSlice = slice(*cfgSlice.indices(Ncfg))
+        NcfgParse = cfgSlice.stop
+
+    try:
+        vals = np.fromstring(text, dtype=fType, count=NcfgParse*Nt*Ncol if NcfgParse < Ncfg else -1, sep=' ')
+    except ValueError:
+        raise ValueError('File %s: Could not parse numeric data'%(fileName))
+
+    Nrows = len(vals) // Ncol
+    if len(vals) % Ncol != 0:
+        raise ValueError('File %s: Got %d values, not a multiple of the %d columns'%(fileName,len(vals),Ncol))
+    if Nrows != NcfgParse*Nt:
+        raise ValueError('File %s: Got %d rows, expected Ncfg*Nt = %d*%d = %d. Is the file truncated?'%(fileName,Nrows,NcfgParse,Nt,NcfgParse*Nt))
+
+    vals = vals.reshape(NcfgParse,Nt,Ncol)
+    if cfgSlice is not None:
+        vals = vals[cfgSlice]
+        Ncfg = len(vals)
+
+    cType = prec.getComplexType(precision)
+    if Nins is None:
+        data = np.empty((Ncfg,Nt), dtype=cType)
+        data.real = vals[:,:,reCol]
+        data.imag = vals[:,:,imCol]
+    else:
+        data = np.empty((Nins,Ncfg,Nt), dtype=cType)
+        data.real = np.moveaxis(vals[:,:,reCol:reCol+2*Nins:2], 2, 0)
+        data.imag = np.moveaxis(vals[:,:,imCol:imCol+2*Nins:2], 2, 0)
+
+    return data
+#-------------------------------
+
+# Return the name of the file that holds the data: the file itself, or a compressed version of it
+# The file may also be a member of a tar archive. The file name is returned unchanged if neither exists
+def resolveFileName(fileName):
+    archive,memberName = tarIO.splitArchivePath(fileName)
+    if archive is not None:
+        exists = lambda suffix: archive.getMember(memberName + suffix) is not None
+    else:
+        exists = lambda suffix: os.path.exists(fileName + suffix)
+
+    if exists(''):
+        return fileName
+    for suffix in compressedOpeners.keys():
+        if exists(suffix):
+            return fileName + suffix
+    return fileName
+#-------------------------------
+
+# Return the size and the modification time of a file, or of a member of a tar archive
+def statFile(fileName):
+    archive,memberName = tarIO.splitArchivePath(fileName)
+    if archive is not None:
+        info = archive.getMember(memberName)
+        if info is None:
+            raise FileNotFoundError('Member %s not found in tar archive %s'%(memberName,archive.fileName))
+        return info.size, archive.mtime
+    st = os.stat(fileName)
+    return st.st_size, st.st_mtime_ns
+#-------------------------------
+
+# Resolve the file that holds the data, see resolveFileName(), and the location of the file if it is a member of a tar archive
+# Returns (fileName, location), where location is None for files that are not in an archive, see tar_io.TarArchive.locate()
+def locateFile(fileName):
+    fileName = resolveFileName(fileName)
+    archive,memberName = tarIO.splitArchivePath(fileName)
+    if archive is not None and archive.getMember(memberName) is not None:
+        return fileName, archive.locate(memberName)
+    return fileName, None
+#-------------------------------
+
+# Open a plain or compressed ASCII file, which may be a member of a tar archive. The mode is 'rt' or 'rb'
+# The location of a member of a tar archive may be given, as returned by locateFile(), such that the archive is not looked up
+def openASCII(fileName, mode='rt', location=None):
+    if location is None:
+        archive,memberName = tarIO.splitArchivePath(fileName)
+        if archive is not None:
+            location = archive.locate(memberName)
+    fp = io.BytesIO(tarIO.readMember(location)) if location is not None else fileName
+
+    for suffix,opener in compressedOpeners.items():
+        if fileName.endswith(suffix):
+            return opener(fp, mode)
+
+    if location is not None:
+        return fp if mode == 'rb' else io.TextIOWrapper(fp)
+    return open(fileName, mode)
+#-------------------------------
+
+def readCorrelatorASCII(fileName, Ncfg, Nt, precision='double', Nins=None, cfgSlice=None):
+    fileName,location = locateFile(fileName)
+    return readLocatedCorrelatorASCII(fileName, location, Ncfg, Nt, precision, Nins, cfgSlice)
+#-------------------------------
+
+# Read a correlator file that has already been resolved with locateFile()
+# This is what the reader processes run, so that the tar archives are indexed only once, in the main process
+def readLocatedCorrelatorASCII(fileName, location, Ncfg, Nt, precision='double', Nins=None, cfgSlice=None):
+    with openASCII(fileName, location=location) as fp:
+        text = fp.read()
+    return parseCorrelatorASCII(text, Ncfg, Nt, precision, fileName, Nins, cfgSlice)
+#-------------------------------
+
+# Select a subset of the configurations of data that hold all of them, e.g. data loaded from a cache store
+# The configurations are the next-to-last dimension
+def selectConfigurations(data, cfgSlice=None):
+    if cfgSlice is None:
+        return data
+    return data[...,cfgSlice,:]
+#-------------------------------
+
+# Read a list of correlator files, either serially or spread over a pool of Nworkers processes
+# The returned list of arrays follows the order of fileList
+def readCorrelatorListASCII(fileList, Ncfg, NtList, precision='double', Nworkers=1, Nins=None, cfgSlice=None):
+    Nfiles = len(fileList)
+    if Nworkers <= 1 or Nfiles <= 1:
+        return [readCorrelatorASCII(f,Ncfg,Nt,precision,Nins,cfgSlice) for f,Nt in zip(fileList,NtList)]
+
+    # The files are resolved here, and the workers get the location of each member of a tar archive
+    locatedList = [locateFile(f) for f in fileList]
+
+    # Send the files to the workers in chunks, to reduce the inter-process communication overhead
+    chunk = max(1, Nfiles // (4*Nworkers))
+    with ProcessPoolExecutor(max_workers=Nworkers) as pool:
+        return list(pool.map(readLocatedCorrelatorASCII, [f for f,loc in locatedList], [loc for f,loc in locatedList], [Ncfg]*Nfiles,
+                             NtList, [precision]*Nfiles, [Nins]*Nfiles, [cfgSlice]*Nfiles, chunksize=chunk))
+#-------------------------------
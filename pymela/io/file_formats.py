@@ -36,3 +36,15 @@ def getThreePointFileNameASCII(phM,t0Tag,tsepTag,srcOp,snkOp,row,insOp,insRow,mF
 
     return FileName
 #--------------------------
+
+# File holding all the insertions of a (tsep,t0,z3,src-snk,row) combination, as extra columns
+def getThreePointCombinedFileNameASCII(phM,t0Tag,tsepTag,srcOp,snkOp,row,mFTag,dispTag,nvec):
+    filePre = 'corr_3pt.baryon.n%d'%(nvec)
+
+    srcTag = 'src_%s_%d'%(srcOp,row)
+    snkTag = 'snk_%s_%d'%(snkOp,row)
+
+    FileName = '%s.%s.%s.%s.%s.%s.ins_all.%s.%s.dat'%(filePre,phM,t0Tag,tsepTag,srcTag,snkTag,dispTag,mFTag)
+
+    return FileName
+#--------------------------
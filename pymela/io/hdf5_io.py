@@ -0,0 +1,190 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+This file contains functions related to the HDF5 layouts of the correlation function data
+
+Two layouts are supported:
+  'tree' : One dataset for each combination of attributes, e.g. plain/mom/t0/op/row/data (the default)
+  'dense': One N-dimensional dataset for each momentum (and tsep), with the attributes as axes.
+           The name of each axis is stored in the "axes" attribute of the dataset, and the coordinate values
+           of the labelled axes are stored as datasets next to it, e.g. plain/mom/data and plain/mom/t0
+'''
+
+import numpy as np
+
+supportedLayouts = ['tree','dense']
+
+# The output policy applied to all datasets written through createDataset(), set with "HDF5 Output Policy" in "Analysis Info"
+#   'Compression'      : None, 'gzip' or 'lzf'
+#   'Compression Level': The gzip compression level (0-9)
+#   'Shuffle'          : Apply the shuffle filter before compression
+#   'Chunking'         : Chunk the datasets even without filters
+#   'Chunk Size KB'    : Upper limit of the size of each chunk
+#   'Min Chunked KB'   : Datasets smaller than this are written contiguous and without filters, whatever the above,
+#                        since the chunk index of a small dataset takes more space than compression saves
+#   'Bins Precision'   : Storage precision of the Jackknife bins: 'native', 'double' or 'single'
+# The default policy writes the datasets as they are, contiguous and without filters
+defaultOutputPolicy = {'Compression'      : None,
+                       'Compression Level': None,
+                       'Shuffle'          : False,
+                       'Chunking'         : False,
+                       'Chunk Size KB'    : 1024,
+                       'Min Chunked KB'   : 16,
+                       'Bins Precision'   : 'native'}
+
+supportedCompression = [None,'gzip','lzf']
+binsPrecisionTypes = {'native': None, 'double': (np.float64,np.complex128), 'single': (np.float32,np.complex64)}
+
+# The layout of each file is stored as an attribute at the root group
+layoutAttr = 'Layout'
+
+
+def getLayout(h5_file):
+    return h5_file.attrs[layoutAttr] if layoutAttr in h5_file.attrs.keys() else 'tree'
+#-------------------------------
+
+def setLayout(h5_file, layout):
+    if layout not in supportedLayouts:
+        raise ValueError('Unsupported HDF5 layout "%s". Supported layouts are: %s'%(layout,supportedLayouts))
+    h5_file.attrs[layoutAttr] = layout
+#-------------------------------
+
+def getOutputPolicy(analysisInfo):
+    policy = dict(defaultOutputPolicy)
+    if 'HDF5 Output Policy' in analysisInfo.keys():
+        for key,val in analysisInfo['HDF5 Output Policy'].items():
+            if key not in policy.keys():
+                raise ValueError('Unknown entry "%s" in "HDF5 Output Policy". Supported entries are: %s'%(key,list(policy.keys())))
+            policy[key] = val
+
+    if policy['Compression'] not in supportedCompression:
+        raise ValueError('Unsupported HDF5 compression "%s". Supported compression filters are: %s'%(policy['Compression'],supportedCompression))
+    if policy['Bins Precision'] not in binsPrecisionTypes.keys():
+        raise ValueError('Unsupported "Bins Precision" = %s. Supported precisions are: %s'%(policy['Bins Precision'],list(binsPrecisionTypes.keys())))
+
+    return policy
+#-------------------------------
+
+# Determine the chunk shape of a dataset
+# The last two axes, i.e. the configuration/bin axis and the time axis, are never split,
+# so that all the bins of a time slice are always in the same chunk. Leading axes are split until the chunk fits the size limit
+def getChunkShape(shape, itemsize, chunkSizeKB):
+    chunks = list(shape)
+    Nkeep = min(2,len(chunks))
+    while np.prod(chunks)*itemsize > chunkSizeKB*1024:
+        lead = chunks[:len(chunks)-Nkeep]
+        if len(lead) == 0 or max(lead) == 1:
+            break
+        i = lead.index(max(lead))
+        chunks[i] = (chunks[i]+1)//2
+    return tuple(chunks)
+#-------------------------------
+
+# The shared writer of all the HDF5 datasets of the package
+# bins: The dataset holds Jackknife bins, so its storage precision follows the "Bins Precision" of the policy
+def createDataset(h5_file, dset_name, data, policy=None, dtype=None, bins=False):
+    if policy is None:
+        return h5_file.create_dataset(dset_name, data = data, dtype = dtype)
+
+    data = np.asarray(data)
+
+    if bins and binsPrecisionTypes[policy['Bins Precision']] is not None:
+        fType,cType = binsPrecisionTypes[policy['Bins Precision']]
+        dtype = cType if np.iscomplexobj(data) else fType
+
+    kwargs = {}
+    useFilters = policy['Compression'] is not None or policy['Shuffle']
+    itemsize = np.dtype(dtype).itemsize if dtype is not None else data.dtype.itemsize
+    if data.ndim > 0 and data.size > 0 and data.size*itemsize >= policy['Min Chunked KB']*1024 and (useFilters or policy['Chunking']):
+        kwargs['chunks'] = getChunkShape(data.shape,itemsize,policy['Chunk Size KB'])
+        if policy['Compression'] is not None:
+            kwargs['compression'] = policy['Compression']
+            if policy['Compression'] == 'gzip' and policy['Compression Level'] is not None:
+                kwargs['compression_opts'] = policy['Compression Level']
+        if policy['Shuffle']:
+            kwargs['shuffle'] = True
+
+    return h5_file.create_dataset(dset_name, data = data, dtype = dtype, **kwargs)
+#-------------------------------
+
+# Write the coordinate values of labelled axes in a group
+# Strings are stored as bytes
+def writeAxes(h5_file, group, axes):
+    for axName,coords in axes.items():
+        dset_name = '%s/%s'%(group,axName)
+        if dset_name in h5_file:
+            continue
+        if len(coords) > 0 and type(coords[0]) == str:
+            h5_file.create_dataset(dset_name, data = np.array(coords, dtype='S'))
+        else:
+            h5_file.create_dataset(dset_name, data = np.array(coords))
+#-------------------------------
+
+# Read the coordinate values of a labelled axis in a group
+def readAxis(h5_file, group, axName):
+    coords = h5_file['%s/%s'%(group,axName)][()]
+    if coords.dtype.kind == 'S':
+        return [c.decode() for c in coords]
+    return coords.tolist()
+#-------------------------------
+
+# Write an N-dimensional dataset, along with the names of its axes
+def writeDense(h5_file, dset_name, data, axisNames, dtype=None, policy=None, bins=False):
+    if len(axisNames) != np.ndim(data):
+        raise ValueError('Dense dataset %s: Got %d axis names for a %d-dimensional dataset'%(dset_name,len(axisNames),np.ndim(data)))
+    dset = createDataset(h5_file, dset_name, data, policy, dtype, bins)
+    dset.attrs['axes'] = np.array(axisNames, dtype='S')
+#-------------------------------
+
+# Stack the arrays returned by dataFunc into an N-dimensional array, for all combinations of the coordinates in keyAxes
+# dataFunc takes one coordinate value of each axis in keyAxes, in that order
+def stackDense(dataFunc, keyAxes):
+    shape = tuple([len(coords) for coords in keyAxes])
+    dataList = []
+    for idx in np.ndindex(*shape):
+        dataList.append(np.asarray(dataFunc(*[coords[i] for coords,i in zip(keyAxes,idx)])))
+    dataArr = np.array(dataList)
+    return dataArr.reshape(shape + dataArr.shape[1:])
+#-------------------------------
+
+# Return the position of each requested coordinate value on an axis
+def axisIndices(coords, values, axName=''):
+    idx = []
+    for v in values:
+        if v not in coords:
+            raise ValueError('Dense dataset: Value %s not found on axis "%s"'%(v,axName))
+        idx.append(coords.index(v))
+    return idx
+#-------------------------------
+
+# Dictionary-like container of datasets, that are read from an open HDF5 file only when they are accessed
+# Nothing is kept in memory, so each dataset can be released as soon as the caller is done with it
+# Each entry is given by a dataset name and an index; the index selects a part of a dense dataset, or is () for the whole dataset
+class LazyDatasetDict():
+    def __init__(self, h5_file):
+        self.h5_file = h5_file
+        self.sources = {}
+
+    def addSource(self, key, dset_name, index=()):
+        self.sources[key] = (dset_name, index)
+
+    def __getitem__(self, key):
+        if not self.h5_file:
+            raise ValueError('LazyDatasetDict: The input HDF5 file has been closed, the lazy data are not available')
+        dset_name,index = self.sources[key]
+        return self.h5_file[dset_name][index]
+
+    def __contains__(self, key):
+        return key in self.sources
+
+    def __iter__(self):
+        return iter(self.sources)
+
+    def __len__(self):
+        return len(self.sources)
+
+    def keys(self):
+        return self.sources.keys()
+#-------------------------------
@@ -17,6 +17,7 @@ effEnergyInfoTag = 'Effective Energy Info'
 ratioInfoTag     = 'Ratio Info'
 ratioFitInfoTag  = 'Ratio Fitting'
 ITDInfoTag       = 'ITD'
+binsizeScanInfoTag = 'Binsize Scan'
 
 # What is expected in the JSON input file, based on the type of run/test
 inputInfoTags = {'2pt analysis': [analysisInfoTag, c2ptDataInfoTag, ensembleInfoTag],
@@ -24,7 +25,8 @@ inputInfoTags = {'2pt analysis': [analysisInfoTag, c2ptDataInfoTag, ensembleInfo
                  'Effective Energy': [analysisInfoTag, c2ptDataInfoTag, ensembleInfoTag, effEnergyInfoTag],
                  'Compute ratio': [analysisInfoTag, c2ptDataInfoTag, c3ptDataInfoTag, ensembleInfoTag, ratioInfoTag], 
                  'Fit Ratio': [analysisInfoTag, c2ptDataInfoTag, c3ptDataInfoTag, ensembleInfoTag, ratioInfoTag, ratioFitInfoTag],
-                 'Compute rITD': [analysisInfoTag, c2ptDataInfoTag, c3ptDataInfoTag, ensembleInfoTag, ratioInfoTag, ratioFitInfoTag,ITDInfoTag]
+                 'Compute rITD': [analysisInfoTag, c2ptDataInfoTag, c3ptDataInfoTag, ensembleInfoTag, ratioInfoTag, ratioFitInfoTag,ITDInfoTag],
+                 'Binsize Scan': [analysisInfoTag, c2ptDataInfoTag, c3ptDataInfoTag, ensembleInfoTag, binsizeScanInfoTag]
                 }
 
 # What is expected in each object of the JSON input file
@@ -35,7 +37,8 @@ expectedKeys = {c2ptDataInfoTag:  ['Input Data', 'Datasets', 'Write HDF5 Output'
                 effEnergyInfoTag: ['HDF5 Output File', 'Fitting'],
                 ratioInfoTag    : ['Write HDF5 Output'],
                 ratioFitInfoTag : [],
-                ITDInfoTag: ['HDF5 Output File','Optimal Fits']}
+                ITDInfoTag: ['HDF5 Output File','Optimal Fits'],
+                binsizeScanInfoTag: ['HDF5 Output File']}
 
 expectedSubKeys = {c2ptDataInfoTag: {'Datasets': ['Mom List', 'Phase Info', 'Ncfg', 't0','Nt','Interpolating Operators File',
                                                   'Nrows','Compute X-rows']
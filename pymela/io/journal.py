@@ -0,0 +1,58 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+This file contains functions that keep an ingestion journal while reading long lists of ASCII files.
+The file list is split in blocks of consecutive files, and each completed block is checkpointed as a cache store
+(see ascii_cache.py) in the journal directory. A run that is restarted after a crash loads the completed blocks
+from the journal, and continues parsing from the first block that was not completed.
+'''
+
+import os
+import glob
+
+import pymela.io.ascii_io as ASCIIio
+import pymela.io.ascii_cache as ASCIIcache
+
+# Default number of files in each block of the journal
+defaultBlockSize = 256
+
+
+def getBlockTag(journalTag, iblock):
+    return '%s_block%d'%(journalTag,iblock)
+#-------------------------------
+
+# Read a list of correlator files, checkpointing each completed block of files in the journal
+# The journal holds all the configurations, the subset selected by cfgSlice is returned
+def readCorrelatorListJournaled(journalDir, journalTag, fileList, Ncfg, NtList, precision='double', Nworkers=1, Nins=None,
+                                blockSize=defaultBlockSize, cfgSlice=None):
+    dataList = []
+    Nresumed = 0
+    Nblocks = (len(fileList) + blockSize - 1) // blockSize
+    for iblock in range(Nblocks):
+        blockFiles = fileList[iblock*blockSize:(iblock+1)*blockSize]
+        blockNt    = NtList[iblock*blockSize:(iblock+1)*blockSize]
+        blockTag   = getBlockTag(journalTag,iblock)
+
+        # A block is valid only if its store was written completely, and none of its files changed since
+        blockData = ASCIIcache.readStore(journalDir,blockTag,blockFiles,Ncfg,blockNt,precision,Nins)
+        if blockData is not None:
+            Nresumed += 1
+        else:
+            blockData = ASCIIio.readCorrelatorListASCII(blockFiles,Ncfg,blockNt,precision,Nworkers,Nins)
+            ASCIIcache.writeStore(journalDir,blockTag,blockFiles,blockData,precision)
+
+        dataList += [ASCIIio.selectConfigurations(data,cfgSlice) for data in blockData]
+
+    if Nresumed > 0:
+        print('Resumed %d out of %d blocks from journal %s/%s'%(Nresumed,Nblocks,journalDir,journalTag))
+
+    return dataList
+#-------------------------------
+
+# Remove the journal, once all of its files have been loaded
+def clearJournal(journalDir, journalTag):
+    for fileName in glob.glob('%s/%s_block*'%(journalDir,glob.escape(journalTag))):
+        os.remove(fileName)
+#-------------------------------
@@ -64,3 +64,41 @@ def makeInputChecks(runType, ioDict):
 
 
 #-------------------------------
+
+# Return the "Selection" object of a data info dictionary, making sure that only supported attributes are selected
+# The selection restricts the attributes listed in "Datasets" (and "Insertion Operators") to the given values
+def getSelection(infoDict, supportedKeys):
+    if 'Selection' not in infoDict.keys():
+        return {}
+
+    selection = infoDict['Selection']
+    for key in selection.keys():
+        if key not in supportedKeys:
+            raise ValueError('Unsupported entry "%s" in "Selection". Supported entries are: %s' % (key,supportedKeys))
+    return selection
+#-------------------------------
+
+# Keep the values of an attribute that are included in the selection, in their original order
+def applySelection(values, selection, key):
+    if key not in selection.keys():
+        return values
+
+    selValues = [v for v in values if v in selection[key]]
+    if len(selValues) == 0:
+        raise ValueError('"Selection" of "%s" = %s leaves no values out of %s' % (key,selection[key],values))
+    return selValues
+#-------------------------------
+
+# Return the slice of the configurations that are analyzed, set with "Config Range" = [first, last] (last excluded)
+# and "Config Stride" in "Analysis Info". Returns None if all the configurations are analyzed
+def getConfigSlice(analysisInfo):
+    if 'Config Range' not in analysisInfo.keys() and 'Config Stride' not in analysisInfo.keys():
+        return None
+
+    first,last = analysisInfo['Config Range'] if 'Config Range' in analysisInfo.keys() else (0,None)
+    stride = analysisInfo['Config Stride'] if 'Config Stride' in analysisInfo.keys() else 1
+    if type(stride) != int or stride < 1:
+        raise ValueError('"Config Stride" in "Analysis Info" must be a positive integer')
+
+    return slice(first,last,stride)
+#-------------------------------
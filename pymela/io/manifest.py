@@ -0,0 +1,81 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+This file contains functions that check the complete list of ASCII input files before any of them is parsed
+'''
+
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+import pymela.io.ascii_io as ASCIIio
+import pymela.io.tar_io as tarIO
+
+# Number of threads that stat the files
+statThreads = 16
+
+# Files that hold the same number of rows have about the same size.
+# A file smaller than this fraction of the median size of such files is considered short
+shortFraction = 0.9
+
+# Maximum number of problematic files listed in the error message
+Nlist = 10
+
+
+def getFileSize(fileName):
+    try:
+        return ASCIIio.statFile(fileName)[0]
+    except OSError:
+        return None
+#-------------------------------
+
+# Files are read by directory and file name, members of tar archives in the order they are stored in the archive
+def localityKey(fileName):
+    archive,memberName = tarIO.splitArchivePath(fileName)
+    if archive is not None:
+        return (archive.fileName, archive.getMember(memberName).offset, '')
+    return (os.path.dirname(fileName), 0, os.path.basename(fileName))
+#-------------------------------
+
+# Stat all the files of the manifest, report missing and short files and the total size of the data
+# entries: A list of (key, fileName, Nrows), where Nrows is the number of rows expected in the file
+# The file names are resolved to the compressed files, where the plain ones do not exist
+# Returns the resolved entries in the order given by localityKey(), so that the files of each directory are read together
+def scanManifest(entries, label=''):
+    with ThreadPoolExecutor(max_workers=statThreads) as pool:
+        fileList = list(pool.map(ASCIIio.resolveFileName, [fileName for key,fileName,Nrows in entries]))
+        sizes = list(pool.map(getFileSize, fileList))
+    entries = [(key,fileName,Nrows) for (key,f,Nrows),fileName in zip(entries,fileList)]
+
+    missing = [fileName for fileName,size in zip(fileList,sizes) if size is None]
+
+    # Compare each file with the files that hold the same number of rows, and are compressed in the same way
+    sizeGroup = lambda fileName,Nrows: (Nrows, os.path.splitext(fileName)[1])
+    groupSizes = {}
+    for (key,fileName,Nrows),size in zip(entries,sizes):
+        if size is not None:
+            groupSizes.setdefault(sizeGroup(fileName,Nrows),[]).append(size)
+    medianSize = {group: np.median(gSizes) for group,gSizes in groupSizes.items()}
+
+    short = []
+    for (key,fileName,Nrows),size in zip(entries,sizes):
+        if size is not None:
+            mSize = medianSize[sizeGroup(fileName,Nrows)]
+            if size == 0 or size < shortFraction*mSize:
+                short.append('%s (%d bytes, typical size %d bytes)'%(fileName,size,mSize))
+
+    totalSize = sum([size for size in sizes if size is not None])
+    print('%s manifest: %d files, %.1f MB in total, %d missing, %d short'%(label,len(entries),totalSize/1.0e6,len(missing),len(short)))
+
+    if len(missing) > 0 or len(short) > 0:
+        msg = '%s manifest: Found %d missing and %d short files'%(label,len(missing),len(short))
+        if len(missing) > 0:
+            msg += '\nMissing files:\n  ' + '\n  '.join(missing[:Nlist]) + ('\n  ...' if len(missing) > Nlist else '')
+        if len(short) > 0:
+            msg += '\nShort files:\n  ' + '\n  '.join(short[:Nlist]) + ('\n  ...' if len(short) > Nlist else '')
+        raise ValueError(msg)
+
+    return sorted(entries, key = lambda e: localityKey(e[1]))
+#-------------------------------
@@ -0,0 +1,110 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+Class definition of a background reader that prefetches data into a bounded queue,
+so that reading/parsing overlaps with the statistical analysis of the data already read
+'''
+
+import threading
+import queue
+import time
+
+# Default number of entries of the queue
+defaultQueueSize = 8
+
+# Interval (sec) at which a blocked reader checks whether the consumer has stopped
+stopPollInterval = 0.1
+
+# The reader thread runs readFunc(*args) for each (key,args) entry of taskList, in order,
+# and puts the results in a queue of at most queueSize entries.
+# Iterating over the object yields (key,result) as soon as each result is available.
+# If the consumer stops iterating, or raises, the reader thread is stopped and the queued results are dropped.
+class PrefetchReader():
+    def __init__(self, readFunc, taskList, queueSize=defaultQueueSize):
+        self.readFunc = readFunc
+        self.taskList = taskList
+        self.queueSize = queueSize
+
+        if type(self.queueSize) != int or self.queueSize < 1:
+            raise ValueError('PrefetchReader: The queue size must be a positive integer')
+
+        self.queue = queue.Queue(maxsize=self.queueSize)
+        self.stopEvent = threading.Event() # Set when the consumer stops iterating
+
+        # Statistics of the pipeline
+        self.Nitems = 0        # Number of items consumed
+        self.Nbytes = 0        # Size of the data consumed
+        self.depthSum = 0      # Sum of queue depths, seen by the consumer
+        self.depthMax = 0      # Maximum queue depth, seen by the consumer
+        self.waitTime = 0.0    # Time the consumer waited for data
+        self.elapsed = 0.0     # Total time of the pipeline
+    # End __init__() -------------
+
+    # Put an entry in the queue, waiting while the queue is full. Returns False if the consumer has stopped
+    def put(self, entry):
+        while not self.stopEvent.is_set():
+            try:
+                self.queue.put(entry, timeout=stopPollInterval)
+                return True
+            except queue.Full:
+                pass
+        return False
+    #-------------------------------
+
+    def reader(self):
+        try:
+            for key,args in self.taskList:
+                if self.stopEvent.is_set() or not self.put((key,self.readFunc(*args),None)):
+                    return
+        except Exception as exc:
+            self.put((None,None,exc))
+            return
+        self.put((None,None,None)) # Signals the end of the tasks
+    #-------------------------------
+
+    def __iter__(self):
+        tStart = time.time()
+        self.stopEvent.clear()
+        thread = threading.Thread(target=self.reader, daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                depth = self.queue.qsize()
+                tWait = time.time()
+                key,result,exc = self.queue.get()
+                self.waitTime += time.time() - tWait
+
+                if exc is not None:
+                    raise exc
+                if key is None:
+                    break
+
+                self.depthSum += depth
+                self.depthMax = max(self.depthMax,depth)
+                self.Nitems += 1
+                self.Nbytes += getattr(result,'nbytes',0)
+
+                yield key,result
+        finally:
+            # Stop the reader, also when the consumer has stopped iterating or raised, and drop the queued results
+            self.stopEvent.set()
+            thread.join()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+
+        self.elapsed = time.time() - tStart
+    #-------------------------------
+
+    def printReport(self, label=''):
+        elapsed = self.elapsed if self.elapsed > 0 else float('nan')
+        depthAvg = self.depthSum/self.Nitems if self.Nitems > 0 else 0
+
+        print('%s pipeline: %d items, %.1f MB in %.2f sec (%.1f items/sec, %.1f MB/sec)'%(label,self.Nitems,self.Nbytes/1.0e6,
+                                                                                       self.elapsed,self.Nitems/elapsed,
+                                                                                       self.Nbytes/1.0e6/elapsed))
+        print('%s pipeline: Queue depth average = %.1f, maximum = %d (size = %d). Consumer waited for data for %.2f sec'%(label,depthAvg,self.depthMax,
+                                                                                                                         self.queueSize,self.waitTime))
+    #-------------------------------
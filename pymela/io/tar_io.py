@@ -0,0 +1,116 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+This file contains functions that read files directly from tar archives, without extracting them.
+A file inside an archive is addressed as if the archive were a directory, e.g. /data/run1.tar/unphased/t0_0/...
+The member index of each archive is built once, in the main process, and kept for the rest of the run.
+A member is then read from its location in the archive, (archive, offset of the data, size), with a single positioned read.
+The reader processes are given the locations of the members, so they neither index nor scan the archives.
+Only uncompressed archives are supported, since the members of a compressed archive can only be reached by decompressing
+the stream from its start.
+'''
+
+import os
+import tarfile
+import threading
+
+# The archives opened so far, by absolute path
+openArchives = {}
+openLock = threading.Lock()
+
+
+class TarArchive():
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.mtime = os.stat(fileName).st_mtime_ns
+
+        try:
+            tar = tarfile.open(fileName, 'r:')
+        except tarfile.ReadError:
+            raise ValueError('\nTar archive %s is compressed or not a valid tar archive. Only uncompressed archives can be read '%(fileName) +
+                             'directly, decompress it first (the members themselves may be compressed)')
+
+        # Index of the regular files in the archive, with any leading "./" removed
+        self.members = {}
+        with tar:
+            for info in tar.getmembers():
+                if info.isfile():
+                    self.members[os.path.normpath(info.name)] = info
+
+        # Archives of a single top directory are also indexed relative to that directory
+        topDirs = set([name.split('/')[0] for name in self.members.keys()])
+        if len(topDirs) == 1 and all(['/' in name for name in self.members.keys()]):
+            for name,info in list(self.members.items()):
+                self.members[name.split('/',1)[1]] = info
+    # End __init__() -------------
+
+    def getMember(self, memberName):
+        return self.members.get(os.path.normpath(memberName), None)
+    #-------------------------------
+
+    # The location of a member, (archive, offset of the data, size), which is all that is needed to read it, see readMember()
+    def locate(self, memberName):
+        info = self.members[os.path.normpath(memberName)]
+        if info.sparse is not None:
+            raise ValueError('\nMember %s of tar archive %s is a sparse file, which cannot be read directly'%(memberName,self.fileName))
+        return (self.fileName, info.offset_data, info.size)
+    #-------------------------------
+
+    def read(self, memberName):
+        return readMember(self.locate(memberName))
+    #-------------------------------
+
+
+# Read a member of an archive from its location, on a handle of its own, without the member index
+def readMember(location):
+    archiveName,offset,size = location
+    chunks = []
+    Nread = 0
+    fd = os.open(archiveName, os.O_RDONLY)
+    try:
+        while Nread < size: # A single read may return less than requested, e.g. on network file systems
+            chunk = os.pread(fd, size - Nread, offset + Nread)
+            if len(chunk) == 0:
+                raise IOError('Got %d bytes out of %d at offset %d of tar archive %s'%(Nread,size,offset,archiveName))
+            chunks.append(chunk)
+            Nread += len(chunk)
+    finally:
+        os.close(fd)
+
+    return b''.join(chunks)
+
+
+def getArchive(archiveName):
+    archiveName = os.path.abspath(archiveName)
+    with openLock:
+        if archiveName not in openArchives.keys():
+            print('Indexing tar archive %s'%(archiveName))
+            openArchives[archiveName] = TarArchive(archiveName)
+    return openArchives[archiveName]
+#-------------------------------
+
+# Split a path into the archive that contains it and the name of the member in the archive
+# Returns (None, fileName) if the path is not inside a tar archive
+def splitArchivePath(fileName):
+    absName = os.path.abspath(fileName)
+    for archiveName in openArchives.keys():
+        if absName.startswith(archiveName + '/'):
+            return openArchives[archiveName], absName[len(archiveName)+1:]
+
+    if os.path.exists(absName):
+        return None, fileName
+
+    parent = absName
+    while parent != os.path.dirname(parent):
+        parent = os.path.dirname(parent)
+        if os.path.isfile(parent):
+            if tarfile.is_tarfile(parent):
+                return getArchive(parent), absName[len(parent)+1:]
+            break
+        if os.path.isdir(parent):
+            break
+
+    return None, fileName
+#-------------------------------
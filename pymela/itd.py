@@ -8,6 +8,7 @@ Class definition that computes reduced Ioffe-time distributions
 
 import pymela.io.json_io as JSONio
 import pymela.io.file_formats as ioForm
+import pymela.io.hdf5_io as hdf5io
 import pymela.tools.tag_creators as tags
 import pymela.tools.jackknife as jackknife
 
@@ -74,6 +75,7 @@ class ITD():
             self.Nbins   = self.plat.Nbins
             self.gammaList = self.plat.gammaList
             self.dSetAttr3pt = self.plat.dSetAttr3pt
+            self.outputPolicy = self.plat.outputPolicy
         else:
             # Get these attributes from the summ fits instead, it MUST be defined otherwise ValueError is raised
             self.momAvg  = self.summ.momAvg
@@ -81,7 +83,14 @@ class ITD():
             self.Nbins   = self.summ.Nbins
             self.gammaList = self.summ.gammaList
             self.dSetAttr3pt = self.summ.dSetAttr3pt
+            self.outputPolicy = self.summ.outputPolicy
 
+        # The normalization of the ITDs needs the zero-momentum and z3=0 data, which may have been left out by a "Selection"
+        if [0,0,0] not in self.momAvg:
+            raise ValueError('ITDs require the zero momentum data. Please include [0,0,0] in the selected momenta')
+        for mTag,dispListAvg in self.dispAvg.items():
+            if 0 not in dispListAvg:
+                raise ValueError('ITDs require the z3=0 data. Please include z3=0 in the selected displacements for momentum %s'%(mTag))
 
         # The ITD bins and mean
         self.bins = {}
@@ -103,6 +112,12 @@ class ITD():
                             mTag = tags.momString(mom)
                             for z3 in md[1]:
                                 self.tSelFit[fit][ri][(mTag,z3)] = int(tOpt)
+
+                            # The optimal plateau fits must refer to a selected source-sink separation
+                            if fit in self.fitTypes['Plateau'] and mTag in self.dSetAttr3pt.keys():
+                                if int(tOpt) not in self.dSetAttr3pt[mTag]['tsep']:
+                                    raise ValueError('Optimal Fit %s/%s: tsep = %s for momentum %s is not in the selected tsep values %s'%(fit,ri,tOpt,mTag,
+                                                                                                                                       self.dSetAttr3pt[mTag]['tsep']))
         #--------------------------
 
 
@@ -330,8 +345,8 @@ class ITD():
                                 dset_name_bins = 'bins/' + group 
                                 dset_name_mean = 'mean/' + group 
 
-                                h5_file.create_dataset(dset_name_bins, data = self.bins[fit][dkey][ri])
-                                h5_file.create_dataset(dset_name_mean, data = self.mean[fit][dkey][ri],dtype='f')
+                                hdf5io.createDataset(h5_file, dset_name_bins, self.bins[fit][dkey][ri], self.outputPolicy, bins=True)
+                                hdf5io.createDataset(h5_file, dset_name_mean, self.mean[fit][dkey][ri], self.outputPolicy, dtype='f')
                 # End for momentum
 
                 # Write the nu-dependence of the ITD
@@ -340,7 +355,7 @@ class ITD():
                         nuITD = computeNuITD(fit,gamma,ri)                    
                         group = '%s/%s/%s'%(fit,insTag,ri)
                         dset_name_nuMean = 'nuDep/' + group 
-                        h5_file.create_dataset(dset_name_nuMean, data = nuITD)
+                        hdf5io.createDataset(h5_file, dset_name_nuMean, nuITD, self.outputPolicy)
 
         # End for fType
 
@@ -8,8 +8,11 @@ Class definition that performs and holds Plateau (Constant) fit data
 
 import pymela.io.json_io as JSONio
 import pymela.io.file_formats as ioForm
+import pymela.io.hdf5_io as hdf5io
 import pymela.tools.tag_creators as tags
 import pymela.tools.jackknife as jackknife
+import pymela.tools.precision as prec
+import pymela.tools.covariance as covar
 import pymela.fit.constant_fit as constFit
 
 import numpy as np
@@ -20,7 +23,9 @@ import h5py
 #
 class PlateauFit():
     def __init__(self, ratio, ratioType, fitInfo, analysisInfo):
-        self.ratioBins = ratio.bins[ratioType]
+        # The fits are nonlinear, so they need the bins of the ratio, also for ratios kept as JackknifeArrays
+        self.ratioBins = {ri: {mTag: {dkey: jackknife.toBins(bins) for dkey,bins in ratio.bins[ratioType][ri][mTag].items()}
+                               for mTag in ratio.bins[ratioType][ri].keys()} for ri in ratio.bins[ratioType].keys()}
         self.ratioMean = ratio.mean[ratioType]
 
         self.fitInfo = fitInfo
@@ -34,11 +39,15 @@ class PlateauFit():
         self.chiBins = {} # Chi-square of the fit
         self.chiMean = {} # Chi-square of the fit
         self.optimalFit = {} # Structure that holds the optimal plateau fits
+        self.cholesky = {} # The Cholesky factors of the time-time covariance matrices, for correlated fits
         for fitSeq in self.fitInfo:
             fType = fitSeq['Type']
             fLabel = fitSeq['Label']
             if fType != 'Constant':
                 print('PlateauFits: Supports only Constant fits for now!')
+            if 'Correlated' in fitSeq.keys() and fitSeq['Correlated']:
+                shrinkage = fitSeq['Shrinkage'] if 'Shrinkage' in fitSeq.keys() else 0.0
+                self.cholesky[fLabel] = {ri: covar.CholeskyCache(shrinkage) for ri in self.RI}
             self.Mbins[fLabel] = {}
             self.Mmean[fLabel] = {}
             self.chiBins[fLabel] = {}
@@ -58,6 +67,12 @@ class PlateauFit():
 
         self.dSetAttr3pt = ratio.dSetAttr3pt
 
+        # Chunking, compression and storage precision of the HDF5 output
+        self.outputPolicy = hdf5io.getOutputPolicy(self.analysisInfo)
+
+        # Floating-point precision of the analysis
+        self.floatType = prec.getPrecisionType(prec.getPrecision(self.analysisInfo))
+
         # Define required fit structures
         self.fitAttr = {}
         for mom in self.momAvg:
@@ -121,15 +136,25 @@ class PlateauFit():
                                     tstart = fAttr['nf=%d'%(nf)]['tstart']
                                     tstop  = fAttr['nf=%d'%(nf)]['tstop']
 
-                                    self.Mbins[fLabel][ri][mTag][dkey][nf] = np.zeros(self.Nbins,dtype=np.float64)
-                                    self.chiBins[fLabel][ri][mTag][dkey][nf] = np.zeros(self.Nbins,dtype=np.float64)
+                                    self.Mbins[fLabel][ri][mTag][dkey][nf] = np.zeros(self.Nbins,dtype=self.floatType)
+                                    self.chiBins[fLabel][ri][mTag][dkey][nf] = np.zeros(self.Nbins,dtype=self.floatType)
 
-                                    for b in range(self.Nbins):
-                                        data = self.ratioBins[ri][mTag][dkey][b,tstart:tstop+1]
-                                        err  = self.ratioMean[ri][mTag][dkey][1][tstart:tstop+1]
+                                    # Correlated fits of all the bins at once, with one factorization of the covariance matrix for each fit range
+                                    if fLabel in self.cholesky.keys():
+                                        ratioBins = self.ratioBins[ri][mTag][dkey]
+                                        cholFactor = self.cholesky[fLabel][ri].getFactor(mTag,dkey,(tstart,tstop),ratioBins)
+                                        data = ratioBins[:,tstart:tstop+1]
                                         if fType == 'Constant':
-                                            self.Mbins[fLabel][ri][mTag][dkey][nf][b]   = constFit.fit(data,err)
-                                            self.chiBins[fLabel][ri][mTag][dkey][nf][b] = constFit.chiSquare(data,err,self.Mbins[fLabel][ri][mTag][dkey][nf][b])
+                                            self.Mbins[fLabel][ri][mTag][dkey][nf][:]   = constFit.fitCorrelated(data,cholFactor)
+                                            self.chiBins[fLabel][ri][mTag][dkey][nf][:] = constFit.chiSquareCorrelated(data,cholFactor,
+                                                                                                                      self.Mbins[fLabel][ri][mTag][dkey][nf])
+                                    else:
+                                        for b in range(self.Nbins):
+                                            data = self.ratioBins[ri][mTag][dkey][b,tstart:tstop+1]
+                                            err  = self.ratioMean[ri][mTag][dkey][1][tstart:tstop+1]
+                                            if fType == 'Constant':
+                                                self.Mbins[fLabel][ri][mTag][dkey][nf][b]   = constFit.fit(data,err)
+                                                self.chiBins[fLabel][ri][mTag][dkey][nf][b] = constFit.chiSquare(data,err,self.Mbins[fLabel][ri][mTag][dkey][nf][b])
 
                                     self.Mmean[fLabel][ri][mTag][dkey][nf]   = jackknife.mean(self.Mbins[fLabel][ri][mTag][dkey][nf],
                                                                                               Nbins = self.Nbins, Nspl=1)
@@ -174,7 +199,7 @@ class PlateauFit():
                                 # Write optimalFitValues
                                 group = '%s/%s/%s/%s/%s'%(ri,mh5Tag,dispTag,insTag,tsepTag)
                                 dset_name = 'OptimalFitRanges/' + group
-                                h5_file.create_dataset(dset_name, data = np.array([self.optimalFit[fLabel][ri][mTag][dkey]]))
+                                hdf5io.createDataset(h5_file, dset_name, np.array([self.optimalFit[fLabel][ri][mTag][dkey]]), self.outputPolicy)
 
                                 for nf in range(fAttr['Nfits']):
                                     tstart = fAttr['nf=%d'%(nf)]['tstart']
@@ -187,10 +212,10 @@ class PlateauFit():
                                     dset_name_chiBins = 'chiSquare/bins/' + group 
                                     dset_name_chiMean = 'chiSquare/mean/' + group 
 
-                                    h5_file.create_dataset(dset_name_Mbins, data = self.Mbins[fLabel][ri][mTag][dkey][nf])
-                                    h5_file.create_dataset(dset_name_Mmean, data = self.Mmean[fLabel][ri][mTag][dkey][nf],dtype='f')
-                                    h5_file.create_dataset(dset_name_chiBins, data = self.chiBins[fLabel][ri][mTag][dkey][nf])
-                                    h5_file.create_dataset(dset_name_chiMean, data = self.chiMean[fLabel][ri][mTag][dkey][nf],dtype='f')
+                                    hdf5io.createDataset(h5_file, dset_name_Mbins, self.Mbins[fLabel][ri][mTag][dkey][nf], self.outputPolicy, bins=True)
+                                    hdf5io.createDataset(h5_file, dset_name_Mmean, self.Mmean[fLabel][ri][mTag][dkey][nf], self.outputPolicy, dtype='f')
+                                    hdf5io.createDataset(h5_file, dset_name_chiBins, self.chiBins[fLabel][ri][mTag][dkey][nf], self.outputPolicy, bins=True)
+                                    hdf5io.createDataset(h5_file, dset_name_chiMean, self.chiMean[fLabel][ri][mTag][dkey][nf], self.outputPolicy, dtype='f')
             # End for momentum
             print('Plateau fitting data for type = %s, label = %s written in HDF5.'%(fType,fLabel))
         # End dumpHDF5 ----------------
@@ -8,8 +8,10 @@ Class definition that holds the ratio of three- to two-point functions
 
 import pymela.io.json_io as JSONio
 import pymela.io.file_formats as ioForm
+import pymela.io.hdf5_io as hdf5io
 import pymela.tools.tag_creators as tags
 import pymela.tools.jackknife as jackknife
+import pymela.tools.precision as prec
 
 import numpy as np
 import h5py
@@ -31,7 +33,8 @@ class ThreeToTwoPointCorrRatio():
         # Ratio types
         self.ratioTypes = ['plain','sum','r-sum']
 
-        # Data containers        
+        # Data containers
+        # The summed and reduced-summed ratios are JackknifeArrays, see jackknife.JackknifeArray
         self.bins = {}
         self.mean = {}
         for t in self.ratioTypes:
@@ -51,6 +54,7 @@ class ThreeToTwoPointCorrRatio():
 
         self.momAvg = self.c2pt.momAvg
         self.Nbins = self.c2pt.Nbins
+        self.binsize = self.c3pt.binsize
 
         self.gammaList   = self.c3pt.gammaList
 
@@ -58,6 +62,12 @@ class ThreeToTwoPointCorrRatio():
 
         self.dSetAttr3pt = self.c3pt.dSetAttr
         self.dSetAttr2pt = self.c2pt.dSetAttr
+
+        # Chunking, compression and storage precision of the HDF5 output
+        self.outputPolicy = hdf5io.getOutputPolicy(self.analysisInfo)
+
+        # Floating-point precision of the analysis
+        self.floatType = prec.getPrecisionType(prec.getPrecision(self.analysisInfo))
     # End __init__() -------------
 
     def evaluate(self):
@@ -74,6 +84,9 @@ class ThreeToTwoPointCorrRatio():
                     self.bins[t][ri][mTag] = {}
                     self.mean[t][ri][mTag] = {}
 
+            # The ratio is nonlinear, so it is evaluated on the bins of the two- and three-point functions
+            c2ptBins = self.c2pt.bins[mTag].bins()
+
             for its, tsep in enumerate(tsepList):
                 Ntins = tsep
                 for z3 in dispListAvg:
@@ -81,20 +94,17 @@ class ThreeToTwoPointCorrRatio():
                         dkey = (tsep,z3,gamma)
 
                         for ri in self.RI:
-                            self.bins['plain'][ri][mTag][dkey] = np.zeros((self.Nbins,Ntins),dtype = np.float64)
-                            self.bins['sum'][ri][mTag][dkey]   = np.zeros(self.Nbins,dtype = np.float64)
-
-                            for tins in range(Ntins):
-                                # Plain ratio
-                                self.bins['plain'][ri][mTag][dkey][:,tins] = (self.c3pt.bins[ri][mTag][dkey][:,tins] /
-                                                                              self.c2pt.bins[mTag][:,tsep])
+                            # Plain ratio
+                            self.bins['plain'][ri][mTag][dkey] = np.zeros((self.Nbins,Ntins),dtype = self.floatType)
+                            self.bins['plain'][ri][mTag][dkey][:] = self.c3pt.bins[ri][mTag][dkey].bins() / c2ptBins[:,tsep:tsep+1]
 
-                                # Summed ratio
-                                if tins>0: # Exclude source contact term
-                                    self.bins['sum'][ri][mTag][dkey] += self.bins['plain'][ri][mTag][dkey][:,tins]
+                            # Summed ratio, excluding the source contact term. The sum is linear in the plain ratio, so it is
+                            # carried out on the JackknifeArray of the plain ratio
+                            plainJk = jackknife.JackknifeArray.fromBins(self.bins['plain'][ri][mTag][dkey][:,1:], self.binsize)
+                            self.bins['sum'][ri][mTag][dkey] = plainJk.sum(axis=0)
 
                             self.mean['plain'][ri][mTag][dkey] = jackknife.mean(self.bins['plain'][ri][mTag][dkey],self.Nbins, Nspl=Ntins)
-                            self.mean['sum'][ri][mTag][dkey]   = jackknife.mean(self.bins['sum'][ri][mTag][dkey]  ,self.Nbins, Nspl=1)
+                            self.mean['sum'][ri][mTag][dkey]   = self.bins['sum'][ri][mTag][dkey].mean()
             # End for tsep
 
 
@@ -110,7 +120,7 @@ class ThreeToTwoPointCorrRatio():
                         for ri in self.RI:
                             self.bins['r-sum'][ri][mTag][dkey] = ((self.bins['sum'][ri][mTag][dkeyH] - self.bins['sum'][ri][mTag][dkeyL]) / 
                                                                     (tsepH - tsepL))
-                            self.mean['r-sum'][ri][mTag][dkey] = jackknife.mean(self.bins['r-sum'][ri][mTag][dkey],self.Nbins, Nspl=1)                                
+                            self.mean['r-sum'][ri][mTag][dkey] = self.bins['r-sum'][ri][mTag][dkey].mean()
 
             print('Ratio evaluation for %s completed'%(mTag))
         # End for momentum
@@ -148,15 +158,15 @@ class ThreeToTwoPointCorrRatio():
                             dset_name_bins = 'bins/' + group 
                             dset_name_mean = 'mean/' + group 
 
-                            h5_file.create_dataset(dset_name_bins, data = self.bins[rType][ri][mTag][dkey])
-                            h5_file.create_dataset(dset_name_mean, data = self.mean[rType][ri][mTag][dkey],dtype='f')
+                            hdf5io.createDataset(h5_file, dset_name_bins, self.bins[rType][ri][mTag][dkey], self.outputPolicy, bins=True)
+                            hdf5io.createDataset(h5_file, dset_name_mean, self.mean[rType][ri][mTag][dkey], self.outputPolicy, dtype='f')
                             #---------------------------------------------------------------
 
                             # Write the summed ratio bins
                             rType = 'sum'
                             group = '%s/%s/%s/%s/%s/%s'%(rType,mh5Tag,tsepTag,dispTag,insTag,ri)
                             dset_name_bins = 'bins/' + group
-                            h5_file.create_dataset(dset_name_bins, data = self.bins[rType][ri][mTag][dkey])
+                            hdf5io.createDataset(h5_file, dset_name_bins, self.bins[rType][ri][mTag][dkey].bins(), self.outputPolicy, bins=True)
 
                             # Convert the summed ratio mean into arrays that depend on tsep
                             sumRatioH5[0][its] = tsep # tsep (x)
@@ -168,7 +178,7 @@ class ThreeToTwoPointCorrRatio():
                         rType = 'sum'
                         group = '%s/%s/%s/%s/%s'%(rType,mh5Tag,dispTag,insTag,ri)
                         dset_name_mean = 'mean/' + group
-                        h5_file.create_dataset(dset_name_mean, data = sumRatioH5, dtype='f')
+                        hdf5io.createDataset(h5_file, dset_name_mean, sumRatioH5, self.outputPolicy, dtype='f')
                         #-----------------------------
 
 
@@ -182,7 +192,7 @@ class ThreeToTwoPointCorrRatio():
                             rType = 'r-sum'
                             group = '%s/%s/%s/%s/%s/%s'%(rType,mh5Tag,tsepTag,dispTag,insTag,ri)
                             dset_name_bins = 'bins/' + group
-                            h5_file.create_dataset(dset_name_bins, data = self.bins[rType][ri][mTag][dkey])
+                            hdf5io.createDataset(h5_file, dset_name_bins, self.bins[rType][ri][mTag][dkey].bins(), self.outputPolicy, bins=True)
 
                             # Convert the reduced-summed ratio mean into arrays that depend on tsep
                             rSumRatioH5[0][its] = tsep # tsep (x)
@@ -194,7 +204,7 @@ class ThreeToTwoPointCorrRatio():
                         rType = 'r-sum'
                         group = '%s/%s/%s/%s/%s'%(rType,mh5Tag,dispTag,insTag,ri)
                         dset_name_mean = 'mean/' + group
-                        h5_file.create_dataset(dset_name_mean, data = rSumRatioH5, dtype='f')
+                        hdf5io.createDataset(h5_file, dset_name_mean, rSumRatioH5, self.outputPolicy, dtype='f')
                        #-----------------------------
         # End for momentum
 
@@ -8,8 +8,11 @@ Class definition that performs and holds Linear fit data on the Summed ratio
 
 import pymela.io.json_io as JSONio
 import pymela.io.file_formats as ioForm
+import pymela.io.hdf5_io as hdf5io
 import pymela.tools.tag_creators as tags
 import pymela.tools.jackknife as jackknife
+import pymela.tools.precision as prec
+import pymela.tools.covariance as covar
 import pymela.fit.linear_fit as linearFit
 
 import numpy as np
@@ -21,7 +24,9 @@ import scipy.optimize as scipyOpt
 #
 class SummationFit():
     def __init__(self, ratio, ratioType, fitInfo, analysisInfo):
-        self.ratioBins = ratio.bins[ratioType]
+        # The fits are nonlinear, so they need the bins of the ratio, also for ratios kept as JackknifeArrays
+        self.ratioBins = {ri: {mTag: {dkey: jackknife.toBins(bins) for dkey,bins in ratio.bins[ratioType][ri][mTag].items()}
+                               for mTag in ratio.bins[ratioType][ri].keys()} for ri in ratio.bins[ratioType].keys()}
         self.ratioMean = ratio.mean[ratioType]
 
         self.fitInfo = fitInfo # The list of types of fits
@@ -48,6 +53,13 @@ class SummationFit():
         self.chiBins = {} # Chi-square of the fit
         self.chiMean = {} # Chi-square of the fit
 
+        # The Cholesky factors of the tsep-tsep covariance matrices, for correlated fits
+        self.cholesky = {}
+        for fitSeq in self.fitInfo:
+            if 'Correlated' in fitSeq.keys() and fitSeq['Correlated']:
+                shrinkage = fitSeq['Shrinkage'] if 'Shrinkage' in fitSeq.keys() else 0.0
+                self.cholesky[fitSeq['Label']] = {ri: covar.CholeskyCache(shrinkage) for ri in self.RI}
+
         # The structure that holds the fit bands
         self.fitBands = {}
 
@@ -94,6 +106,12 @@ class SummationFit():
 
         self.dSetAttr3pt = ratio.dSetAttr3pt
 
+        # Chunking, compression and storage precision of the HDF5 output
+        self.outputPolicy = hdf5io.getOutputPolicy(self.analysisInfo)
+
+        # Floating-point precision of the analysis
+        self.floatType = prec.getPrecisionType(prec.getPrecision(self.analysisInfo))
+
         print('Summation Fits initialized')
     # End __init__() -------------
 
@@ -128,31 +146,46 @@ class SummationFit():
                         for z3 in dispListAvg:
                             for gamma in self.gammaList:
                                 dkeyF = (z3,gamma)
-                                self.chiBins[fLabel][sLTag][ri][mTag][dkeyF]  = np.zeros(self.Nbins,dtype=np.float64)                                   
+                                self.chiBins[fLabel][sLTag][ri][mTag][dkeyF]  = np.zeros(self.Nbins,dtype=self.floatType)                                   
                                 for fP in fPrmList:
                                     fpTag = fP + '_%s'%(sLTag)
-                                    self.bins[fLabel][fpTag][ri][mTag][dkeyF] = np.zeros(self.Nbins,dtype=np.float64)
-
-                                # Perform the fits for each bin
-                                for b in range(self.Nbins):
-                                    ydata = np.zeros(Nfdata,dtype=np.float64)
-                                    yerr  = np.zeros(Nfdata,dtype=np.float64)
-
-                                    # Fill in fit data
-                                    for itL, tL in enumerate(self.tsepFitX[fLabel][mTag][sLTag]):
-                                        dkey = (tL,z3,gamma)
-                                        ydata[itL] = self.ratioBins[ri][mTag][dkey][b]
-                                        yerr[itL]  = self.ratioMean[ri][mTag][dkey][1]
-
-                                    # Perform the fit
-                                    fprmRes, covRes = scipyOpt.curve_fit(linearFit.model, xData, ydata, sigma=yerr)
-
-                                    self.chiBins[fLabel][sLTag][ri][mTag][dkeyF][b] = linearFit.chiSquare(xData, ydata, yerr,
-                                                                                                          fprmRes[0],fprmRes[1])
-                                    for ifP, fP in enumerate(fPrmList):
+                                    self.bins[fLabel][fpTag][ri][mTag][dkeyF] = np.zeros(self.Nbins,dtype=self.floatType)
+
+                                # Correlated fits of all the bins at once, with one factorization of the covariance matrix for each tsepLow
+                                if fLabel in self.cholesky.keys():
+                                    sumBins = np.stack([self.ratioBins[ri][mTag][(tsep,z3,gamma)] for tsep in tsepList], axis=-1)
+                                    rng = (tsepList.index(xData[0]), len(tsepList)-1)
+                                    cholFactor = self.cholesky[fLabel][ri].getFactor(mTag,dkeyF,rng,sumBins)
+                                    yBins = sumBins[:,rng[0]:]
+                                    Mbins, bbins = linearFit.fitCorrelated(xData, yBins, cholFactor)
+
+                                    self.chiBins[fLabel][sLTag][ri][mTag][dkeyF][:] = linearFit.chiSquareCorrelated(xData, yBins, cholFactor,
+                                                                                                                    Mbins, bbins)
+                                    for fP,fprmBins in zip(fPrmList,[Mbins,bbins]):
                                         fpTag = fP + '_%s'%(sLTag)
-                                        self.bins[fLabel][fpTag][ri][mTag][dkeyF][b] = fprmRes[ifP]
-                                # End for bins
+                                        self.bins[fLabel][fpTag][ri][mTag][dkeyF][:] = fprmBins
+                                else:
+                                    # Perform the fits for each bin
+                                    # The fits of scipy are carried out in float64, whatever the precision of the analysis
+                                    for b in range(self.Nbins):
+                                        ydata = np.zeros(Nfdata,dtype=np.float64)
+                                        yerr  = np.zeros(Nfdata,dtype=np.float64)
+
+                                        # Fill in fit data
+                                        for itL, tL in enumerate(self.tsepFitX[fLabel][mTag][sLTag]):
+                                            dkey = (tL,z3,gamma)
+                                            ydata[itL] = self.ratioBins[ri][mTag][dkey][b]
+                                            yerr[itL]  = self.ratioMean[ri][mTag][dkey][1]
+
+                                        # Perform the fit
+                                        fprmRes, covRes = scipyOpt.curve_fit(linearFit.model, xData, ydata, sigma=yerr)
+
+                                        self.chiBins[fLabel][sLTag][ri][mTag][dkeyF][b] = linearFit.chiSquare(xData, ydata, yerr,
+                                                                                                              fprmRes[0],fprmRes[1])
+                                        for ifP, fP in enumerate(fPrmList):
+                                            fpTag = fP + '_%s'%(sLTag)
+                                            self.bins[fLabel][fpTag][ri][mTag][dkeyF][b] = fprmRes[ifP]
+                                    # End for bins
 
                                 # Jackknife averages
                                 self.chiMean[fLabel][sLTag][ri][mTag][dkeyF] = jackknife.mean(self.chiBins[fLabel][sLTag][ri][mTag][dkeyF],
@@ -212,7 +245,7 @@ class SummationFit():
                                     self.fitBands[fLabel][sLTag][ri][mTag][dkeyF]['v'][ix] = linearFit.model(x,Mmean,bmean)
 
                                     # Determine error band
-                                    errBand = np.zeros(self.Nbins,dtype=np.float64)
+                                    errBand = np.zeros(self.Nbins,dtype=self.floatType)
                                     for ib in range(self.Nbins):
                                         Mbins = self.bins[fLabel][MTag][ri][mTag][dkeyF][ib]
                                         bbins = self.bins[fLabel][bTag][ri][mTag][dkeyF][ib]
@@ -257,15 +290,15 @@ class SummationFit():
                                 group = '%s/%s/%s/%s/%s'%(ri,mh5Tag,dispTag,insTag,h5LabelT)
                                 dset_name_chiBins = 'chiSquare/bins/' + group 
                                 dset_name_chiMean = 'chiSquare/mean/' + group
-                                h5_file.create_dataset(dset_name_chiBins, data = self.chiBins[fLabel][sLTag][ri][mTag][dkeyF])
-                                h5_file.create_dataset(dset_name_chiMean, data = self.chiMean[fLabel][sLTag][ri][mTag][dkeyF],dtype='f')
+                                hdf5io.createDataset(h5_file, dset_name_chiBins, self.chiBins[fLabel][sLTag][ri][mTag][dkeyF], self.outputPolicy, bins=True)
+                                hdf5io.createDataset(h5_file, dset_name_chiMean, self.chiMean[fLabel][sLTag][ri][mTag][dkeyF], self.outputPolicy, dtype='f')
 
                                 # Write fit bands
                                 dset_name_fitBands = 'fitBands/' + group
-                                h5_file.create_dataset(dset_name_fitBands, data = (self.fitBands[fLabel][sLTag][ri][mTag][dkeyF]['x'],
+                                hdf5io.createDataset(h5_file, dset_name_fitBands, (self.fitBands[fLabel][sLTag][ri][mTag][dkeyF]['x'],
                                                                                    self.fitBands[fLabel][sLTag][ri][mTag][dkeyF]['v'],
                                                                                    self.fitBands[fLabel][sLTag][ri][mTag][dkeyF]['e']),
-                                                       dtype='f')
+                                                     self.outputPolicy, dtype='f')
 
                                 # Write Fit parameters
                                 for fP,fpH5 in zip(self.fitParams[fType],self.fitParamsH5[fType]):
@@ -273,8 +306,8 @@ class SummationFit():
 
                                     dset_name_bins = '%s/bins/'%(fpH5) + group 
                                     dset_name_mean = '%s/mean/'%(fpH5) + group
-                                    h5_file.create_dataset(dset_name_bins, data = self.bins[fLabel][fpTag][ri][mTag][dkeyF])
-                                    h5_file.create_dataset(dset_name_mean, data = self.mean[fLabel][fpTag][ri][mTag][dkeyF],dtype='f')
+                                    hdf5io.createDataset(h5_file, dset_name_bins, self.bins[fLabel][fpTag][ri][mTag][dkeyF], self.outputPolicy, bins=True)
+                                    hdf5io.createDataset(h5_file, dset_name_mean, self.mean[fLabel][fpTag][ri][mTag][dkeyF], self.outputPolicy, dtype='f')
             # End for momentum
             print('Summation fitting data for type = %s, label = %s written in HDF5.'%(fType,fLabel))
         # End dumpLinearFitsHDF5 ----------------
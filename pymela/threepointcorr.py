@@ -8,11 +8,21 @@ Class definition that holds data and manipulates Three-point correlation functio
 
 import pymela.io.json_io as JSONio
 import pymela.io.file_formats as ioForm
+import pymela.io.ascii_io as ASCIIio
+import pymela.io.ascii_cache as ASCIIcache
+import pymela.io.manifest as manifest
+import pymela.io.journal as journal
+import pymela.io.hdf5_io as hdf5io
+import pymela.io.append_store as appendio
 import pymela.tools.tag_creators as tags
 import pymela.tools.jackknife as jackknife
+import pymela.tools.precision as prec
+import pymela.tools.autocorrelation as autocorr
 import pymela.tools.gamma as gmat
+from pymela.io.pipeline import PrefetchReader, defaultQueueSize
 
 
+import os
 import numpy as np
 import h5py
 
@@ -44,33 +54,54 @@ class ThreePointCorrelator():
         self.plainData = {}   
         self.plainBins = {}
         self.plainMean = {}
+        self.plainBinSums = {} # The sums of the plain data within each Jackknife bin, when they are kept in an append store
 
         # The averaged data over t0, src-snk operators and rows
         self.avgData = {}
-        self.avgBins = {}
+        self.avgBins = {} # JackknifeArrays, see jackknife.JackknifeArray
         self.avgMean = {}
 
+        # The sums of the plain data, and of their JackknifeArrays, that give the averaged data
+        # They are kept as they are by doStatistics(), which can be called again after the data have been accumulated while reading
+        self.avgSum = {}
+        self.avgBinsSum = {}
+
         # The momentum- and z3-averaged data, that will be used throughout the analysis
         self.data = {}
-        self.bins = {}
+        self.bins = {} # JackknifeArrays
         self.mean = {}
+        self.tauInt = {} # The integrated autocorrelation time of the momentum- and z3-averaged data, and its error
 
         for ri in self.RI:
             self.plainData[ri] = {}
             self.plainBins[ri] = {}
             self.plainMean[ri] = {}
+            self.plainBinSums[ri] = {}
             self.avgData[ri] = {}
             self.avgBins[ri] = {}
             self.avgMean[ri] = {}
+            self.avgSum[ri] = {}
+            self.avgBinsSum[ri] = {}
             self.data[ri] = {}
             self.bins[ri] = {}
             self.mean[ri] = {}
+            self.tauInt[ri] = {}
 
         # The number of Jackknife bins, and the binsize (same for plain and averaged data)
         self.Nbins = 0     
         self.binsize = self.analysisInfo['Binsize']
 
+        # Floating-point precision of the parsed ASCII data and of the statistical analysis
+        self.precision = prec.getPrecision(self.analysisInfo)
+        self.floatType = prec.getPrecisionType(self.precision)
+        self.complexType = prec.getComplexType(self.precision)
+
+        # Autocorrelation analysis of the momentum- and z3-averaged data, see autocorrelation.py
+        self.autocorrPolicy = autocorr.getPolicy(self.analysisInfo)
+
         self.dataLoaded = False
+        self.plainAccumulated = False # Whether the plain data have been sampled and accumulated while reading
+        self.h5Input = None # The input HDF5 file, kept open while there are lazy plain data, see close()
 
         self.supportedDataSources = ['ASCII','HDF5']
 
@@ -85,18 +116,96 @@ class ThreePointCorrelator():
         if self.dataSource == 'HDF5' and 'HDF5 File' not in self.dataInfo['Input Data'].keys():
             raise ValueError('\n"HDF5 File" must be provided in "Input Data" when data source is "HDF5"')        
 
+        # Number of processes used to read the ASCII files, serial reading by default
+        self.Nworkers = self.dataInfo['Input Data']['Workers'] if 'Workers' in self.dataInfo['Input Data'].keys() else 1
+        if type(self.Nworkers) != int or self.Nworkers < 1:
+            raise ValueError('\n"Workers" in "Input Data" must be a positive integer')
+
+        # Layout of the HDF5 output file
+        self.outputLayout = self.dataInfo['HDF5 Output Layout'] if 'HDF5 Output Layout' in self.dataInfo.keys() else 'tree'
+        if self.outputLayout not in hdf5io.supportedLayouts:
+            raise ValueError('\nUnsupported "HDF5 Output Layout" = %s. Supported layouts are: %s'%(self.outputLayout,hdf5io.supportedLayouts))
+
+        # Chunking, compression and storage precision of the HDF5 output
+        self.outputPolicy = hdf5io.getOutputPolicy(self.analysisInfo)
+
+        # Directory of the binary cache store of the ASCII data, no caching by default
+        self.cacheDir = self.dataInfo['Input Data']['Cache Directory'] if 'Cache Directory' in self.dataInfo['Input Data'].keys() else None
+
+        # Lazy mode: the plain data are read from the HDF5 file only when they are accessed
+        self.lazy = self.dataInfo['Input Data']['Lazy'] if 'Lazy' in self.dataInfo['Input Data'].keys() else False
+        if self.lazy and self.dataSource != 'HDF5':
+            raise ValueError('\n"Lazy" mode is supported only when data source is "HDF5"')
+
+        # Pipeline mode: the ASCII files are read in the background while the data already read are being sampled
+        self.pipeline = False
+        if 'Pipeline' in self.dataInfo['Input Data'].keys():
+            self.pipeline = self.dataInfo['Input Data']['Pipeline']['Enable']
+            self.pipelineQueueSize = self.dataInfo['Input Data']['Pipeline'].get('Queue Size', defaultQueueSize)
+            if type(self.pipelineQueueSize) != int or self.pipelineQueueSize < 1:
+                raise ValueError('\n"Queue Size" of "Pipeline" must be a positive integer')
+            if self.pipeline and self.dataSource != 'ASCII':
+                raise ValueError('\n"Pipeline" mode is supported only when data source is "ASCII"')
+
+        # Streaming mode: each plain dataset is folded into the averaged data as soon as it is read, and then it is discarded
+        self.streaming = self.dataInfo['Input Data']['Streaming'] if 'Streaming' in self.dataInfo['Input Data'].keys() else False
+        if self.streaming and self.dataSource != 'ASCII':
+            raise ValueError('\n"Streaming" mode is supported only when data source is "ASCII"')
+
+        # Whether to perform Jackknife sampling on the plain data. By default this is done unless in streaming mode
+        self.plainStatistics = self.dataInfo['Plain Statistics'] if 'Plain Statistics' in self.dataInfo.keys() else not self.streaming
+
+        # Ingestion journal: each completed block of ASCII files is checkpointed in this directory, so that a restarted run resumes from there
+        self.journalDir = self.dataInfo['Input Data']['Journal Directory'] if 'Journal Directory' in self.dataInfo['Input Data'].keys() else None
+        self.journalBlockSize = (self.dataInfo['Input Data']['Journal Block Size'] if 'Journal Block Size' in self.dataInfo['Input Data'].keys()
+                                 else journal.defaultBlockSize)
+        if self.journalDir is not None and (self.dataSource != 'ASCII' or self.pipeline or self.streaming or self.cacheDir is not None):
+            raise ValueError('\n"Journal Directory" is supported only when data source is "ASCII", without "Pipeline", "Streaming" or "Cache Directory"')
+        if type(self.journalBlockSize) != int or self.journalBlockSize < 1:
+            raise ValueError('\n"Journal Block Size" in "Input Data" must be a positive integer')
+
+        # Layout of the insertions in the ASCII files
+        #   'separate': One file for each insertion (the default)
+        #   'combined': One file holds all the insertions listed in "Combined Insertions", as (Re,Im) column pairs in that order
+        self.insertionLayout = self.dataInfo['Input Data']['Insertion Layout'] if 'Insertion Layout' in self.dataInfo['Input Data'].keys() else 'separate'
+        if self.insertionLayout not in ['separate','combined']:
+            raise ValueError('\nUnsupported "Insertion Layout" = %s. Supported layouts are: %s'%(self.insertionLayout,['separate','combined']))
+        self.combinedInsertions = None
+        if self.insertionLayout == 'combined':
+            if 'Combined Insertions' not in self.dataInfo['Input Data'].keys():
+                raise ValueError('\n"Combined Insertions" must be provided in "Input Data" when "Insertion Layout" is "combined"')
+            self.combinedInsertions = self.dataInfo['Input Data']['Combined Insertions']
+            for gamma in self.dataInfo['Insertion Operators']:
+                if gamma not in self.combinedInsertions:
+                    raise ValueError('\nInsertion %s is not in the "Combined Insertions" %s'%(gamma,self.combinedInsertions))
+
+        # Append store: HDF5 store of the plain data, to which only the configurations newly added in the ASCII files are appended
+        self.appendStoreFile = self.dataInfo['Input Data']['Append Store'] if 'Append Store' in self.dataInfo['Input Data'].keys() else None
+        if self.appendStoreFile is not None and (self.dataSource != 'ASCII' or self.pipeline or self.streaming or self.cacheDir is not None or
+                                                 self.journalDir is not None or self.insertionLayout != 'separate'):
+            raise ValueError('\n"Append Store" is supported only when data source is "ASCII", without "Pipeline", "Streaming", "Cache Directory"'
+                             ' or "Journal Directory", and with one file for each insertion')
+
+        # Subset of the configurations for a quick look at the data, all of them by default
+        self.cfgSlice = JSONio.getConfigSlice(self.analysisInfo)
+        if self.cfgSlice is not None and self.appendStoreFile is not None:
+            raise ValueError('\n"Append Store" cannot be used together with "Config Range"/"Config Stride"')
+
         # Fill in Attributes
         self.Nvec = self.analysisInfo['Nvec']
 
+        # Restrict the data to a subset of the attributes, such that the rest are never read
+        self.selection = JSONio.getSelection(self.dataInfo, ['Mom List','t0','tsep','disp','Insertion Operators'])
+
         # The list of insertion operators we are considering
-        self.gammaList = self.dataInfo['Insertion Operators']
+        self.gammaList = JSONio.applySelection(self.dataInfo['Insertion Operators'], self.selection, 'Insertion Operators')
 
         self.moms  = []
         self.dispAvg = {}
         self.dSetAttr = {}
         self.dSetList = self.dataInfo['Datasets']
         for dSet in self.dSetList:
-            momList = dSet['Mom List']
+            momList = [mom for mom in dSet['Mom List'] if 'Mom List' not in self.selection.keys() or mom in self.selection['Mom List']]
 
             if dSet['Compute X-rows']:
                 raise ValueError('Does not support doing cross-rows in two-point function for now!')
@@ -110,7 +219,15 @@ class ThreePointCorrelator():
                 self.moms.append(momVec)
 
                 for attr in ['t0','Ncfg','tsep','disp','Nrows','Compute X-rows','Phase Info']:
-                    self.dSetAttr[mTag][attr] = dSet[attr]
+                    self.dSetAttr[mTag][attr] = JSONio.applySelection(dSet[attr], self.selection, attr)
+
+                # Quick-look mode: only a subset of the configurations is read and analyzed
+                self.dSetAttr[mTag]['Ncfg File'] = dSet['Ncfg']
+                if self.cfgSlice is not None:
+                    self.dSetAttr[mTag]['Ncfg'] = len(range(dSet['Ncfg'])[self.cfgSlice])
+                    if jackknife.Nbins(self.dSetAttr[mTag]['Ncfg'],self.binsize) < 2:
+                        raise ValueError('\n"Config Range"/"Config Stride" leave %d configurations, too few for Jackknife sampling with binsize = %d'%(
+                                         self.dSetAttr[mTag]['Ncfg'],self.binsize))
 
                 # Determine the values of z3 that we will average over
                 self.dispAvg[mTag] = list(dict.fromkeys(np.abs(self.dSetAttr[mTag]['disp'])))
@@ -125,6 +242,9 @@ class ThreePointCorrelator():
                         self.dSetAttr[mTag]['intOpList'].append((op.split()[0],op.split()[1]))
                 self.dSetAttr[mTag]['Nop'] = len(ops)
 
+        if len(self.moms) == 0:
+            raise ValueError('\n"Selection" of "Mom List" = %s leaves no momenta in "Datasets"'%(self.selection['Mom List']))
+
         # Get the momenta that will be averaged over        
         self.momAvg = [[0,0,zm] for zm in list(dict.fromkeys(np.abs([z for x,y,z in self.moms])))]
         self.momAvg.sort()
@@ -150,76 +270,223 @@ class ThreePointCorrelator():
         print('\n Will average over the displacement values for each momentum:', self.dispAvg)
     #-------------------------------
 
+    # The list of (fkey, file name) of the ASCII data for a given momentum
+    # The file key fkey is the dkey of the dataset, or the dkey without the insertion when the insertions are combined in the files
+    def getFileListASCII(self, mom):
+        mainDir = self.dataInfo['Input Data']['Main Directory']
+
+        mTag = tags.momString(mom)
+        mFTag = tags.momFile(mom)
+        t0List = self.dSetAttr[mTag]['t0']
+        tsepList = self.dSetAttr[mTag]['tsep']
+        dispList = self.dSetAttr[mTag]['disp']
+        Nrows = self.dSetAttr[mTag]['Nrows']
+        phaseInfo = self.dSetAttr[mTag]['Phase Info']
+
+        # Determine phase tag based on momentum sign
+        if list(phaseInfo.keys())[0] == 'unphased':
+            phFile = phaseInfo['unphased']
+            phDir = 'unphased'
+        elif list(phaseInfo.keys())[0] == 'phased':
+            phFile = phaseInfo['phased']['Plus'] if mom[2] >= 0 else phaseInfo['phased']['Minus']
+            phDir = 'phased/' + phFile
+        else:
+            raise ValueError('Supported Phase Tag keys are ["unphased","phased"]')
+
+        fileList = []
+        for tsep in tsepList:
+            tsepTag = tags.tsep(tsep)
+            for t0 in t0List:
+                t0Tag = tags.t0(t0)
+                fileDir = ioForm.getThreePointDirASCII(mainDir,phDir,t0Tag,tsepTag,mFTag)
+                for z3 in dispList:
+                    dispTag = tags.disp(z3)
+                    for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
+                        srcOp,snkOp = opPair
+                        for row in range(1,Nrows+1):
+                            if self.insertionLayout == 'combined':
+                                fileName = ioForm.getThreePointCombinedFileNameASCII(phFile,t0Tag,tsepTag,srcOp,snkOp,row,
+                                                                                     mFTag,dispTag,self.Nvec)
+                                fileList.append(((tsep,t0,z3,iop,row),'%s/%s'%(fileDir,fileName)))
+                                continue
+
+                            for gamma in self.gammaList:
+                                dkey = (tsep,t0,z3,iop,row,gamma)
+
+                                # Determine gamma matrix name and row
+                                insOp,insRow = gmat.insertionMap(gamma)
+
+                                fileName = ioForm.getThreePointFileNameASCII(phFile,t0Tag,tsepTag,
+                                                                             srcOp,snkOp,row,insOp,insRow,
+                                                                             mFTag,dispTag,self.Nvec)
+                                fileList.append((dkey,'%s/%s'%(fileDir,fileName)))
+
+        return fileList
+    #-------------------------------
+
+    # Place the data read from an ASCII file in the plain data containers
+    # Returns the dkeys of the datasets held in the file
+    def setPlainDataASCII(self, mTag, fkey, rawData):
+        if self.insertionLayout == 'combined':
+            dkeyList = []
+            for gamma in self.gammaList:
+                dkey = fkey + (gamma,)
+                rawIns = rawData[self.combinedInsertions.index(gamma)]
+                self.plainData['Re'][mTag][dkey] = rawIns.real
+                self.plainData['Im'][mTag][dkey] = rawIns.imag
+                dkeyList.append(dkey)
+            return dkeyList
+
+        self.plainData['Re'][mTag][fkey] = rawData.real
+        self.plainData['Im'][mTag][fkey] = rawData.imag
+        return [fkey]
+    #-------------------------------
+
     def getData(self):
         
         def getDataASCII():
             print('\nWill read data from ASCII files')
 
-            mainDir = self.dataInfo['Input Data']['Main Directory']
-
+            # Determine the files that will be read, for each momentum, and check them all before any parsing starts
+            entries = []
             for mom in self.moms:
                 mTag = tags.momString(mom)
-                mFTag = tags.momFile(mom)
-                t0List = self.dSetAttr[mTag]['t0']
-                tsepList = self.dSetAttr[mTag]['tsep']
-                dispList = self.dSetAttr[mTag]['disp']
-                Nrows = self.dSetAttr[mTag]['Nrows']
-                Ncfg = self.dSetAttr[mTag]['Ncfg']
-                phaseInfo = self.dSetAttr[mTag]['Phase Info']
-
-                # Determine phase tag based on momentum sign
-                if list(phaseInfo.keys())[0] == 'unphased':
-                    phFile = phaseInfo['unphased']
-                    phDir = 'unphased'
-                elif list(phaseInfo.keys())[0] == 'phased':
-                    phFile = phaseInfo['phased']['Plus'] if mom[2] >= 0 else phaseInfo['phased']['Minus']
-                    phDir = 'phased/' + phFile
-                else:
-                    raise ValueError('Supported Phase Tag keys are ["unphased","phased"]')
-
                 for ri in self.RI:
                     self.plainData[ri][mTag] = {}
-
-                for tsep in tsepList:
-                    Nt = tsep
-                    tsepTag = tags.tsep(tsep)
-                    for t0 in t0List:
-                        t0Tag = tags.t0(t0)
-                        fileDir = ioForm.getThreePointDirASCII(mainDir,phDir,t0Tag,tsepTag,mFTag)
-                        print('Reading three-point data for momentum %s, tsep = %d, t0 = %d'%(mTag,tsep,t0))
-                        for z3 in dispList:
-                            dispTag = tags.disp(z3)
-                            for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
-                                srcOp,snkOp = opPair
-                                for row in range(1,Nrows+1):
-
-                                    for gamma in self.gammaList:
-                                        dkey = (tsep,t0,z3,iop,row,gamma)
-
-                                        # Determine gamma matrix name and row
-                                        insOp,insRow = gmat.insertionMap(gamma)
-
-                                        fileName = ioForm.getThreePointFileNameASCII(phFile,t0Tag,tsepTag,
-                                                                                     srcOp,snkOp,row,insOp,insRow,
-                                                                                     mFTag,dispTag,self.Nvec)
-                                        fileRead = '%s/%s'%(fileDir,fileName)
-                                        
-                                        rawData = np.zeros((Ncfg,Nt), dtype=np.complex128)
-                                        with open(fileRead) as fp:
-                                            line = fp.readlines()
-                                            c = 0
-                                            for n in line:
-                                                it   = c%Nt
-                                                icfg = c//Nt
-                                                rawData[icfg,it] = complex(np.float128(n.split()[1]),
-                                                                           np.float128(n.split()[2]))
-                                                c += 1
-                                        # Done reading file
-
-                                        self.plainData['Re'][mTag][dkey] = rawData.real
-                                        self.plainData['Im'][mTag][dkey] = rawData.imag
-
-                print('Reading three-point data for momentum %s completed.\n'%(mTag))
+                Ncfg = self.dSetAttr[mTag]['Ncfg File']
+                entries += [((mTag,fkey),fileName,Ncfg*fkey[0]) for fkey,fileName in self.getFileListASCII(mom)] # The time extent of each file is tsep
+
+            fileList = {tags.momString(mom): [] for mom in self.moms}
+            for (mTag,fkey),fileName,Nrows in manifest.scanManifest(entries, 'Three-point'):
+                fileList[mTag].append((fkey,fileName))
+
+            # Number of insertions in each file
+            Nins = len(self.combinedInsertions) if self.insertionLayout == 'combined' else None
+
+            if self.appendStoreFile is not None:
+                # Only the configurations added since the last update of the store are read from the ASCII files
+                store = appendio.openStore(self.appendStoreFile, self.binsize)
+                for mom in self.moms:
+                    mTag = tags.momString(mom)
+                    mh5Tag = tags.momH5(mom)
+                    Ncfg = self.dSetAttr[mTag]['Ncfg']
+
+                    for ri in self.RI:
+                        self.plainBinSums[ri][mTag] = {}
+                    NnewList = []
+                    for dkey,fileName in fileList[mTag]:
+                        tsep,t0,z3,iop,row,gamma = dkey
+                        group = 'plain/%s/%s/%s/%s/%s/%s/%s'%(mh5Tag,tags.disp(z3),tags.tsep(tsep),tags.insertion(gamma),tags.t0(t0),
+                                                              tags.src_snk(self.dSetAttr[mTag]['intOpList'][iop]),tags.row(row))
+                        rawData, binSums, Nnew = appendio.appendCorrelator(store,group,fileName,Ncfg,tsep,self.binsize,self.precision)
+                        self.plainData['Re'][mTag][dkey] = rawData.real
+                        self.plainData['Im'][mTag][dkey] = rawData.imag
+                        self.plainBinSums['Re'][mTag][dkey] = binSums.real
+                        self.plainBinSums['Im'][mTag][dkey] = binSums.imag
+                        NnewList.append(Nnew)
+                    appendio.reportNewConfigurations('Three-point',mTag,NnewList,Ncfg)
+                store.close()
+            elif self.pipeline:
+                # Read the files in the background, sample each dataset as soon as it arrives
+                taskList = []
+                parsed = {}
+                for mom in self.moms:
+                    mTag = tags.momString(mom)
+                    Ncfg = self.dSetAttr[mTag]['Ncfg File']
+                    self.initStatistics(mTag)
+
+                    # Momenta with an up-to-date cache store are not parsed again
+                    if self.cacheDir is not None:
+                        storeTag = 'c3pt_%s'%(tags.momH5(mom))
+                        rawList = ASCIIcache.readStore(self.cacheDir,storeTag,[f for k,f in fileList[mTag]],
+                                                       Ncfg,[k[0] for k,f in fileList[mTag]],self.precision,Nins)
+                        if rawList is not None:
+                            print('Loaded three-point data for momentum %s from cache store'%(mTag))
+                            for (fkey,fileName),rawData in zip(fileList[mTag],rawList):
+                                for dkey in self.setPlainDataASCII(mTag,fkey,ASCIIio.selectConfigurations(rawData,self.cfgSlice)):
+                                    self.accumulatePlain(mTag,dkey)
+                            continue
+
+                    parsed[mTag] = []
+                    for fkey,fileName in fileList[mTag]:
+                        Nt = fkey[0] # The time extent of each file is tsep
+                        taskList.append(((mTag,fkey),(fileName,Ncfg,Nt,self.precision,Nins,self.cfgSlice)))
+
+                reader = PrefetchReader(ASCIIio.readCorrelatorASCII, taskList, self.pipelineQueueSize)
+                for (mTag,fkey),rawData in reader:
+                    for dkey in self.setPlainDataASCII(mTag,fkey,rawData):
+                        self.accumulatePlain(mTag,dkey)
+                    if not self.streaming:
+                        parsed[mTag].append(rawData)
+                reader.printReport('Three-point')
+                self.plainAccumulated = True
+
+                # The cache store holds all the configurations, so it is not written from a subset of them
+                if self.cacheDir is not None and not self.streaming and self.cfgSlice is None:
+                    for mom in self.moms:
+                        mTag = tags.momString(mom)
+                        if mTag in parsed.keys():
+                            storeTag = 'c3pt_%s'%(tags.momH5(mom))
+                            ASCIIcache.writeStore(self.cacheDir,storeTag,[f for k,f in fileList[mTag]],parsed[mTag],self.precision)
+            elif self.streaming:
+                # Read the files one at a time, fold each into the averages and then discard it
+                for mom in self.moms:
+                    mTag = tags.momString(mom)
+                    Ncfg = self.dSetAttr[mTag]['Ncfg File']
+                    self.initStatistics(mTag)
+
+                    print('Streaming %d three-point data files for momentum %s'%(len(fileList[mTag]),mTag))
+
+                    # The files are not kept in memory, so the cache store is only read, if it is up to date
+                    rawList = None
+                    if self.cacheDir is not None:
+                        storeTag = 'c3pt_%s'%(tags.momH5(mom))
+                        rawList = ASCIIcache.readStore(self.cacheDir,storeTag,[f for k,f in fileList[mTag]],
+                                                       Ncfg,[k[0] for k,f in fileList[mTag]],self.precision,Nins)
+                        if rawList is None:
+                            print('Cache store %s/%s is missing or out of date. It is not written in streaming mode'%(self.cacheDir,storeTag))
+
+                    for i,(fkey,fileName) in enumerate(fileList[mTag]):
+                        Nt = fkey[0] # The time extent of each file is tsep
+                        if rawList is not None:
+                            rawData = ASCIIio.selectConfigurations(rawList[i],self.cfgSlice)
+                        else:
+                            rawData = ASCIIio.readCorrelatorASCII(fileName,Ncfg,Nt,self.precision,Nins,self.cfgSlice)
+                        for dkey in self.setPlainDataASCII(mTag,fkey,rawData):
+                            self.accumulatePlain(mTag,dkey)
+
+                    print('Streaming three-point data for momentum %s completed.\n'%(mTag))
+                self.plainAccumulated = True
+            else:
+                for mom in self.moms:
+                    mTag = tags.momString(mom)
+                    Ncfg = self.dSetAttr[mTag]['Ncfg File']
+
+                    print('Reading %d three-point data files for momentum %s, using %d worker(s)'%(len(fileList[mTag]),mTag,self.Nworkers))
+
+                    # The time extent of each file is tsep
+                    NtList = [k[0] for k,f in fileList[mTag]]
+                    if self.cacheDir is not None:
+                        storeTag = 'c3pt_%s'%(tags.momH5(mom))
+                        rawList = ASCIIcache.readCorrelatorListCached(self.cacheDir,storeTag,[f for k,f in fileList[mTag]],
+                                                                      Ncfg,NtList,self.precision,self.Nworkers,Nins,self.cfgSlice)
+                    elif self.journalDir is not None:
+                        rawList = journal.readCorrelatorListJournaled(self.journalDir,'c3pt_%s'%(tags.momH5(mom)),[f for k,f in fileList[mTag]],
+                                                                      Ncfg,NtList,self.precision,self.Nworkers,Nins,self.journalBlockSize,
+                                                                      self.cfgSlice)
+                    else:
+                        rawList = ASCIIio.readCorrelatorListASCII([f for k,f in fileList[mTag]],Ncfg,NtList,self.precision,self.Nworkers,Nins,
+                                                                  self.cfgSlice)
+
+                    for (fkey,fileName),rawData in zip(fileList[mTag],rawList):
+                        self.setPlainDataASCII(mTag,fkey,rawData)
+
+                    print('Reading three-point data for momentum %s completed.\n'%(mTag))
+
+                # All the files have been read, the journal is not needed any more
+                if self.journalDir is not None:
+                    for mom in self.moms:
+                        journal.clearJournal(self.journalDir,'c3pt_%s'%(tags.momH5(mom)))
         # End getDataASCII() ----------------------------------
 
 
@@ -228,6 +495,13 @@ class ThreePointCorrelator():
 
             inputHDF5 = self.dataInfo['Input Data']['HDF5 File']
             h5_file = h5py.File(inputHDF5,'r')            
+            layout = hdf5io.getLayout(h5_file)
+
+            if self.lazy:
+                print('Plain data will be read from HDF5 only when they are accessed')
+
+            # Only the selected configurations are read
+            cfgIdx = self.cfgSlice if self.cfgSlice is not None else slice(None)
 
             for mom in self.moms:
                 mTag = tags.momString(mom)
@@ -238,27 +512,65 @@ class ThreePointCorrelator():
                 Nrows = self.dSetAttr[mTag]['Nrows']
 
                 for ri in self.RI:
-                    self.plainData[ri][mTag] = {}
-
-                    for z3 in dispList:
-                        dispTag = tags.disp(z3)
-                        for tsep in tsepList:
-                            tsepTag = tags.tsep(tsep)
-                            for t0 in t0List:
-                                t0Tag = tags.t0(t0)
-                                for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
-                                    opTag = tags.src_snk(opPair)
-                                    for row in range(1,Nrows+1):
-                                        rowTag = tags.row(row)
-                                        for gamma in self.gammaList:
-                                            insTag = tags.insertion(gamma)
-
-                                            dkey = (tsep,t0,z3,iop,row,gamma)
-
-                                            dset = 'plain/%s/%s/%s/%s/%s/%s/%s/%s/data'%(mh5Tag,dispTag,tsepTag,t0Tag,opTag,rowTag,insTag,ri)
-                                            self.plainData[ri][mTag][dkey] = np.array(h5_file[dset])
+                    self.plainData[ri][mTag] = hdf5io.LazyDatasetDict(h5_file) if self.lazy else {}
+
+                if layout == 'dense':
+                    # Read the plain data of each tsep at once, locate the attributes on the axes
+                    for tsep in tsepList:
+                        tsepTag = tags.tsep(tsep)
+                        plain_group = 'plain/%s/%s'%(mh5Tag,tsepTag)
+                        plainData = h5_file[plain_group + '/data'] if self.lazy else ASCIIio.selectConfigurations(h5_file[plain_group + '/data'][()],self.cfgSlice)
+
+                        riIdx  = hdf5io.axisIndices(hdf5io.readAxis(h5_file,plain_group,'ri'), self.RI, 'ri')
+                        z3Idx  = hdf5io.axisIndices(hdf5io.readAxis(h5_file,plain_group,'z3'), dispList, 'z3')
+                        t0Idx  = hdf5io.axisIndices(hdf5io.readAxis(h5_file,plain_group,'t0'), t0List, 't0')
+                        opIdx  = hdf5io.axisIndices(hdf5io.readAxis(h5_file,plain_group,'op'),
+                                                    [tags.src_snk(opPair) for opPair in self.dSetAttr[mTag]['intOpList']], 'op')
+                        rowIdx = hdf5io.axisIndices(hdf5io.readAxis(h5_file,plain_group,'row'), list(range(1,Nrows+1)), 'row')
+                        gIdx   = hdf5io.axisIndices(hdf5io.readAxis(h5_file,plain_group,'gamma'), self.gammaList, 'gamma')
+
+                        for iri,ri in enumerate(self.RI):
+                            for iz3,z3 in enumerate(dispList):
+                                for it0,t0 in enumerate(t0List):
+                                    for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
+                                        for row in range(1,Nrows+1):
+                                            for ig,gamma in enumerate(self.gammaList):
+                                                dkey = (tsep,t0,z3,iop,row,gamma)
+                                                index = (riIdx[iri],z3Idx[iz3],t0Idx[it0],opIdx[iop],rowIdx[row-1],gIdx[ig])
+                                                if self.lazy:
+                                                    self.plainData[ri][mTag].addSource(dkey, plain_group + '/data', index + (cfgIdx,))
+                                                else:
+                                                    self.plainData[ri][mTag][dkey] = plainData[index]
+                else:
+                    for ri in self.RI:
+                        for z3 in dispList:
+                            dispTag = tags.disp(z3)
+                            for tsep in tsepList:
+                                tsepTag = tags.tsep(tsep)
+                                for t0 in t0List:
+                                    t0Tag = tags.t0(t0)
+                                    for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
+                                        opTag = tags.src_snk(opPair)
+                                        for row in range(1,Nrows+1):
+                                            rowTag = tags.row(row)
+                                            for gamma in self.gammaList:
+                                                insTag = tags.insertion(gamma)
+
+                                                dkey = (tsep,t0,z3,iop,row,gamma)
+
+                                                dset = 'plain/%s/%s/%s/%s/%s/%s/%s/%s/data'%(mh5Tag,dispTag,tsepTag,t0Tag,opTag,rowTag,insTag,ri)
+                                                if self.lazy:
+                                                    self.plainData[ri][mTag].addSource(dkey, dset, cfgIdx)
+                                                else:
+                                                    self.plainData[ri][mTag][dkey] = h5_file[dset][cfgIdx]
 
                 print('Reading three-point data for momentum %s completed.'%(mTag))
+
+            # The lazy containers need the file to remain open
+            if self.lazy:
+                self.h5Input = h5_file
+            else:
+                h5_file.close()
         # End getDataHDF5() ------------------------------------
 
 
@@ -270,6 +582,179 @@ class ThreePointCorrelator():
 
     # End getData() -------------
 
+    # Close the input HDF5 file of lazy plain data, after writeHDF5(). The plain data are not available afterwards
+    # The class may also be used as a context manager, which closes the file on exit
+    def close(self):
+        if self.h5Input is not None:
+            self.h5Input.close()
+            self.h5Input = None
+    #-------------------------------
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+    #-------------------------------
+
+
+    # Prepare the containers of the statistical analysis for a given momentum
+    def initStatistics(self, mTag):
+        tsepList = self.dSetAttr[mTag]['tsep']
+        dispList = self.dSetAttr[mTag]['disp']
+        Ncfg = self.dSetAttr[mTag]['Ncfg']
+
+        # Determine the Jackknife sampling number of Bins
+        self.Nbins = jackknife.Nbins(Ncfg,self.binsize)
+
+        # The plain data Bins and Mean
+        for ri in self.RI:
+            self.plainBins[ri][mTag] = {}
+            self.plainMean[ri][mTag] = {}
+            self.avgData[ri][mTag] = {}
+            self.avgBins[ri][mTag] = {}
+            self.avgMean[ri][mTag] = {}
+            self.avgSum[ri][mTag] = {}
+            self.avgBinsSum[ri][mTag] = {}
+
+        # That's the sum that will give the averaged data
+        for tsep in tsepList:
+            Nt = tsep
+            for z3 in dispList:
+                for gamma in self.gammaList:
+                    dkeyAvg = (tsep,z3,gamma)
+                    for ri in self.RI:
+                        self.avgSum[ri][mTag][dkeyAvg] = np.zeros((Ncfg,Nt),dtype=self.floatType)
+                        self.avgBinsSum[ri][mTag][dkeyAvg] = None
+    #-------------------------------
+
+    # Jackknife sampling of a plain dataset, and accumulation of the dataset into the averages
+    def accumulatePlain(self, mTag, dkey):
+        tsep,t0,z3,iop,row,gamma = dkey
+        Nt = tsep
+        dkeyAvg = (tsep,z3,gamma)
+
+        for ri in self.RI:
+            # Access the dataset only once, lazy containers read it from the file on each access
+            plainData = self.plainData[ri][mTag][dkey]
+
+            # Jackknife sampling on the Plain data, and accumulation of their JackknifeArrays
+            if self.plainStatistics:
+                if mTag in self.plainBinSums[ri].keys():
+                    plainJk = jackknife.JackknifeArray(self.plainBinSums[ri][mTag][dkey], self.binsize)
+                else:
+                    plainJk = jackknife.JackknifeArray.fromSample(plainData, self.binsize)
+                self.plainBins[ri][mTag][dkey] = np.zeros((self.Nbins,Nt), dtype=self.floatType)
+                self.plainBins[ri][mTag][dkey][:] = plainJk.bins()
+                self.plainMean[ri][mTag][dkey] = jackknife.mean(self.plainBins[ri][mTag][dkey], self.Nbins, Nspl=Nt)
+
+                avgJk = self.avgBinsSum[ri][mTag][dkeyAvg]
+                self.avgBinsSum[ri][mTag][dkeyAvg] = plainJk if avgJk is None else avgJk + plainJk
+
+            # Average over Source-Sink operators, t0's and rows
+            self.avgSum[ri][mTag][dkeyAvg] += plainData
+
+            # Only the running averages are kept in streaming mode
+            if self.streaming:
+                del self.plainData[ri][mTag][dkey]
+    #-------------------------------
+
+    # Jackknife sampling of all the plain datasets of a momentum at once, and accumulation of the averages as reductions over the
+    # stacked dimension. The datasets of each tsep are stacked in a (keys,Ncfg,tsep) array, with the keys that are averaged together
+    # being consecutive. The plain data, bins and mean of each dkey become views into the stacks
+    def accumulatePlainStacked(self, mTag):
+        t0List = self.dSetAttr[mTag]['t0']
+        tsepList = self.dSetAttr[mTag]['tsep']
+        dispList = self.dSetAttr[mTag]['disp']
+        Nrows = self.dSetAttr[mTag]['Nrows']
+        Nop = self.dSetAttr[mTag]['Nop']
+
+        for tsep in tsepList:
+            Nt = tsep
+            avgKeyList = [(tsep,z3,gamma) for z3 in dispList for gamma in self.gammaList]
+            dkeyList = [(tsep,t0,z3,iop,row,gamma) for (tsep,z3,gamma) in avgKeyList
+                        for t0 in t0List for iop in range(Nop) for row in range(1,Nrows+1)]
+            Navg = len(t0List) * Nop * Nrows
+
+            for ri in self.RI:
+                plainStack = np.stack([self.plainData[ri][mTag][dkey] for dkey in dkeyList])
+                for i,dkey in enumerate(dkeyList):
+                    self.plainData[ri][mTag][dkey] = plainStack[i]
+
+                # Jackknife sampling on the Plain data, and accumulation of their JackknifeArrays
+                if self.plainStatistics:
+                    plainJk = jackknife.JackknifeArray.fromSample(plainStack, self.binsize, axis=1) # Bin sums of shape (Nbins,keys,Nt)
+                    binsStack = np.zeros((len(dkeyList),self.Nbins,Nt), dtype=self.floatType)
+                    binsStack[:] = np.moveaxis(plainJk.bins(), 0, 1)
+                    aveStack,errStack = jackknife.meanArray(binsStack, axis=1)
+                    for i,dkey in enumerate(dkeyList):
+                        self.plainBins[ri][mTag][dkey] = binsStack[i]
+                        self.plainMean[ri][mTag][dkey] = (aveStack[i],errStack[i])
+
+                    avgJkStack = jackknife.JackknifeArray(plainJk.binSums.reshape((self.Nbins,len(avgKeyList),Navg,Nt)), self.binsize,
+                                                          plainJk.total.reshape((len(avgKeyList),Navg,Nt))).sum(axis=1)
+                    for i,dkeyAvg in enumerate(avgKeyList):
+                        avgJk = self.avgBinsSum[ri][mTag][dkeyAvg]
+                        self.avgBinsSum[ri][mTag][dkeyAvg] = avgJkStack[i] if avgJk is None else avgJk + avgJkStack[i]
+
+                # Sum over Source-Sink operators, t0's and rows
+                avgStack = prec.compensatedSum(plainStack.reshape((len(avgKeyList),Navg) + plainStack.shape[1:]).astype(self.floatType, copy=False),
+                                               axis=1)
+                for i,dkeyAvg in enumerate(avgKeyList):
+                    self.avgSum[ri][mTag][dkeyAvg] += avgStack[i]
+    #-------------------------------
+
+    # The terms of the average over momenta and z3 values of the averaged data, for a momentum in momAvg and dkey = (tsep,z3,gamma), z3>=0
+    # Returns, for Re and Im, the list of (weight, mTag, dkeyAvg) of the averaged data that are combined
+    def getAverageTerms(self, mom, dkey):
+        tsep,z3,gamma = dkey
+        mTag = tags.momString(mom)
+        dispList = self.dSetAttr[mTag]['disp']
+
+        dkeyAvgPosZ = (tsep, z3,gamma)
+        dkeyAvgNegZ = (tsep,-z3,gamma)
+        bothZ = z3 in dispList and -z3 in dispList
+
+        # Single term, or average over +/-z3 of a single momentum
+        def singleMomentum(mTagAvg, signIm):
+            if z3 == 0 or not bothZ:
+                dkeyAvg = dkeyAvgNegZ if -z3 in dispList else dkeyAvgPosZ
+                return {ri: [(1.0,mTagAvg,dkeyAvg)] for ri in self.RI}
+            return {'Re': [(0.5,mTagAvg,dkeyAvgPosZ), (0.5,mTagAvg,dkeyAvgNegZ)],
+                    'Im': [(0.5*signIm,mTagAvg,dkeyAvgPosZ), (-0.5*signIm,mTagAvg,dkeyAvgNegZ)]}
+        #---------------------
+
+        if mom == [0,0,0]:
+            if z3 == 0 or not bothZ: # Pz=0, z3=0, OR NOT both z3 and -z3 exist
+                return singleMomentum(mTag, 1.0)
+            # Pz=0, z3!=0
+            return {ri: [(0.5,mTag,dkeyAvgPosZ), (0.5,mTag,dkeyAvgNegZ)] for ri in self.RI}
+
+        momNeg = [mom[0],mom[1],-mom[2]]
+        if mom in self.moms and momNeg in self.moms: # Negative momentum exists in global momentum list
+            mTagPos = mTag
+            mTagNeg = tags.momString(momNeg)
+            if z3 == 0: # Pz!=0, z3=0
+                return {ri: [(0.5,mTagPos,dkey), (0.5,mTagNeg,dkey)] for ri in self.RI}
+            # Pz!=0, z3!=0
+            if bothZ:
+                return {'Re': [(0.25,mTagPos,dkeyAvgPosZ), (0.25,mTagPos,dkeyAvgNegZ), (0.25,mTagNeg,dkeyAvgPosZ), (0.25,mTagNeg,dkeyAvgNegZ)],
+                        'Im': [(0.25,mTagPos,dkeyAvgPosZ), (-0.25,mTagPos,dkeyAvgNegZ), (-0.25,mTagNeg,dkeyAvgPosZ), (0.25,mTagNeg,dkeyAvgNegZ)]}
+            elif z3 in dispList:
+                return {'Re': [(0.5,mTagPos,dkeyAvgPosZ), (0.5,mTagNeg,dkeyAvgPosZ)],
+                        'Im': [(0.5,mTagPos,dkeyAvgPosZ), (-0.5,mTagNeg,dkeyAvgPosZ)]}
+            elif -z3 in dispList:
+                return {'Re': [(0.5,mTagPos,dkeyAvgNegZ), (0.5,mTagNeg,dkeyAvgNegZ)],
+                        'Im': [(-0.5,mTagPos,dkeyAvgNegZ), (0.5,mTagNeg,dkeyAvgNegZ)]}
+            else:
+                raise ValueError('\n Error: Inconsistency with z3 values!!!')
+        elif mom in self.moms and momNeg not in self.moms:
+            return singleMomentum(mTag, 1.0)
+        elif momNeg in self.moms and mom not in self.moms:
+            return singleMomentum(tags.momString(momNeg), -1.0)
+        else:
+            raise ValueError('\n Error: Inconsistency with momenta values!!!')
+    #-------------------------------
 
     def doStatistics(self):
 
@@ -282,71 +767,61 @@ class ThreePointCorrelator():
             tsepList = self.dSetAttr[mTag]['tsep']
             dispList = self.dSetAttr[mTag]['disp']
             Nrows = self.dSetAttr[mTag]['Nrows']
-            Ncfg = self.dSetAttr[mTag]['Ncfg']
             Nt0 = len(t0List)
             Nop = self.dSetAttr[mTag]['Nop']
 
-            # Determine the Jackknife sampling number of Bins
-            self.Nbins = jackknife.Nbins(Ncfg,self.binsize)
-
             Navg = Nrows * Nt0 * Nop
 
-            # The plain data Bins and Mean
-            for ri in self.RI:
-                self.plainBins[ri][mTag] = {}
-                self.plainMean[ri][mTag] = {}
-                self.avgData[ri][mTag] = {}
-                self.avgBins[ri][mTag] = {}
-                self.avgMean[ri][mTag] = {}
+            # The plain data have already been sampled and accumulated if they were read in a pipeline
+            # Lazy data and data with bin sums are sampled one dataset at a time, the rest all at once
+            if not self.plainAccumulated:
+                self.initStatistics(mTag)
+                if self.lazy or mTag in self.plainBinSums['Re'].keys():
+                    for tsep in tsepList:
+                        for z3 in dispList:
+                            for gamma in self.gammaList:
+                                # We are averaging for the following attributes
+                                for t0 in t0List:
+                                    for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
+                                        for row in range(1,Nrows+1):
+                                            dkey = (tsep,t0,z3,iop,row,gamma)
+                                            self.accumulatePlain(mTag,dkey)
+                else:
+                    self.accumulatePlainStacked(mTag)
 
             for tsep in tsepList:
                 Nt = tsep
-                for z3 in dispList:
-                    for gamma in self.gammaList:
-                        dkeyAvg = (tsep,z3,gamma)
-                        for ri in self.RI:
-                            self.avgData[ri][mTag][dkeyAvg] = np.zeros((Ncfg,Nt),dtype=np.float128)
+                avgKeyList = [(tsep,z3,gamma) for z3 in dispList for gamma in self.gammaList]
 
-                        # We are averaging for the following attributes
-                        for t0 in t0List:
-                            for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
-                                for row in range(1,Nrows+1):
-                                    dkey = (tsep,t0,z3,iop,row,gamma)
-
-                                    for ri in self.RI:
-                                        # Jackknife sampling on the Plain data
-                                        self.plainBins[ri][mTag][dkey] = np.zeros((self.Nbins,Nt), dtype=np.float128)
-                                        for t in range(Nt):
-                                            self.plainBins[ri][mTag][dkey][:,t] = jackknife.sampling(self.plainData[ri][mTag][dkey][:,t], self.Nbins, self.binsize)
-                                        self.plainMean[ri][mTag][dkey] = jackknife.mean(self.plainBins[ri][mTag][dkey], self.Nbins, Nspl=Nt)
-
-                                        # Average over Source-Sink operators, t0's and rows
-                                        self.avgData[ri][mTag][dkeyAvg] += self.plainData[ri][mTag][dkey]
-
-                        # Average over Source-Sink operators, t0's and rows
-                        for ri in self.RI:
-                            self.avgData[ri][mTag][dkeyAvg] = self.avgData[ri][mTag][dkeyAvg] / Navg
-
-                            # Jackknife sampling over the averaged data, for each momentum, tsep, z3 and gamma
-                            self.avgBins[ri][mTag][dkeyAvg] = np.zeros((self.Nbins,Nt), dtype=np.float128)
-                            for t in range(Nt):
-                                self.avgBins[ri][mTag][dkeyAvg][:,t] = jackknife.sampling(self.avgData[ri][mTag][dkeyAvg][:,t],
-                                                                                          self.Nbins, self.binsize)
-                            self.avgMean[ri][mTag][dkeyAvg] = jackknife.mean(self.avgBins[ri][mTag][dkeyAvg],
-                                                                             self.Nbins, Nspl=Nt)
+                for ri in self.RI:
+                    # Average over Source-Sink operators, t0's and rows
+                    avgStack = np.stack([self.avgSum[ri][mTag][dkeyAvg] for dkeyAvg in avgKeyList]) / Navg
+
+                    # Jackknife sampling is linear, so the averaged data are kept as a JackknifeArray, the average of those of the plain data
+                    # The averaged data are sampled only if the plain data have not been sampled
+                    if self.plainStatistics:
+                        avgJkStack = jackknife.stack([self.avgBinsSum[ri][mTag][dkeyAvg] for dkeyAvg in avgKeyList]) / Navg
+                    else:
+                        avgJkStack = jackknife.JackknifeArray.fromSample(avgStack, self.binsize, axis=1)
+                    aveStack,errStack = avgJkStack.mean()
+
+                    for i,dkeyAvg in enumerate(avgKeyList):
+                        self.avgData[ri][mTag][dkeyAvg] = avgStack[i]
+                        self.avgBins[ri][mTag][dkeyAvg] = avgJkStack[i]
+                        self.avgMean[ri][mTag][dkeyAvg] = (aveStack[i],errStack[i])
 
             print('Jackknife analysis for momentum %s completed'%(mTag))
         # End for momentum
 
 
         # Perform average over momenta and z3 values
+        # The fully averaged JackknifeArrays are the same linear combination of the averaged ones as the data, so they are not sampled again
+        # Their bins are evaluated only when they are needed, e.g. for the ratio
         for mom in self.momAvg:
             mTag = tags.momString(mom)
 
             tsepList = self.dSetAttr[mTag]['tsep']
-            dispList = self.dSetAttr[mTag]['disp']
             dispListAvg = self.dispAvg[mTag]
-            Ncfg = self.dSetAttr[mTag]['Ncfg']
 
             for ri in self.RI:
                 self.data[ri][mTag] = {}
@@ -354,180 +829,204 @@ class ThreePointCorrelator():
                 self.mean[ri][mTag] = {}
 
             for tsep in tsepList:
-                Nt = tsep
                 for gamma in self.gammaList:
                     for z3 in dispListAvg: # Run over the z3>=0
                         dkey = (tsep,z3,gamma)
 
+                        avgTerms = self.getAverageTerms(mom, dkey)
                         for ri in self.RI:
-                            self.data[ri][mTag][dkey] = np.zeros((Ncfg,Nt), dtype=np.float128)
-
-                        if mom == [0,0,0]:
-                            if z3 == 0 or not (z3 in dispList and -z3 in dispList): # Pz=0, z3=0, OR NOT both z3 and -z3 exist
-                                dkeyAvg = (tsep,-z3,gamma) if -z3 in dispList else (tsep,z3,gamma)
-                                for ri in self.RI:
-                                    self.data[ri][mTag][dkey] = self.avgData[ri][mTag][dkeyAvg]
-                            else: # Pz=0, z3!=0
-                                dkeyAvgPosZ = (tsep, z3,gamma)
-                                dkeyAvgNegZ = (tsep,-z3,gamma)
-                                self.data['Re'][mTag][dkey] = 0.5 * (self.avgData['Re'][mTag][dkeyAvgPosZ] + self.avgData['Re'][mTag][dkeyAvgNegZ])
-                                self.data['Im'][mTag][dkey] = 0.5 * (self.avgData['Im'][mTag][dkeyAvgPosZ] + self.avgData['Im'][mTag][dkeyAvgNegZ])
-                        else:
-                            momNeg = [mom[0],mom[1],-mom[2]]
-                            if mom in self.moms and momNeg in self.moms: # Negative momentum exists in global momentum list
-                                mTagPos = mTag
-                                mTagNeg = tags.momString(momNeg)
-                                if z3 == 0: # Pz!=0, z3=0
-                                    self.data['Re'][mTag][dkey] = 0.5 * (self.avgData['Re'][mTagPos][dkey] + self.avgData['Re'][mTagNeg][dkey])
-                                    self.data['Im'][mTag][dkey] = 0.5 * (self.avgData['Im'][mTagPos][dkey] + self.avgData['Im'][mTagNeg][dkey])
-                                else: # Pz!=0, z3!=0
-                                    if z3 in dispList and -z3 in dispList:
-                                        dkeyAvgPosZ = (tsep, z3,gamma)
-                                        dkeyAvgNegZ = (tsep,-z3,gamma)
-
-                                        self.data['Re'][mTag][dkey] = 0.25 * (self.avgData['Re'][mTagPos][dkeyAvgPosZ] +
-                                                                              self.avgData['Re'][mTagPos][dkeyAvgNegZ] +
-                                                                              self.avgData['Re'][mTagNeg][dkeyAvgPosZ] +
-                                                                              self.avgData['Re'][mTagNeg][dkeyAvgNegZ])
-
-                                        self.data['Im'][mTag][dkey] = 0.25 * (self.avgData['Im'][mTagPos][dkeyAvgPosZ] -
-                                                                              self.avgData['Im'][mTagPos][dkeyAvgNegZ] -
-                                                                              self.avgData['Im'][mTagNeg][dkeyAvgPosZ] +
-                                                                              self.avgData['Im'][mTagNeg][dkeyAvgNegZ])
-                                    elif z3 in dispList and -z3 not in dispList:
-                                        dkeyAvg = (tsep,z3,gamma)
-                                        self.data['Re'][mTag][dkey] = 0.5 * (self.avgData['Re'][mTagPos][dkeyAvg] +
-                                                                             self.avgData['Re'][mTagNeg][dkeyAvg])
-                                        self.data['Im'][mTag][dkey] = 0.5 * (self.avgData['Im'][mTagPos][dkeyAvg] -
-                                                                             self.avgData['Im'][mTagNeg][dkeyAvg])
-                                    elif -z3 in dispList and z3 not in dispList:
-                                        dkeyAvg = (tsep,-z3,gamma)
-                                        self.data['Re'][mTag][dkey] = 0.5 * (self.avgData['Re'][mTagPos][dkeyAvg] +
-                                                                             self.avgData['Re'][mTagNeg][dkeyAvg])
-                                        self.data['Im'][mTag][dkey] = 0.5 * (self.avgData['Im'][mTagNeg][dkeyAvg] -
-                                                                             self.avgData['Im'][mTagPos][dkeyAvg])
-                                    else:
-                                        raise ValueError('\n Error: Inconsistency with z3 values!!!')
-                            elif mom in self.moms and momNeg not in self.moms:
-                                mTagPos = mTag
-                                if z3 == 0 or not (z3 in dispList and -z3 in dispList): # Pz!=0, z3=0
-                                    dkeyAvg = (tsep,-z3,gamma) if -z3 in dispList else (tsep,z3,gamma)
-                                    for ri in self.RI:
-                                        self.data[ri][mTag][dkey] = self.avgData[ri][mTagPos][dkeyAvg]
-                                else: # Pz!=0, z3!=0
-                                    dkeyAvgPosZ = (tsep, z3,gamma)
-                                    dkeyAvgNegZ = (tsep,-z3,gamma)
-
-                                    self.data['Re'][mTag][dkey] = 0.5 * (self.avgData['Re'][mTagPos][dkeyAvgPosZ] +
-                                                                         self.avgData['Re'][mTagPos][dkeyAvgNegZ])
-
-                                    self.data['Im'][mTag][dkey] = 0.5 * (self.avgData['Im'][mTagPos][dkeyAvgPosZ] -
-                                                                         self.avgData['Im'][mTagPos][dkeyAvgNegZ])
-                            elif momNeg in self.moms and mom not in self.moms:
-                                mTagNeg = tags.momString(momNeg)
-                                if z3 == 0 or not (z3 in dispList and -z3 in dispList): # Pz!=0, z3=0
-                                    dkeyAvg = (tsep,-z3,gamma) if -z3 in dispList else (tsep,z3,gamma)
-                                    for ri in self.RI:
-                                        self.data[ri][mTag][dkey] = self.avgData[ri][mTagNeg][dkeyAvg]
-                                else: # Pz!=0, z3!=0
-                                    dkeyAvgPosZ = (tsep, z3,gamma)
-                                    dkeyAvgNegZ = (tsep,-z3,gamma)
-
-                                    self.data['Re'][mTag][dkey] = 0.5 * (self.avgData['Re'][mTagNeg][dkeyAvgPosZ] +
-                                                                         self.avgData['Re'][mTagNeg][dkeyAvgNegZ])
-
-                                    self.data['Im'][mTag][dkey] = 0.5 * (self.avgData['Im'][mTagNeg][dkeyAvgNegZ] -
-                                                                         self.avgData['Im'][mTagNeg][dkeyAvgPosZ])
-                            else:
-                                raise ValueError('\n Error: Inconsistency with momenta values!!!')
-                        # End if mom != 0
-
-                        # Jackknife sampling over the fully averaged data, for each momentum, tsep, z3 and gamma
-                        for ri in self.RI:
-                            self.bins[ri][mTag][dkey] = np.zeros((self.Nbins,Nt), dtype=np.float128)
-                            for t in range(Nt):
-                                self.bins[ri][mTag][dkey][:,t] = jackknife.sampling(self.data[ri][mTag][dkey][:,t], self.Nbins, self.binsize)
-                            self.mean[ri][mTag][dkey] = jackknife.mean(self.bins[ri][mTag][dkey], self.Nbins, Nspl=Nt)
+                            weights = [w for w,mTagAvg,dkeyAvg in avgTerms[ri]]
+                            self.data[ri][mTag][dkey] = jackknife.linearCombination([self.avgData[ri][mTagAvg][dkeyAvg]
+                                                                                      for w,mTagAvg,dkeyAvg in avgTerms[ri]], weights)
+                            self.bins[ri][mTag][dkey] = jackknife.linearCombination([self.avgBins[ri][mTagAvg][dkeyAvg]
+                                                                                      for w,mTagAvg,dkeyAvg in avgTerms[ri]], weights)
+                            self.mean[ri][mTag][dkey] = self.bins[ri][mTag][dkey].mean()
 
             print('Averaging over z3 and momenta for momentum %s completed.'%(mTag))
 
+        # Integrated autocorrelation times of the momentum- and z3-averaged data, for all momenta, tsep, z3, insertions and
+        # time slices at once
+        if self.autocorrPolicy['Enable']:
+            tauKeyList = [(ri,mTag,dkey) for ri in self.RI for mTag in self.data[ri].keys() for dkey in self.data[ri][mTag].keys()]
+            tauList = autocorr.tauIntList([self.data[ri][mTag][dkey] for ri,mTag,dkey in tauKeyList], S=self.autocorrPolicy['S'])
+            for (ri,mTag,dkey),tau in zip(tauKeyList,tauList):
+                self.tauInt[ri].setdefault(mTag,{})[dkey] = tau
+            print('Maximum integrated autocorrelation time of the three-point functions: %.2f'%(np.nanmax([np.nanmax(tau[0],initial=0)
+                                                                                                          for tau in tauList])))
+
     def writeHDF5(self):
-        h5_file = h5py.File(self.dataInfo['HDF5 Output File'],'w')
 
-        # Write the Pz- and z3-averaged data
-        for mom in self.momAvg:
-            mTag = tags.momString(mom)
-            mh5Tag = tags.momH5(mom)
+        def writeTree(h5_file):
 
-            tsepList = self.dSetAttr[mTag]['tsep']
-            dispListAvg = self.dispAvg[mTag]
+            # Write the Pz- and z3-averaged data
+            for mom in self.momAvg:
+                mTag = tags.momString(mom)
+                mh5Tag = tags.momH5(mom)
+
+                tsepList = self.dSetAttr[mTag]['tsep']
+                dispListAvg = self.dispAvg[mTag]
+
+                for z3 in dispListAvg:
+                    dispTag = tags.disp(z3)
+                    for tsep in tsepList:
+                        tsepTag = tags.tsep(tsep)
+                        for gamma in self.gammaList:
+                            insTag = tags.insertion(gamma)
+                            dkeyAvg = (tsep,z3,gamma)
+
+                            # Write the averaged data
+                            for ri in self.RI:
+                                avg_group = 'fullavg/%s/%s/%s/%s/%s'%(mh5Tag,dispTag,tsepTag,insTag,ri)
+                                dset_name_data = avg_group + '/data'
+                                dset_name_bins = avg_group + '/bins'
+                                dset_name_mean = avg_group + '/mean'
+                                hdf5io.createDataset(h5_file, dset_name_data, self.data[ri][mTag][dkeyAvg], self.outputPolicy)
+                                hdf5io.createDataset(h5_file, dset_name_bins, self.bins[ri][mTag][dkeyAvg].bins(), self.outputPolicy, bins=True)
+                                hdf5io.createDataset(h5_file, dset_name_mean, self.mean[ri][mTag][dkeyAvg], self.outputPolicy, dtype='f')
+                                if mTag in self.tauInt[ri].keys():
+                                    hdf5io.createDataset(h5_file, avg_group + '/tauInt', self.tauInt[ri][mTag][dkeyAvg], self.outputPolicy, dtype='f')
+            #--------------------------------------
+
+            for mom in self.moms:
+                mTag = tags.momString(mom)
+                mh5Tag = tags.momH5(mom)
+                t0List = self.dSetAttr[mTag]['t0']
+                tsepList = self.dSetAttr[mTag]['tsep']
+                dispList = self.dSetAttr[mTag]['disp']
+                Nrows = self.dSetAttr[mTag]['Nrows']
 
-            for z3 in dispListAvg:
-                dispTag = tags.disp(z3)
+                for z3 in dispList:
+                    dispTag = tags.disp(z3)
+                    for tsep in tsepList:
+                        tsepTag = tags.tsep(tsep)
+                        for gamma in self.gammaList:
+                            insTag = tags.insertion(gamma)
+                            dkeyAvg = (tsep,z3,gamma)
+
+                            # Write Avg data
+                            for ri in self.RI:
+                                avg_group = 'avg/%s/%s/%s/%s/%s'%(mh5Tag,dispTag,tsepTag,insTag,ri)
+                                dset_name_avgData = avg_group + '/data'
+                                dset_name_avgBins = avg_group + '/bins'
+                                dset_name_avgMean = avg_group + '/mean'
+
+                                hdf5io.createDataset(h5_file, dset_name_avgData, self.avgData[ri][mTag][dkeyAvg], self.outputPolicy)
+                                hdf5io.createDataset(h5_file, dset_name_avgBins, self.avgBins[ri][mTag][dkeyAvg].bins(), self.outputPolicy, bins=True)
+                                hdf5io.createDataset(h5_file, dset_name_avgMean, self.avgMean[ri][mTag][dkeyAvg], self.outputPolicy, dtype='f')
+
+
+                            for t0 in t0List:
+                                t0Tag = tags.t0(t0)
+                                for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
+                                    opTag = tags.src_snk(opPair)
+                                    for row in range(1,Nrows+1):
+                                        rowTag = tags.row(row)
+                                        dkey = (tsep,t0,z3,iop,row,gamma)
+
+                                        # Write the plain data, whatever has been kept of them
+                                        for ri in self.RI:
+                                            plain_group = 'plain/%s/%s/%s/%s/%s/%s/%s/%s'%(mh5Tag,dispTag,tsepTag,insTag,t0Tag,opTag,rowTag,ri)
+                                            dset_name_plainData = plain_group + '/data'
+                                            dset_name_plainBins = plain_group + '/bins'
+                                            dset_name_plainMean = plain_group + '/mean'
+
+                                            if not self.streaming:
+                                                hdf5io.createDataset(h5_file, dset_name_plainData, self.plainData[ri][mTag][dkey], self.outputPolicy)
+                                            if self.plainStatistics:
+                                                hdf5io.createDataset(h5_file, dset_name_plainBins, self.plainBins[ri][mTag][dkey], self.outputPolicy, bins=True)
+                                                hdf5io.createDataset(h5_file, dset_name_plainMean, self.plainMean[ri][mTag][dkey], self.outputPolicy, dtype='f')
+            #--------------------------------------
+        # End writeTree() -------------
+
+        def writeDense(h5_file):
+            # Write the Pz- and z3-averaged data
+            for mom in self.momAvg:
+                mTag = tags.momString(mom)
+                mh5Tag = tags.momH5(mom)
+
+                tsepList = self.dSetAttr[mTag]['tsep']
+                dispListAvg = self.dispAvg[mTag]
+
+                keyAxes = [self.RI, dispListAvg, self.gammaList]
+                axisNames = ['ri','z3','gamma']
                 for tsep in tsepList:
                     tsepTag = tags.tsep(tsep)
-                    for gamma in self.gammaList:
-                        insTag = tags.insertion(gamma)
-                        dkeyAvg = (tsep,z3,gamma)
 
-                        # Write the averaged data
-                        for ri in self.RI:
-                            avg_group = 'fullavg/%s/%s/%s/%s/%s'%(mh5Tag,dispTag,tsepTag,insTag,ri)
-                            dset_name_data = avg_group + '/data'
-                            dset_name_bins = avg_group + '/bins'
-                            dset_name_mean = avg_group + '/mean'
-                            h5_file.create_dataset(dset_name_data, data = self.data[ri][mTag][dkeyAvg])
-                            h5_file.create_dataset(dset_name_bins, data = self.bins[ri][mTag][dkeyAvg])
-                            h5_file.create_dataset(dset_name_mean, data = self.mean[ri][mTag][dkeyAvg],dtype='f')
-        #--------------------------------------
+                    avg_group = 'fullavg/%s/%s'%(mh5Tag,tsepTag)
+                    hdf5io.writeAxes(h5_file, avg_group, dict(zip(axisNames,keyAxes)))
 
-        for mom in self.moms:
-            mTag = tags.momString(mom)
-            mh5Tag = tags.momH5(mom)
-            t0List = self.dSetAttr[mTag]['t0']
-            tsepList = self.dSetAttr[mTag]['tsep']
-            dispList = self.dSetAttr[mTag]['disp']
-            Nrows = self.dSetAttr[mTag]['Nrows']
+                    data = hdf5io.stackDense(lambda ri,z3,gamma: self.data[ri][mTag][(tsep,z3,gamma)], keyAxes)
+                    bins = hdf5io.stackDense(lambda ri,z3,gamma: self.bins[ri][mTag][(tsep,z3,gamma)].bins(), keyAxes)
+                    mean = hdf5io.stackDense(lambda ri,z3,gamma: self.mean[ri][mTag][(tsep,z3,gamma)], keyAxes)
+                    hdf5io.writeDense(h5_file, avg_group + '/data', data, axisNames + ['cfg','t'], policy=self.outputPolicy)
+                    hdf5io.writeDense(h5_file, avg_group + '/bins', bins, axisNames + ['bin','t'], policy=self.outputPolicy, bins=True)
+                    hdf5io.writeDense(h5_file, avg_group + '/mean', mean, axisNames + ['mean-err','t'], dtype='f', policy=self.outputPolicy)
+                    if mTag in self.tauInt['Re'].keys():
+                        tauInt = hdf5io.stackDense(lambda ri,z3,gamma: self.tauInt[ri][mTag][(tsep,z3,gamma)], keyAxes)
+                        hdf5io.writeDense(h5_file, avg_group + '/tauInt', tauInt, axisNames + ['tauInt-err','t'], dtype='f', policy=self.outputPolicy)
+            #--------------------------------------
+
+            for mom in self.moms:
+                mTag = tags.momString(mom)
+                mh5Tag = tags.momH5(mom)
+                t0List = self.dSetAttr[mTag]['t0']
+                tsepList = self.dSetAttr[mTag]['tsep']
+                dispList = self.dSetAttr[mTag]['disp']
+                Nrows = self.dSetAttr[mTag]['Nrows']
+                Nop = self.dSetAttr[mTag]['Nop']
 
-            for z3 in dispList:
-                dispTag = tags.disp(z3)
                 for tsep in tsepList:
                     tsepTag = tags.tsep(tsep)
-                    for gamma in self.gammaList:
-                        insTag = tags.insertion(gamma)
-                        dkeyAvg = (tsep,z3,gamma)
 
-                        # Write Avg data
-                        for ri in self.RI:
-                            avg_group = 'avg/%s/%s/%s/%s/%s'%(mh5Tag,dispTag,tsepTag,insTag,ri)
-                            dset_name_avgData = avg_group + '/data'
-                            dset_name_avgBins = avg_group + '/bins'
-                            dset_name_avgMean = avg_group + '/mean'
-
-                            h5_file.create_dataset(dset_name_avgData, data = self.avgData[ri][mTag][dkeyAvg])
-                            h5_file.create_dataset(dset_name_avgBins, data = self.avgBins[ri][mTag][dkeyAvg])
-                            h5_file.create_dataset(dset_name_avgMean, data = self.avgMean[ri][mTag][dkeyAvg],dtype='f')
-
-
-                        for t0 in t0List:
-                            t0Tag = tags.t0(t0)
-                            for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
-                                opTag = tags.src_snk(opPair)
-                                for row in range(1,Nrows+1):
-                                    rowTag = tags.row(row)
-                                    dkey = (tsep,t0,z3,iop,row,gamma)
-
-                                    # Write the plain data
-                                    for ri in self.RI:
-                                        plain_group = 'plain/%s/%s/%s/%s/%s/%s/%s/%s'%(mh5Tag,dispTag,tsepTag,insTag,t0Tag,opTag,rowTag,ri)
-                                        dset_name_plainData = plain_group + '/data'
-                                        dset_name_plainBins = plain_group + '/bins'
-                                        dset_name_plainMean = plain_group + '/mean'
-
-                                        h5_file.create_dataset(dset_name_plainData, data = self.plainData[ri][mTag][dkey])
-                                        h5_file.create_dataset(dset_name_plainBins, data = self.plainBins[ri][mTag][dkey])
-                                        h5_file.create_dataset(dset_name_plainMean, data = self.plainMean[ri][mTag][dkey],dtype='f')                                
-        #--------------------------------------
+                    # Write Avg data
+                    keyAxes = [self.RI, dispList, self.gammaList]
+                    axisNames = ['ri','z3','gamma']
+
+                    avg_group = 'avg/%s/%s'%(mh5Tag,tsepTag)
+                    hdf5io.writeAxes(h5_file, avg_group, dict(zip(axisNames,keyAxes)))
+
+                    avgData = hdf5io.stackDense(lambda ri,z3,gamma: self.avgData[ri][mTag][(tsep,z3,gamma)], keyAxes)
+                    avgBins = hdf5io.stackDense(lambda ri,z3,gamma: self.avgBins[ri][mTag][(tsep,z3,gamma)].bins(), keyAxes)
+                    avgMean = hdf5io.stackDense(lambda ri,z3,gamma: self.avgMean[ri][mTag][(tsep,z3,gamma)], keyAxes)
+                    hdf5io.writeDense(h5_file, avg_group + '/data', avgData, axisNames + ['cfg','t'], policy=self.outputPolicy)
+                    hdf5io.writeDense(h5_file, avg_group + '/bins', avgBins, axisNames + ['bin','t'], policy=self.outputPolicy, bins=True)
+                    hdf5io.writeDense(h5_file, avg_group + '/mean', avgMean, axisNames + ['mean-err','t'], dtype='f', policy=self.outputPolicy)
+
+                    # Write the plain data
+                    keyAxes = [self.RI, dispList, t0List, list(range(Nop)), list(range(1,Nrows+1)), self.gammaList]
+                    axisNames = ['ri','z3','t0','op','row','gamma']
+
+                    plain_group = 'plain/%s/%s'%(mh5Tag,tsepTag)
+                    hdf5io.writeAxes(h5_file, plain_group, {'ri'   : self.RI,
+                                                            'z3'   : dispList,
+                                                            't0'   : t0List,
+                                                            'op'   : [tags.src_snk(opPair) for opPair in self.dSetAttr[mTag]['intOpList']],
+                                                            'row'  : list(range(1,Nrows+1)),
+                                                            'gamma': self.gammaList})
+
+                    if not self.streaming:
+                        plainData = hdf5io.stackDense(lambda ri,z3,t0,iop,row,gamma: self.plainData[ri][mTag][(tsep,t0,z3,iop,row,gamma)], keyAxes)
+                        hdf5io.writeDense(h5_file, plain_group + '/data', plainData, axisNames + ['cfg','t'], policy=self.outputPolicy)
+                    if self.plainStatistics:
+                        plainBins = hdf5io.stackDense(lambda ri,z3,t0,iop,row,gamma: self.plainBins[ri][mTag][(tsep,t0,z3,iop,row,gamma)], keyAxes)
+                        plainMean = hdf5io.stackDense(lambda ri,z3,t0,iop,row,gamma: self.plainMean[ri][mTag][(tsep,t0,z3,iop,row,gamma)], keyAxes)
+                        hdf5io.writeDense(h5_file, plain_group + '/bins', plainBins, axisNames + ['bin','t'], policy=self.outputPolicy, bins=True)
+                        hdf5io.writeDense(h5_file, plain_group + '/mean', plainMean, axisNames + ['mean-err','t'], dtype='f', policy=self.outputPolicy)
+            #--------------------------------------
+        # End writeDense() -------------
+
+        # The lazy plain data are read from the input file while they are written, so it cannot be overwritten
+        if self.h5Input is not None and os.path.realpath(self.dataInfo['HDF5 Output File']) == os.path.realpath(self.h5Input.filename):
+            raise ValueError('\n"HDF5 Output File" %s is the input file of the lazy plain data, write to a different file'%(
+                self.dataInfo['HDF5 Output File']))
+
+        h5_file = h5py.File(self.dataInfo['HDF5 Output File'],'w')
+        hdf5io.setLayout(h5_file, self.outputLayout)
+
+        if self.outputLayout == 'tree':
+            writeTree(h5_file)
+        elif self.outputLayout == 'dense':
+            writeDense(h5_file)
 
         h5_file.close()
         print('Three-point function data written in HDF5.')
@@ -0,0 +1,116 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+This file contains functions related to the autocorrelations of the data along the configuration dimension,
+with the Gamma method of U. Wolff, Comput.Phys.Commun. 156 (2004) 143.
+The autocorrelation functions of all the series are evaluated at once with FFTs, and the integrated autocorrelation time
+of each series is determined with the automatic windowing procedure of the Gamma method.
+The analysis is set with "Autocorrelation" in "Analysis Info", and it is enabled by default:
+'Enable': Whether the integrated autocorrelation times are evaluated
+'S'     : The parameter of the automatic windowing, tau/tau_int, see Wolff's paper (default 1.5)
+The autocorrelations are evaluated in float64, whatever the precision of the analysis
+'''
+
+import numpy as np
+
+defaultPolicy = {'Enable': True, 'S': 1.5}
+
+# The smallest number of configurations for which the integrated autocorrelation times are evaluated
+minCfg = 4
+
+
+# Return the autocorrelation policy of "Analysis Info", filled in with the defaults
+def getPolicy(analysisInfo):
+    policy = dict(defaultPolicy)
+    if 'Autocorrelation' in analysisInfo.keys():
+        for key,val in analysisInfo['Autocorrelation'].items():
+            if key not in defaultPolicy.keys():
+                raise ValueError('Unsupported entry "%s" in "Autocorrelation". Supported entries are: %s'%(key,list(defaultPolicy.keys())))
+            policy[key] = val
+
+    if policy['S'] <= 0:
+        raise ValueError('The "S" parameter of "Autocorrelation" must be positive, got %s'%(policy['S']))
+
+    return policy
+#-------------------------------
+
+# Autocorrelation function Gamma(t) = 1/(N-t) SUM_i (x_i - xbar)(x_{i+t} - xbar), t = 0,...,N-1, of the series along axis,
+# for all the other dimensions at once. The series are zero-padded to at least twice their length, such that the circular
+# correlation evaluated with the FFT is the linear one. Returns an array with the separation t on the last dimension
+def autocorrelationFunction(data, axis=0):
+    x = np.moveaxis(np.asarray(data, dtype=np.float64), axis, -1)
+    N = np.shape(x)[-1]
+    Nfft = 1 << int(2*N - 1).bit_length()
+
+    dev = x - np.mean(x, axis=-1, keepdims=True)
+    fdev = np.fft.rfft(dev, n=Nfft, axis=-1)
+    gamma = np.fft.irfft(fdev * np.conj(fdev), n=Nfft, axis=-1)[...,:N]
+
+    return gamma / (N - np.arange(N))
+#-------------------------------
+
+# Integrated autocorrelation time of the series along axis, for all the other dimensions at once
+# The summation window W of each series is the first one where exp(-W/tau) - tau/sqrt(W*N) < 0, with tau = S/log((2*tau_int+1)/(2*tau_int-1)),
+# searched up to N/2. The tau_int at the window is corrected for its bias, as in Wolff's paper
+# Returns the tau_int and error arrays, and the window of each series. The tau_int of series without fluctuations are NaN,
+# and so are all of them with less than minCfg configurations, which are too few for the windowing
+def tauInt(data, axis=0, S=defaultPolicy['S']):
+    gamma = autocorrelationFunction(data, axis)
+    N = np.shape(gamma)[-1]
+    if N < minCfg:
+        print('Autocorrelation tauInt: Need at least %d configurations, got %d. The integrated autocorrelation times are set to NaN'%(minCfg,N))
+        nan = np.full(np.shape(gamma)[:-1], np.nan)
+        return (nan, nan.copy(), np.zeros(np.shape(gamma)[:-1], dtype=int))
+
+    Wmax = N // 2
+    W = np.arange(1, Wmax+1)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore', under='ignore'):
+        rho = gamma[...,1:Wmax+1] / gamma[...,:1] # Normalized autocorrelation function
+        tauW = 0.5 + np.cumsum(rho, axis=-1)      # tau_int for each window W
+
+        # Where tau_int <= 0.5 the window is closed right away
+        tauSafe = np.where(tauW > 0.5, tauW, 1.0)
+        tauExp = np.where(tauW > 0.5, S / np.log((2*tauSafe + 1) / (2*tauSafe - 1)), np.finfo(np.float64).tiny)
+        g = np.exp(-W / tauExp) - tauExp / np.sqrt(W * N)
+
+    found = g < 0
+    Wopt = np.where(np.any(found, axis=-1), np.argmax(found, axis=-1) + 1, Wmax)
+
+    tau = np.take_along_axis(tauW, (Wopt - 1)[...,np.newaxis], axis=-1)[...,0]
+    tau = tau * (1 + (2*Wopt + 1) / float(N))
+    err = 2 * tau * np.sqrt(np.maximum(Wopt + 0.5 - tau, 0) / N)
+
+    noFluct = gamma[...,0] <= 0
+    tau = np.where(noFluct, np.nan, tau)
+    err = np.where(noFluct, np.nan, err)
+
+    return (tau, err, Wopt)
+#-------------------------------
+
+# Integrated autocorrelation times of a list of arrays of any shape, with the configurations along axis
+# All the series of the arrays with the same number of configurations are analyzed in one batch
+# Returns a list of (tau_int, error) of the shape of each array without axis
+def tauIntList(dataList, axis=0, S=defaultPolicy['S']):
+    series = [np.moveaxis(np.asarray(data), axis, -1) for data in dataList]
+    shapes = [np.shape(x)[:-1] for x in series]
+
+    # Group the arrays by their number of configurations
+    groups = {}
+    for i,x in enumerate(series):
+        groups.setdefault(np.shape(x)[-1], []).append(i)
+
+    result = [None] * len(series)
+    for N,idxList in groups.items():
+        batch = np.concatenate([series[i].real.reshape((-1,N)) for i in idxList], axis=0)
+        tau,err,Wopt = tauInt(batch, axis=-1, S=S)
+
+        offset = 0
+        for i in idxList:
+            size = int(np.prod(shapes[i], dtype=int))
+            result[i] = (tau[offset:offset+size].reshape(shapes[i]), err[offset:offset+size].reshape(shapes[i]))
+            offset += size
+
+    return result
+#-------------------------------
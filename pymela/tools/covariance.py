@@ -0,0 +1,109 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+This file contains functions related to the Jackknife covariance matrix of the data, e.g. the time-time covariance
+of a correlator or ratio, and the tsep-tsep covariance of the summed ratio, and the correlated fits that use it.
+The covariance matrices are factorized with Cholesky, and the factors are cached, such that every fit range and every bin
+reuses the same factorization instead of inverting the matrix again.
+The factorization and the whitening of the data are carried out in float64, whatever the precision of the analysis
+'''
+
+import numpy as np
+import scipy.linalg as scipyLA
+
+# Jackknife covariance matrix of a stack of bins of any shape, with the bins along the sampled dimension, axis,
+# and the observable (e.g. t or tsep) along the last dimension
+# Returns a (..., Nobs, Nobs) array, where ... are the remaining dimensions of the bins
+# The diagonal is the square of the Jackknife error, see jackknife.meanArray()
+def covarianceMatrix(bins, axis=0, shrinkage=0.0):
+    bins = np.asarray(bins)
+    if axis % bins.ndim == bins.ndim - 1:
+        raise ValueError('Covariance: The sampled dimension cannot be the observable (last) dimension')
+
+    bins = np.moveaxis(bins, axis, -2) # A (..., Nbins, Nobs) array
+    Nb = np.shape(bins)[-2]
+
+    dev = bins - np.mean(bins, axis=-2, keepdims=True)
+    cov = (Nb - 1) / float(Nb) * np.matmul(np.swapaxes(dev, -1, -2), dev)
+
+    return shrink(cov, shrinkage)
+#-------------------------------------
+
+# Shrink the covariance matrix towards its diagonal, (1-shrinkage)*cov + shrinkage*diag(cov)
+# The errors are not changed, only the correlations are reduced by a factor of (1-shrinkage)
+def shrink(cov, shrinkage):
+    if shrinkage < 0 or shrinkage > 1:
+        raise ValueError('Covariance: The shrinkage must be within [0,1], got %s'%(shrinkage))
+    if shrinkage == 0:
+        return cov
+
+    diag = np.diagonal(cov, axis1=-2, axis2=-1)
+    return (1 - shrinkage) * cov + shrinkage * (diag[...,np.newaxis] * np.eye(np.shape(cov)[-1]))
+#-------------------------------------
+
+# Correlation matrix, the covariance matrix normalized by the errors
+def correlationMatrix(cov):
+    err = np.sqrt(np.diagonal(cov, axis1=-2, axis2=-1))
+    return cov / (err[...,np.newaxis] * err[...,np.newaxis,:])
+#-------------------------------------
+
+# Lower-triangular Cholesky factor L of a covariance matrix, cov = L L^T
+def choleskyFactor(cov):
+    try:
+        return np.linalg.cholesky(np.asarray(cov, dtype=np.float64))
+    except np.linalg.LinAlgError:
+        raise ValueError('Covariance: The covariance matrix is not positive definite. Use more bins, a shorter fit range or shrinkage')
+#-------------------------------------
+
+# Whiten the data with the Cholesky factor of their covariance matrix, L^-1 data, along the last dimension of data
+# Any number of data vectors (e.g. all the bins) are whitened at once
+def whiten(cholFactor, data):
+    data = np.asarray(data, dtype=np.float64)
+    Nobs = np.shape(cholFactor)[0]
+    if np.shape(data)[-1] != Nobs:
+        raise ValueError('Covariance: Got data of length %d for a %dx%d covariance matrix'%(np.shape(data)[-1],Nobs,Nobs))
+
+    res = scipyLA.solve_triangular(cholFactor, data.reshape((-1,Nobs)).T, lower=True, check_finite=False)
+    return res.T.reshape(np.shape(data))
+#-------------------------------------
+
+# Correlated chi-square of the residuals, r^T cov^-1 r, along the last dimension
+def chiSquare(cholFactor, residuals):
+    wres = whiten(cholFactor, residuals)
+    return np.sum(wres*wres, axis=-1)
+#-------------------------------------
+
+
+# Cache of the covariance matrices and their Cholesky factors
+# The covariance matrix is evaluated once for each (mTag, dkey), from the bins of the whole observable range, and the
+# factor of each fit range, rng = (first,last) on the observable dimension (last included), is evaluated once for each (mTag, dkey, rng)
+class CholeskyCache():
+    def __init__(self, shrinkage=0.0):
+        shrink(np.zeros((1,1)), shrinkage) # Check the value of the shrinkage
+        self.shrinkage = shrinkage
+
+        self.cov = {}
+        self.factors = {}
+    # End __init__() -------------
+
+    # The covariance matrix of the bins of (mTag, dkey), with the bins on the first dimension and the observable on the second
+    def getCovariance(self, mTag, dkey, bins):
+        if (mTag,dkey) not in self.cov.keys():
+            self.cov[(mTag,dkey)] = covarianceMatrix(bins, axis=0, shrinkage=self.shrinkage)
+        return self.cov[(mTag,dkey)]
+    #-------------------------------
+
+    def getFactor(self, mTag, dkey, rng, bins):
+        if (mTag,dkey,rng) not in self.factors.keys():
+            first,last = rng
+            cov = self.getCovariance(mTag,dkey,bins)
+            self.factors[(mTag,dkey,rng)] = choleskyFactor(cov[first:last+1,first:last+1])
+        return self.factors[(mTag,dkey,rng)]
+    #-------------------------------
+
+    def clear(self):
+        self.cov = {}
+        self.factors = {}
+    #-------------------------------
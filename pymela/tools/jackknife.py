@@ -8,56 +8,240 @@ This file contains functions related to Jackknife sampling
 
 import numpy as np
 
+import pymela.tools.precision as prec
+
 # Define the number of bins
 def Nbins(Ndata, binsize=1):
     mod   = Ndata%binsize
     return (Ndata - mod) // binsize # That's always an integer
 #-------------------------------------
 
+# Jackknife sampling of a 1-d sample
 def sampling(sample, Nbins, binsize=1):
 
     if len(np.shape(sample)) != 1:
-        raise ValueError('Jackknife sampling: Works only with 1-d samples for now!')
+        raise ValueError('Jackknife sampling: Works only with 1-d samples, use samplingArray() for N-d samples')
+
+    return samplingArray(sample, binsize)[:Nbins]
+#-------------------------------------
 
-    Ndata = len(sample)
+# Jackknife sampling of an N-d sample along the configuration dimension, axis, in one go for all the other dimensions
+# The bins replace the configurations along axis. The configurations that do not fill a complete bin are thrown away
+def samplingArray(sample, binsize=1, axis=0):
+    sample = np.asarray(sample)
+    Ndata = np.shape(sample)[axis]
+    Nb    = Nbins(Ndata, binsize)
     mod   = Ndata%binsize
 
-    bins = np.zeros(Nbins,dtype=sample.dtype)
+    # A view with the configurations on the first dimension, the sums are reductions along it, without copying the sample
+    data = np.moveaxis(sample, axis, 0)[:Nb*binsize]
+
+    csum = prec.compensatedSum(data, axis=0) # Sum w.r.t to the configurations of the complete bins, compensated for float64 samples
+    bsum = np.sum(data.reshape((Nb,binsize) + np.shape(data)[1:]), axis=1) # Sum within each bin
+
+    bins = (csum - bsum) / float(Ndata - binsize - mod) # Bin averages for each bin
+
+    return np.moveaxis(bins.astype(sample.dtype, copy=False), 0, axis)
+#-------------------------------------
 
-    csum = np.sum(sample) # Sum w.r.t to the configurations
-    for m in np.arange(1,mod+1):
-        csum -= sample[Ndata-m]  # Throw away data in case there is modulo
-            
-    for b in range(Nbins):
-        bsum = 0
-        for k in range(binsize):
-            bsum += sample[b*binsize+k]
-            
-        bins[b] = (csum - bsum) / float(Ndata - binsize - mod) # Bin averages for each bin,t
+# Sums of the data within each complete bin, along the first (configuration) dimension
+# The configurations that do not fill a complete bin are left out
+def binSums(sample, binsize=1):
+    Nb = Nbins(np.shape(sample)[0], binsize)
+    sample = np.asarray(sample)[:Nb*binsize]
+    return np.sum(sample.reshape((Nb,binsize) + np.shape(sample)[1:]), axis=1)
+#-------------------------------------
 
-    return bins
+# Jackknife bins from the sums of the data in each bin, equivalent to sampling() on the data.
+# The sums of new bins can be appended as more configurations become available, without revisiting the older data
+def samplingFromBinSums(binSums, binsize=1):
+    Nb = np.shape(binSums)[0]
+    csum = prec.compensatedSum(binSums, axis=0)
+    return (csum - binSums) / float((Nb - 1) * binsize)
 #-------------------------------------
 
-def mean(bins,Nbins,Nspl):
+# Jackknife mean and error of the bins, with the sampled dimension first
+# Nspl is the number of values for each bin, kept for compatibility. The bins may have any shape, see meanArray()
+def mean(bins,Nbins,Nspl=1):
 
     if np.shape(bins)[0] != Nbins:
         raise ValueError('Jackknife mean: The sampled dimension must be the first one in the "bins" array')
-    Jax = 0
-    
-    if(Nspl==1):
-        ave = np.mean(bins,dtype=bins.dtype)
-
-        sqsum = sum(map(lambda x:x*x,ave-bins))
-        fac = (Nbins -1) / float(Nbins)
-        err = np.sqrt(fac*sqsum)
+
+    return meanArray(bins)
+#-------------------------------------
+
+# Jackknife mean and error along the sampled dimension, axis, of a stack of bins of any shape
+# Returns the mean and error arrays, of the shape of the bins without the sampled dimension
+# With ignoreNaN, bins that hold NaN (e.g. failed fits or logs of negative ratios) are left out of each mean and error,
+# and the error is evaluated with the number of the remaining bins. Means of less than two bins are NaN
+def meanArray(bins, axis=0, ignoreNaN=False):
+    bins = np.asarray(bins)
+
+    # The sums over the bins are compensated for float64 bins, see precision.py
+    if ignoreNaN:
+        valid = ~np.isnan(bins)
+        Nvalid = np.sum(valid, axis=axis)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ave = prec.compensatedSum(np.where(valid, bins, 0), axis=axis) / Nvalid
+            dev = np.where(valid, bins - np.expand_dims(ave, axis), 0)
+            sqsum = prec.compensatedSum(dev*dev, axis=axis).real
+            fac = np.where(Nvalid > 1, (Nvalid - 1) / Nvalid.astype(np.float64), np.nan)
+        ave = np.where(Nvalid > 1, ave, np.nan)
     else:
-        ave = np.mean(bins, axis=Jax,dtype=bins.dtype)
-
-        err = np.zeros(Nspl,dtype=np.float128)
-        for i in range(Nspl):
-            sqsum = sum(map(lambda x:x*x,ave[i]-bins[:,i]))
-            fac = (Nbins -1) / float(Nbins)
-            err[i] = np.sqrt(fac*sqsum.real)        
-            
+        Nvalid = np.shape(bins)[axis]
+        ave = prec.compensatedSum(bins, axis=axis) / Nvalid
+        dev = bins - np.expand_dims(ave, axis)
+        sqsum = prec.compensatedSum(dev*dev, axis=axis).real
+        fac = (Nvalid - 1) / float(Nvalid)
+
+    err = np.sqrt(fac*sqsum)
+
     return (ave,err)
 #-------------------------------------
+
+# Jackknife bins kept in terms of the sums of the data within each bin (along the first dimension), and their total.
+# The bins are a fixed affine function of the bin sums, see samplingFromBinSums(), so linear operations on the data (sums,
+# scaling, averages) are carried out on the bin sums, and the bins, mean and error are evaluated only when they are needed
+class JackknifeArray():
+    def __init__(self, binSums, binsize=1, total=None):
+        self.binSums = np.asarray(binSums)
+        self.binsize = binsize
+        self.total = prec.compensatedSum(self.binSums, axis=0) if total is None else np.asarray(total)
+
+        if np.shape(self.binSums)[0] < 2:
+            raise ValueError('JackknifeArray: Need at least two bins, got %d'%(np.shape(self.binSums)[0]))
+    # End __init__() -------------
+
+    # Build from a sample, with the configurations along axis. The configurations that do not fill a complete bin are thrown away
+    @classmethod
+    def fromSample(cls, sample, binsize=1, axis=0):
+        return cls(binSums(np.moveaxis(np.asarray(sample), axis, 0), binsize), binsize)
+    #-------------------------------
+
+    # Build from Jackknife bins, e.g. those of a nonlinear function of the data, with the bins on the first dimension
+    # The bin sums are binsize times the Jackknife pseudovalues, Nbins*mean - (Nbins-1)*bins, whose bins() are the input bins
+    @classmethod
+    def fromBins(cls, bins, binsize=1):
+        bins = np.asarray(bins)
+        Nb = np.shape(bins)[0]
+        ave = prec.compensatedSum(bins, axis=0) / Nb
+        return cls(binsize * (Nb*ave - (Nb - 1)*bins), binsize, binsize*Nb*ave)
+    #-------------------------------
+
+    @property
+    def Nbins(self):
+        return np.shape(self.binSums)[0]
+
+    # The shape of the data, without the bins
+    @property
+    def shape(self):
+        return np.shape(self.binSums)[1:]
+
+    def bins(self):
+        return (self.total - self.binSums) / float((self.Nbins - 1) * self.binsize)
+    #-------------------------------
+
+    def mean(self, ignoreNaN=False):
+        return meanArray(self.bins(), ignoreNaN=ignoreNaN)
+    #-------------------------------
+
+    def checkCompatible(self, other):
+        if not isinstance(other, JackknifeArray):
+            raise ValueError('JackknifeArray: Linear operations are supported only between JackknifeArrays and with scalars')
+        if self.Nbins != other.Nbins or self.binsize != other.binsize:
+            raise ValueError('JackknifeArray: Got inconsistent number of bins (%d, %d) or binsize (%d, %d)'%(self.Nbins,other.Nbins,
+                                                                                                                self.binsize,other.binsize))
+    #-------------------------------
+
+    def __add__(self, other):
+        self.checkCompatible(other)
+        return JackknifeArray(self.binSums + other.binSums, self.binsize, self.total + other.total)
+
+    def __sub__(self, other):
+        self.checkCompatible(other)
+        return JackknifeArray(self.binSums - other.binSums, self.binsize, self.total - other.total)
+
+    def __neg__(self):
+        return JackknifeArray(-self.binSums, self.binsize, -self.total)
+
+    def __mul__(self, scale):
+        if not np.isscalar(scale):
+            raise ValueError('JackknifeArray: Can only be scaled by a scalar')
+        return JackknifeArray(self.binSums * scale, self.binsize, self.total * scale)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scale):
+        return self * (1.0 / scale)
+
+    # Index the data dimensions, all the bins are kept
+    def __getitem__(self, index):
+        index = index if isinstance(index, tuple) else (index,)
+        return JackknifeArray(self.binSums[(slice(None),) + index], self.binsize, self.total[index])
+
+    # Sum or average over a data dimension
+    def sum(self, axis):
+        axis = axis % len(self.shape)
+        return JackknifeArray(np.sum(self.binSums, axis=axis+1), self.binsize, np.sum(self.total, axis=axis))
+
+    def average(self, axis):
+        return self.sum(axis) / self.shape[axis]
+#-------------------------------------
+
+# Linear combination of JackknifeArrays, an average if no weights are given
+# Works the same for arrays of bins or of data, since Jackknife sampling is linear
+def linearCombination(jkArrays, weights=None):
+    if weights is None:
+        weights = [1.0 / len(jkArrays)] * len(jkArrays)
+    if len(weights) != len(jkArrays):
+        raise ValueError('Jackknife linearCombination: Got %d arrays and %d weights'%(len(jkArrays),len(weights)))
+
+    result = jkArrays[0] * weights[0]
+    for jkArr,w in zip(jkArrays[1:],weights[1:]):
+        result = result + jkArr * w
+    return result
+#-------------------------------------
+
+# Stack JackknifeArrays of the same shape along a new first data dimension
+def stack(jkArrays):
+    for jkArr in jkArrays[1:]:
+        jkArrays[0].checkCompatible(jkArr)
+    return JackknifeArray(np.stack([jkArr.binSums for jkArr in jkArrays], axis=1), jkArrays[0].binsize,
+                          np.stack([jkArr.total for jkArr in jkArrays]))
+#-------------------------------------
+
+# The bins of a JackknifeArray, or the array itself if it already holds bins
+def toBins(bins):
+    return bins.bins() if isinstance(bins, JackknifeArray) else np.asarray(bins)
+#-------------------------------------
+
+# Jackknife mean and error of an N-d sample for each binsize in binsizeList, in a single pass over the configurations along axis
+# The prefix sums of the configurations are evaluated once, and the sum of each bin, for any binsize, is the difference of two of them.
+# The sample is centered first, which leaves the errors unchanged and keeps the prefix sums small
+# Returns the mean and error arrays, with the binsizes on the first dimension followed by the dimensions of the sample without axis
+def binsizeScan(sample, binsizeList, axis=0):
+    data = np.moveaxis(np.asarray(sample), axis, 0)
+    Ndata = np.shape(data)[0]
+
+    center = prec.compensatedSum(data, axis=0) / Ndata
+    psum = np.zeros((Ndata+1,) + np.shape(data)[1:], dtype=data.dtype)
+    np.cumsum(data - center, axis=0, out=psum[1:])
+
+    aveList, errList = [], []
+    for binsize in binsizeList:
+        Nb = Nbins(Ndata, binsize)
+        if Nb < 2:
+            raise ValueError('Jackknife binsizeScan: Binsize %d leaves %d bin(s) out of %d configurations, need at least two'%(binsize,Nb,Ndata))
+
+        edges = psum[0:Nb*binsize+1:binsize]
+        ave,err = JackknifeArray(edges[1:] - edges[:-1], binsize).mean()
+        aveList.append(ave + center)
+        errList.append(err)
+
+    return (np.array(aveList), np.array(errList))
+#-------------------------------------
+
+# All the binsizes that leave at least minBins bins out of Ndata configurations
+def binsizeList(Ndata, minBins=2):
+    return [binsize for binsize in range(1, Ndata//minBins + 1) if Nbins(Ndata, binsize) >= minBins]
+#-------------------------------------
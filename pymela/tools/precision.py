@@ -0,0 +1,96 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+This file contains the floating-point precision policy of the analysis, set with "Precision" in "Analysis Info".
+The ASCII data are parsed, and all the statistical analysis (sampling, averages, ratios and fits) is carried out in this precision.
+'double'  : float64, with compensated summation for the long sums over configurations and datasets. The default
+'extended': long double, available only on platforms where it is actually wider than float64. Much slower, and twice the memory
+'''
+
+import numpy as np
+
+# The supported precisions, with the real and complex types of each
+precisionTypes = {'double': np.float64, 'extended': np.longdouble}
+complexTypes   = {'double': np.complex128, 'extended': np.clongdouble}
+
+defaultPrecision = 'double'
+
+
+def getPrecisionType(precision=defaultPrecision):
+    if precision not in precisionTypes.keys():
+        raise ValueError('Unsupported precision "%s". Supported precisions are: %s'%(precision,list(precisionTypes.keys())))
+
+    if precision == 'extended' and np.finfo(np.longdouble).eps >= np.finfo(np.float64).eps:
+        raise ValueError('Extended precision requested, but long double is not wider than float64 on this platform')
+
+    return precisionTypes[precision]
+#-------------------------------
+
+def getComplexType(precision=defaultPrecision):
+    getPrecisionType(precision)
+    return complexTypes[precision]
+#-------------------------------
+
+# Return the precision set in "Analysis Info", making sure it is supported
+def getPrecision(analysisInfo):
+    precision = analysisInfo['Precision'] if 'Precision' in analysisInfo.keys() else defaultPrecision
+    getPrecisionType(precision)
+    return precision
+#-------------------------------
+
+# Number of terms in each block of compensatedSum()
+compensationBlock = 32
+
+# Sum along axis with Neumaier's compensated summation, vectorized over all the other dimensions
+# The terms are summed by numpy in blocks of compensationBlock terms, and only the block partial sums are compensated,
+# so the rounding error of a float64 sum does not grow with the number of terms. Wider types are summed directly
+def compensatedSum(data, axis=0):
+    data = np.asarray(data)
+    if data.dtype not in [np.float64, np.complex128]:
+        return np.sum(data, axis=axis)
+
+    if np.iscomplexobj(data):
+        return compensatedSum(data.real, axis) + 1j*compensatedSum(data.imag, axis)
+
+    data = np.moveaxis(data, axis, 0)
+    N = np.shape(data)[0]
+    Nblocks = N // compensationBlock
+
+    # The partial sums of the blocks, and of the remaining terms
+    partials = [np.sum(data[:Nblocks*compensationBlock].reshape((Nblocks,compensationBlock) + np.shape(data)[1:]), axis=1)]
+    if N % compensationBlock != 0 or N == 0:
+        partials.append(np.sum(data[Nblocks*compensationBlock:], axis=0)[np.newaxis])
+    partials = np.concatenate(partials)
+
+    total = partials[0].copy()
+    comp  = np.zeros_like(total)
+    for x in partials[1:]:
+        t = total + x
+        comp += np.where(np.abs(total) >= np.abs(x), (total - t) + x, (x - t) + total)
+        total = t
+
+    return total + comp
+#-------------------------------
+
+# Maximum absolute and relative deviation of the values from the reference values, where both are nested
+# dicts / tuples / lists of arrays, such as the bins and mean containers of the analysis classes
+# NaN values in the same positions are not considered a deviation
+def maxDeviation(ref, val):
+    if isinstance(ref, dict):
+        devs = [maxDeviation(ref[k], val[k]) for k in ref.keys()]
+    elif isinstance(ref, (tuple,list)):
+        devs = [maxDeviation(r, v) for r,v in zip(ref,val)]
+    elif hasattr(ref, 'bins'): # JackknifeArrays are compared by their bins
+        return maxDeviation(ref.bins(), val.bins() if hasattr(val, 'bins') else val)
+    else:
+        ref = np.asarray(ref, dtype=np.longdouble if not np.iscomplexobj(ref) else np.clongdouble)
+        val = np.asarray(val, dtype=ref.dtype)
+        absDev = np.where(np.isnan(ref) & np.isnan(val), 0, np.abs(val - ref))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            relDev = np.where(absDev > 0, absDev / np.abs(ref), 0)
+        return (float(np.max(absDev, initial=0)), float(np.max(relDev, initial=0)))
+
+    return (max([d[0] for d in devs], default=0.0), max([d[1] for d in devs], default=0.0))
+#-------------------------------
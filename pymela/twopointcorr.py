@@ -8,9 +8,18 @@ Class definition that holds data and manipulates Two-point correlation functions
 
 import pymela.io.json_io as JSONio
 import pymela.io.file_formats as ioForm
+import pymela.io.ascii_io as ASCIIio
+import pymela.io.ascii_cache as ASCIIcache
+import pymela.io.manifest as manifest
+import pymela.io.hdf5_io as hdf5io
+import pymela.io.append_store as appendio
 import pymela.tools.tag_creators as tags
 import pymela.tools.jackknife as jackknife
+import pymela.tools.precision as prec
+import pymela.tools.autocorrelation as autocorr
+from pymela.io.pipeline import PrefetchReader, defaultQueueSize
 
+import os
 import numpy as np
 import h5py
 
@@ -35,20 +44,30 @@ class TwoPointCorrelator():
         self.plainData = {}    # The data that is read/loaded
         self.plainBins = {}    # The Jackknife sampling bins of the plain data
         self.plainMean = {}    # The Jackknife mean of the plain data
+        self.plainBinSums = {} # The sums of the plain data within each Jackknife bin, when they are kept in an append store
 
         self.avgData = {}     # The averaged data
-        self.avgBins = {}     # The Jackknife sampling bins of the averaged data
+        self.avgBins = {}     # The JackknifeArray of the averaged data, see jackknife.JackknifeArray
         self.avgMean = {}     # The Jackknife mean of the averaged data
         
         self.data = {}     # The momentum-averaged data
-        self.bins = {}     # The Jackknife sampling bins of the momentum-averaged data
+        self.bins = {}     # The JackknifeArray of the momentum-averaged data
         self.mean = {}     # The Jackknife mean of the momentum-averaged data
+        self.tauInt = {}   # The integrated autocorrelation time of the momentum-averaged data, and its error
 
         self.Nbins = 0     # The number of Jackknife bins (same for plain and averaged data)
 
         self.covMean = {}  # Average over all attributes but t0, needed for the Covariant Matrix
+        self.covSum = {}   # Sum over all attributes but t0, accumulated during the statistical analysis
+
+        # The sums of the plain data, and of their JackknifeArrays, that give the averaged data
+        # They are kept as they are by doStatistics(), which can be called again after the data have been accumulated while reading
+        self.avgSum = {}
+        self.avgBinsSum = {}
 
         self.dataLoaded = False
+        self.plainAccumulated = False # Whether the plain data have been sampled and accumulated while reading
+        self.h5Input = None # The input HDF5 file, kept open while there are lazy plain data, see close()
 
         self.supportedDataSources = ['ASCII','HDF5']
 
@@ -63,16 +82,62 @@ class TwoPointCorrelator():
         if self.dataSource == 'HDF5' and 'HDF5 File' not in self.dataInfo['Input Data'].keys():
             raise ValueError('\n"HDF5 File" must be provided in "Input Data" when data source is "HDF5"')
 
+        # Layout of the HDF5 output file
+        self.outputLayout = self.dataInfo['HDF5 Output Layout'] if 'HDF5 Output Layout' in self.dataInfo.keys() else 'tree'
+        if self.outputLayout not in hdf5io.supportedLayouts:
+            raise ValueError('\nUnsupported "HDF5 Output Layout" = %s. Supported layouts are: %s'%(self.outputLayout,hdf5io.supportedLayouts))
+
+        # Chunking, compression and storage precision of the HDF5 output
+        self.outputPolicy = hdf5io.getOutputPolicy(self.analysisInfo)
+
+        # Directory of the binary cache store of the ASCII data, no caching by default
+        self.cacheDir = self.dataInfo['Input Data']['Cache Directory'] if 'Cache Directory' in self.dataInfo['Input Data'].keys() else None
+
+        # Lazy mode: the plain data are read from the HDF5 file only when they are accessed
+        self.lazy = self.dataInfo['Input Data']['Lazy'] if 'Lazy' in self.dataInfo['Input Data'].keys() else False
+        if self.lazy and self.dataSource != 'HDF5':
+            raise ValueError('\n"Lazy" mode is supported only when data source is "HDF5"')
+
+        # Pipeline mode: the ASCII files are read in the background while the data already read are being sampled
+        self.pipeline = False
+        if 'Pipeline' in self.dataInfo['Input Data'].keys():
+            self.pipeline = self.dataInfo['Input Data']['Pipeline']['Enable']
+            self.pipelineQueueSize = self.dataInfo['Input Data']['Pipeline'].get('Queue Size', defaultQueueSize)
+            if type(self.pipelineQueueSize) != int or self.pipelineQueueSize < 1:
+                raise ValueError('\n"Queue Size" of "Pipeline" must be a positive integer')
+            if self.pipeline and self.dataSource != 'ASCII':
+                raise ValueError('\n"Pipeline" mode is supported only when data source is "ASCII"')
+
+        # Append store: HDF5 store of the plain data, to which only the configurations newly added in the ASCII files are appended
+        self.appendStoreFile = self.dataInfo['Input Data']['Append Store'] if 'Append Store' in self.dataInfo['Input Data'].keys() else None
+        if self.appendStoreFile is not None and (self.dataSource != 'ASCII' or self.pipeline or self.cacheDir is not None):
+            raise ValueError('\n"Append Store" is supported only when data source is "ASCII", without "Pipeline" or "Cache Directory"')
 
         # Fill in Attributes
         self.Nvec = self.analysisInfo['Nvec']
         self.binsize = self.analysisInfo['Binsize']
 
+        # Floating-point precision of the parsed ASCII data and of the statistical analysis
+        self.precision = prec.getPrecision(self.analysisInfo)
+        self.floatType = prec.getPrecisionType(self.precision)
+        self.complexType = prec.getComplexType(self.precision)
+
+        # Autocorrelation analysis of the momentum-averaged data, see autocorrelation.py
+        self.autocorrPolicy = autocorr.getPolicy(self.analysisInfo)
+
+        # Subset of the configurations for a quick look at the data, all of them by default
+        self.cfgSlice = JSONio.getConfigSlice(self.analysisInfo)
+        if self.cfgSlice is not None and self.appendStoreFile is not None:
+            raise ValueError('\n"Append Store" cannot be used together with "Config Range"/"Config Stride"')
+
+        # Restrict the data to a subset of the attributes, such that the rest are never read
+        self.selection = JSONio.getSelection(self.dataInfo, ['Mom List','t0'])
+
         self.moms  = []
         self.dSetAttr = {}
         self.dSetList = self.dataInfo['Datasets']
         for dSet in self.dSetList:
-            momList = dSet['Mom List']
+            momList = [mom for mom in dSet['Mom List'] if 'Mom List' not in self.selection.keys() or mom in self.selection['Mom List']]
 
             if dSet['Compute X-rows']:
                 raise ValueError('Does not support doing cross-rows in two-point function for now!')
@@ -86,7 +151,15 @@ class TwoPointCorrelator():
                 self.moms.append(momVec)
 
                 for attr in ['t0','Ncfg','Nt','Nrows','Compute X-rows','Phase Info']:
-                    self.dSetAttr[mTag][attr] = dSet[attr]
+                    self.dSetAttr[mTag][attr] = JSONio.applySelection(dSet[attr], self.selection, attr)
+
+                # Quick-look mode: only a subset of the configurations is read and analyzed
+                self.dSetAttr[mTag]['Ncfg File'] = dSet['Ncfg']
+                if self.cfgSlice is not None:
+                    self.dSetAttr[mTag]['Ncfg'] = len(range(dSet['Ncfg'])[self.cfgSlice])
+                    if jackknife.Nbins(self.dSetAttr[mTag]['Ncfg'],self.binsize) < 2:
+                        raise ValueError('\n"Config Range"/"Config Stride" leave %d configurations, too few for Jackknife sampling with binsize = %d'%(
+                                         self.dSetAttr[mTag]['Ncfg'],self.binsize))
 
                 # Read source-sink operators
                 intOpFile = dSet['Interpolating Operators File']                
@@ -97,6 +170,9 @@ class TwoPointCorrelator():
                         self.dSetAttr[mTag]['intOpList'].append((op.split()[0],op.split()[1]))
                 self.dSetAttr[mTag]['Nop'] = len(ops)
 
+        if len(self.moms) == 0:
+            raise ValueError('\n"Selection" of "Mom List" = %s leaves no momenta in "Datasets"'%(self.selection['Mom List']))
+
         # Get the momenta that will be averaged over        
         self.momAvg = [[0,0,zm] for zm in list(dict.fromkeys(np.abs([z for x,y,z in self.moms])))]
         self.momAvg.sort()
@@ -120,62 +196,136 @@ class TwoPointCorrelator():
         print('\n Will average over the momenta:', self.momAvg)
     #-------------------------------
 
+    # The list of (dkey, file name) of the ASCII data for a given momentum
+    def getFileListASCII(self, mom):
+        mainDir = self.dataInfo['Input Data']['Main Directory']
+
+        mTag = tags.momString(mom)
+        mFTag = tags.momFile(mom)
+        t0List = self.dSetAttr[mTag]['t0']
+        Nrows = self.dSetAttr[mTag]['Nrows']
+        phaseInfo = self.dSetAttr[mTag]['Phase Info']
+
+        # Determine phase tag based on momentum sign
+        if list(phaseInfo.keys())[0] == 'unphased':
+            phFile = phaseInfo['unphased']
+            phDir = 'unphased'
+        elif list(phaseInfo.keys())[0] == 'phased':
+            phFile = phaseInfo['phased']['Plus'] if mom[2] >= 0 else phaseInfo['phased']['Minus']
+            phDir = 'phased/' + phFile
+        else:
+            raise ValueError('Supported Phase Tag keys are ["unphased","phased"]')
+
+        fileList = []
+        for t0 in t0List:
+            t0Tag = tags.t0(t0)
+            fileDir = ioForm.getTwoPointDirASCII(mainDir,phDir,t0Tag,mFTag)
+            for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
+                srcOp,snkOp = opPair
+                for row in range(1,Nrows+1):
+                    dkey = (t0,iop,row)
+                    fileName = ioForm.getTwoPointFileNameASCII(phFile,t0Tag,srcOp,snkOp,row,mFTag,self.Nvec)
+                    fileList.append((dkey,'%s/%s'%(fileDir,fileName)))
+
+        return fileList
+    #-------------------------------
+
     def getData(self):
 
         def getDataASCII():
             print('\nWill read data from ASCII files')
 
-            mainDir = self.dataInfo['Input Data']['Main Directory']
-
+            # Determine the files that will be read, for each momentum, and check them all before any parsing starts
+            entries = []
             for mom in self.moms:
                 mTag = tags.momString(mom)
-                mFTag = tags.momFile(mom)
-                t0List = self.dSetAttr[mTag]['t0']
-                Nrows = self.dSetAttr[mTag]['Nrows']
-                phaseInfo = self.dSetAttr[mTag]['Phase Info']
-
-                # Determine phase tag based on momentum sign
-                if list(phaseInfo.keys())[0] == 'unphased':
-                    phFile = phaseInfo['unphased']
-                    phDir = 'unphased'
-                elif list(phaseInfo.keys())[0] == 'phased':
-                    phFile = phaseInfo['phased']['Plus'] if mom[2] >= 0 else phaseInfo['phased']['Minus']
-                    phDir = 'phased/' + phFile
-                else:
-                    raise ValueError('Supported Phase Tag keys are ["unphased","phased"]')
-
-                # These are the dimensions of each dataset
-                Ncfg = self.dSetAttr[mTag]['Ncfg']
-                Nt = self.dSetAttr[mTag]['Nt']
-
                 self.plainData[mTag] = {}
-                for t0 in t0List:
-                    t0Tag = tags.t0(t0)
-                    fileDir = ioForm.getTwoPointDirASCII(mainDir,phDir,t0Tag,mFTag)
-                    print('Reading two-point data for momentum %s, t0 = %d'%(mTag,t0))
-
-                    for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
-                        srcOp,snkOp = opPair
-
-                        for row in range(1,Nrows+1):
-                            dkey = (t0,iop,row)
-
-                            fileName = ioForm.getTwoPointFileNameASCII(phFile,t0Tag,srcOp,snkOp,row,mFTag,self.Nvec)
-                            fullFileName = '%s/%s'%(fileDir,fileName)
-                            
-                            self.plainData[mTag][dkey] = np.zeros((Ncfg,Nt), dtype=np.complex128)
-                            
-                            with open(fullFileName) as fp:
-                                line = fp.readlines()
-                                c = 0
-                                for n in line:
-                                    it   = c%Nt
-                                    icfg = c//Nt
-                                    self.plainData[mTag][dkey][icfg,it] = complex(np.float128(n.split()[1]),
-                                                                                    np.float128(n.split()[2]))
-                                    c += 1
-                            
-                print('Reading two-point data for momentum %s completed.'%(mTag))
+                Nrows = self.dSetAttr[mTag]['Ncfg File'] * self.dSetAttr[mTag]['Nt']
+                entries += [((mTag,dkey),fileName,Nrows) for dkey,fileName in self.getFileListASCII(mom)]
+
+            fileList = {tags.momString(mom): [] for mom in self.moms}
+            for (mTag,dkey),fileName,Nrows in manifest.scanManifest(entries, 'Two-point'):
+                fileList[mTag].append((dkey,fileName))
+
+            if self.appendStoreFile is not None:
+                # Only the configurations added since the last update of the store are read from the ASCII files
+                store = appendio.openStore(self.appendStoreFile, self.binsize)
+                for mom in self.moms:
+                    mTag = tags.momString(mom)
+                    mh5Tag = tags.momH5(mom)
+                    Ncfg = self.dSetAttr[mTag]['Ncfg']
+                    Nt = self.dSetAttr[mTag]['Nt']
+
+                    self.plainBinSums[mTag] = {}
+                    NnewList = []
+                    for dkey,fileName in fileList[mTag]:
+                        t0,iop,row = dkey
+                        group = 'plain/%s/%s/%s/%s'%(mh5Tag,tags.t0(t0),tags.src_snk(self.dSetAttr[mTag]['intOpList'][iop]),tags.row(row))
+                        self.plainData[mTag][dkey], self.plainBinSums[mTag][dkey], Nnew = appendio.appendCorrelator(store,group,fileName,Ncfg,Nt,
+                                                                                                                    self.binsize,self.precision)
+                        NnewList.append(Nnew)
+                    appendio.reportNewConfigurations('Two-point',mTag,NnewList,Ncfg)
+                store.close()
+            elif self.pipeline:
+                # Read the files in the background, sample each dataset as soon as it arrives
+                taskList = []
+                parsed = {}
+                for mom in self.moms:
+                    mTag = tags.momString(mom)
+                    Ncfg = self.dSetAttr[mTag]['Ncfg File']
+                    Nt = self.dSetAttr[mTag]['Nt']
+                    self.initStatistics(mTag)
+
+                    # Momenta with an up-to-date cache store are not parsed again
+                    if self.cacheDir is not None:
+                        storeTag = 'c2pt_%s'%(tags.momH5(mom))
+                        rawList = ASCIIcache.readStore(self.cacheDir,storeTag,[f for k,f in fileList[mTag]],
+                                                       Ncfg,[Nt]*len(fileList[mTag]),self.precision)
+                        if rawList is not None:
+                            print('Loaded two-point data for momentum %s from cache store'%(mTag))
+                            for (dkey,fileName),rawData in zip(fileList[mTag],rawList):
+                                self.plainData[mTag][dkey] = ASCIIio.selectConfigurations(rawData,self.cfgSlice)
+                                self.accumulatePlain(mTag,dkey)
+                            continue
+
+                    parsed[mTag] = []
+                    for dkey,fileName in fileList[mTag]:
+                        taskList.append(((mTag,dkey),(fileName,Ncfg,Nt,self.precision,None,self.cfgSlice)))
+
+                reader = PrefetchReader(ASCIIio.readCorrelatorASCII, taskList, self.pipelineQueueSize)
+                for (mTag,dkey),rawData in reader:
+                    self.plainData[mTag][dkey] = rawData
+                    self.accumulatePlain(mTag,dkey)
+                    parsed[mTag].append(rawData)
+                reader.printReport('Two-point')
+                self.plainAccumulated = True
+
+                # The cache store holds all the configurations, so it is not written from a subset of them
+                if self.cacheDir is not None and self.cfgSlice is None:
+                    for mom in self.moms:
+                        mTag = tags.momString(mom)
+                        if mTag in parsed.keys():
+                            storeTag = 'c2pt_%s'%(tags.momH5(mom))
+                            ASCIIcache.writeStore(self.cacheDir,storeTag,[f for k,f in fileList[mTag]],parsed[mTag],self.precision)
+            else:
+                for mom in self.moms:
+                    mTag = tags.momString(mom)
+                    Ncfg = self.dSetAttr[mTag]['Ncfg File']
+                    Nt = self.dSetAttr[mTag]['Nt']
+                    print('Reading two-point data for momentum %s'%(mTag))
+
+                    NtList = [Nt]*len(fileList[mTag])
+                    if self.cacheDir is not None:
+                        storeTag = 'c2pt_%s'%(tags.momH5(mom))
+                        rawList = ASCIIcache.readCorrelatorListCached(self.cacheDir,storeTag,[f for k,f in fileList[mTag]],
+                                                                      Ncfg,NtList,self.precision,cfgSlice=self.cfgSlice)
+                    else:
+                        rawList = ASCIIio.readCorrelatorListASCII([f for k,f in fileList[mTag]],Ncfg,NtList,self.precision,cfgSlice=self.cfgSlice)
+
+                    for (dkey,fileName),rawData in zip(fileList[mTag],rawList):
+                        self.plainData[mTag][dkey] = rawData
+
+            print('Reading two-point data completed.')
         # End getDataASCII() ----------------------------------
 
 
@@ -184,6 +334,13 @@ class TwoPointCorrelator():
 
             inputHDF5 = self.dataInfo['Input Data']['HDF5 File']
             h5_file = h5py.File(inputHDF5,'r')
+            layout = hdf5io.getLayout(h5_file)
+
+            if self.lazy:
+                print('Plain data will be read from HDF5 only when they are accessed')
+
+            # Only the selected configurations are read
+            cfgIdx = self.cfgSlice if self.cfgSlice is not None else slice(None)
 
             for mom in self.moms:
                 mTag = tags.momString(mom)
@@ -191,21 +348,47 @@ class TwoPointCorrelator():
                 t0List = self.dSetAttr[mTag]['t0']
                 Nrows = self.dSetAttr[mTag]['Nrows']
 
-                self.plainData[mTag] = {}
-                for t0 in t0List:
-                    t0Tag = tags.t0(t0)
-                    for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
-                        opTag = tags.src_snk(opPair)
-                        for row in range(1,Nrows+1):
-                            rowTag = tags.row(row)
-                            dkey = (t0,iop,row)
-
-                            # Get the plain data
-                            dset = 'plain/%s/%s/%s/%s/data'%(mh5Tag,t0Tag,opTag,rowTag)
-                            self.plainData[mTag][dkey] = np.array(h5_file[dset])            
+                self.plainData[mTag] = hdf5io.LazyDatasetDict(h5_file) if self.lazy else {}
+                if layout == 'dense':
+                    # Read the plain data of the momentum at once, locate the attributes on the axes
+                    plain_group = 'plain/%s'%(mh5Tag)
+                    plainData = h5_file[plain_group + '/data'] if self.lazy else ASCIIio.selectConfigurations(h5_file[plain_group + '/data'][()],self.cfgSlice)
+                    t0Idx  = hdf5io.axisIndices(hdf5io.readAxis(h5_file,plain_group,'t0'), t0List, 't0')
+                    opIdx  = hdf5io.axisIndices(hdf5io.readAxis(h5_file,plain_group,'op'),
+                                                [tags.src_snk(opPair) for opPair in self.dSetAttr[mTag]['intOpList']], 'op')
+                    rowIdx = hdf5io.axisIndices(hdf5io.readAxis(h5_file,plain_group,'row'), list(range(1,Nrows+1)), 'row')
+
+                    for it0,t0 in enumerate(t0List):
+                        for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
+                            for row in range(1,Nrows+1):
+                                dkey = (t0,iop,row)
+                                if self.lazy:
+                                    self.plainData[mTag].addSource(dkey, plain_group + '/data', (t0Idx[it0],opIdx[iop],rowIdx[row-1],cfgIdx))
+                                else:
+                                    self.plainData[mTag][dkey] = plainData[t0Idx[it0],opIdx[iop],rowIdx[row-1]]
+                else:
+                    for t0 in t0List:
+                        t0Tag = tags.t0(t0)
+                        for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
+                            opTag = tags.src_snk(opPair)
+                            for row in range(1,Nrows+1):
+                                rowTag = tags.row(row)
+                                dkey = (t0,iop,row)
+
+                                # Get the plain data
+                                dset = 'plain/%s/%s/%s/%s/data'%(mh5Tag,t0Tag,opTag,rowTag)
+                                if self.lazy:
+                                    self.plainData[mTag].addSource(dkey, dset, cfgIdx)
+                                else:
+                                    self.plainData[mTag][dkey] = h5_file[dset][cfgIdx]
 
                 print('Reading two-point data for momentum %s completed.'%(mTag))
-            h5_file.close()
+
+            # The lazy containers need the file to remain open
+            if self.lazy:
+                self.h5Input = h5_file
+            else:
+                h5_file.close()
         # End getDataHDF5() ------------------------------------
 
         if self.dataSource == 'ASCII':
@@ -216,6 +399,105 @@ class TwoPointCorrelator():
 
     # End getData() -------------
 
+    # Close the input HDF5 file of lazy plain data, after writeHDF5(). The plain data are not available afterwards
+    # The class may also be used as a context manager, which closes the file on exit
+    def close(self):
+        if self.h5Input is not None:
+            self.h5Input.close()
+            self.h5Input = None
+    #-------------------------------
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+    #-------------------------------
+
+
+    # Prepare the containers of the statistical analysis for a given momentum
+    def initStatistics(self, mTag):
+        t0List = self.dSetAttr[mTag]['t0']
+        Ncfg = self.dSetAttr[mTag]['Ncfg']
+        Nt = self.dSetAttr[mTag]['Nt']
+
+        # Determine the Jackknife sampling number of Bins
+        self.Nbins = jackknife.Nbins(Ncfg,self.binsize)
+
+        # The plain data Bins and Mean
+        self.plainBins[mTag] = {}
+        self.plainMean[mTag] = {}
+
+        # That's the sum that will give the averaged data, and the sum of the JackknifeArrays that will give its bins
+        self.avgSum[mTag] = np.zeros((Ncfg,Nt), dtype=self.complexType)
+        self.avgBinsSum[mTag] = None
+
+        # Sums over Source-Sink operators and rows, for each t0 (for covariant matrix)
+        self.covSum[mTag] = {}
+        for t0 in t0List:
+            self.covSum[mTag][t0] = np.zeros((Ncfg,Nt), dtype=self.floatType)
+
+        # The mean required for the covariant matrix
+        self.covMean[mTag] = {}
+    #-------------------------------
+
+    # Jackknife sampling of a plain dataset, and accumulation of the dataset into the averages
+    def accumulatePlain(self, mTag, dkey):
+        t0 = dkey[0]
+        Nt = self.dSetAttr[mTag]['Nt']
+
+        # Access the dataset only once, lazy containers read it from the file on each access
+        plainData = self.plainData[mTag][dkey]
+
+        # Jackknife sampling on the Plain data, from the bin sums if they are available
+        if mTag in self.plainBinSums.keys():
+            plainJk = jackknife.JackknifeArray(self.plainBinSums[mTag][dkey].real, self.binsize)
+        else:
+            plainJk = jackknife.JackknifeArray.fromSample(plainData.real, self.binsize)
+
+        self.plainBins[mTag][dkey] = np.zeros((self.Nbins,Nt), dtype=self.floatType)
+        self.plainBins[mTag][dkey][:] = plainJk.bins()
+        self.plainMean[mTag][dkey] = jackknife.mean(self.plainBins[mTag][dkey], self.Nbins, Nspl=Nt)
+
+        # Sum over Source-Sink operators, t0's and rows
+        self.avgSum[mTag] += plainData
+        self.avgBinsSum[mTag] = plainJk if self.avgBinsSum[mTag] is None else self.avgBinsSum[mTag] + plainJk
+
+        # Sum over Source-Sink operators and rows
+        self.covSum[mTag][t0] += plainData.real
+    #-------------------------------
+
+    # Jackknife sampling of all the plain datasets of a momentum at once, stacked in a (keys,Ncfg,Nt) array, and accumulation
+    # of the averages as reductions over the stacked dimension. The plain data, bins and mean of each dkey become views into the stacks
+    def accumulatePlainStacked(self, mTag):
+        t0List = self.dSetAttr[mTag]['t0']
+        Nrows = self.dSetAttr[mTag]['Nrows']
+        Nop = self.dSetAttr[mTag]['Nop']
+        Nt = self.dSetAttr[mTag]['Nt']
+
+        dkeyList = [(t0,iop,row) for t0 in t0List for iop in range(Nop) for row in range(1,Nrows+1)]
+        plainStack = np.stack([self.plainData[mTag][dkey] for dkey in dkeyList])
+
+        plainJk = jackknife.JackknifeArray.fromSample(plainStack.real, self.binsize, axis=1) # Bin sums of shape (Nbins,keys,Nt)
+        binsStack = np.zeros((len(dkeyList),self.Nbins,Nt), dtype=self.floatType)
+        binsStack[:] = np.moveaxis(plainJk.bins(), 0, 1)
+        aveStack,errStack = jackknife.meanArray(binsStack, axis=1)
+
+        for i,dkey in enumerate(dkeyList):
+            self.plainData[mTag][dkey] = plainStack[i]
+            self.plainBins[mTag][dkey] = binsStack[i]
+            self.plainMean[mTag][dkey] = (aveStack[i],errStack[i])
+
+        # Sum over Source-Sink operators, t0's and rows
+        self.avgSum[mTag] += prec.compensatedSum(plainStack, axis=0)
+        self.avgBinsSum[mTag] = plainJk.sum(axis=0) if self.avgBinsSum[mTag] is None else self.avgBinsSum[mTag] + plainJk.sum(axis=0)
+
+        # Sum over Source-Sink operators and rows, for each t0
+        covStack = prec.compensatedSum(plainStack.real.reshape((len(t0List),Nop*Nrows) + plainStack.shape[1:]).astype(self.floatType, copy=False),
+                                       axis=1)
+        for it0,t0 in enumerate(t0List):
+            self.covSum[mTag][t0] += covStack[it0]
+    #-------------------------------
 
     def doStatistics(self):
 
@@ -234,52 +516,34 @@ class TwoPointCorrelator():
 
             Navg = Nrows * Nt0 * Nop
 
-            # Determine the Jackknife sampling number of Bins
-            self.Nbins = jackknife.Nbins(Ncfg,self.binsize)
-
-            # The plain data Bins and Mean
-            self.plainBins[mTag] = {}
-            self.plainMean[mTag] = {}
-            
-            # That's the averaged data
-            self.avgData[mTag] = np.zeros((Ncfg,Nt), dtype=np.complex128) 
-
-            # The mean required for the covariant matrix
-            self.covMean[mTag] = {}
-
-            for t0 in t0List:
-                covSum = np.zeros((Ncfg,Nt), dtype=np.float128)
-                for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
-                    for row in range(1,Nrows+1):
-                        dkey = (t0,iop,row)
-
-                        # Jackknife sampling on the Plain data
-                        self.plainBins[mTag][dkey] = np.zeros((self.Nbins,Nt), dtype=np.float128)
-                        for t in range(Nt):
-                            self.plainBins[mTag][dkey][:,t] = jackknife.sampling(self.plainData[mTag][dkey][:,t].real, self.Nbins, self.binsize)
-
-                        self.plainMean[mTag][dkey] = jackknife.mean(self.plainBins[mTag][dkey], self.Nbins, Nspl=Nt)
-
-                        # Sum over Source-Sink operators, t0's and rows
-                        self.avgData[mTag] += self.plainData[mTag][dkey]
-
-                        # Sum over Source-Sink operators and rows
-                        covSum += self.plainData[mTag][dkey].real
+            # The plain data have already been sampled and accumulated if they were read in a pipeline
+            # Lazy data and data with bin sums are sampled one dataset at a time, the rest all at once
+            if not self.plainAccumulated:
+                self.initStatistics(mTag)
+                if self.lazy or mTag in self.plainBinSums.keys():
+                    for t0 in t0List:
+                        for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
+                            for row in range(1,Nrows+1):
+                                dkey = (t0,iop,row)
+                                self.accumulatePlain(mTag,dkey)
+                else:
+                    self.accumulatePlainStacked(mTag)
 
-                # Standard Mean and Error over source-sink operators and rows, for each t0 (for covariant matrix)
-                covAvg = covSum/(Nop*Nrows) # Still a (Ncfg * Nt) array
-                self.covMean[mTag][t0] = (np.mean(covAvg,axis=0),
-                                          np.std(covAvg,axis=0)/np.sqrt(Ncfg)) 
+            # Standard Mean and Error over source-sink operators and rows, for each t0 (for covariant matrix)
+            covAvg = np.stack([self.covSum[mTag][t0] for t0 in t0List]) / (Nop*Nrows) # A (Nt0 * Ncfg * Nt) array
+            covAvgMean = np.mean(covAvg,axis=1)
+            covAvgErr  = np.std(covAvg,axis=1)/np.sqrt(Ncfg)
+            for it0,t0 in enumerate(t0List):
+                self.covMean[mTag][t0] = (covAvgMean[it0],covAvgErr[it0])
 
             # Sum over Source-Sink operators, t0's and rows
-            self.avgData[mTag] = self.avgData[mTag] / Navg
+            self.avgData[mTag] = self.avgSum[mTag] / Navg
 
-            # Jackknife sampling over the averaged data, for each momentum
-            self.avgBins[mTag] = np.zeros((self.Nbins,Nt), dtype=np.float128)
-            for t in range(Nt):
-                self.avgBins[mTag][:,t] = jackknife.sampling(self.avgData[mTag][:,t].real, self.Nbins, self.binsize)
+            # Jackknife sampling is linear, so the averaged data are kept as a JackknifeArray, the average of those of the plain data
+            # The bins are evaluated only when they are needed, e.g. for the effective energy and the ratio
+            self.avgBins[mTag] = self.avgBinsSum[mTag] / Navg
 
-            self.avgMean[mTag] = jackknife.mean(self.avgBins[mTag], self.Nbins, Nspl=Nt)
+            self.avgMean[mTag] = self.avgBins[mTag].mean()
         # End for momentum -------------
 
         # Perform averaging over momentum
@@ -293,8 +557,7 @@ class TwoPointCorrelator():
             Ncfg = self.dSetAttr[mTag]['Ncfg']
             Nt = self.dSetAttr[mTag]['Nt']
 
-            self.data[mTag] = np.zeros((Ncfg,Nt), dtype=np.complex128)
-            self.bins[mTag] = np.zeros((self.Nbins,Nt), dtype=np.float128)
+            self.data[mTag] = np.zeros((Ncfg,Nt), dtype=self.complexType)
             if mom in self.moms and momNeg in self.moms:
                 self.data[mTag] = 0.5 * (self.avgData[mTagPos] + self.avgData[mTagNeg])
                 self.bins[mTag] = 0.5 * (self.avgBins[mTagPos] + self.avgBins[mTagNeg])
@@ -305,70 +568,147 @@ class TwoPointCorrelator():
                 self.data[mTag] = self.avgData[mTagNeg] 
                 self.bins[mTag] = self.avgBins[mTagNeg]
 
-            self.mean[mTag] = jackknife.mean(self.bins[mTag], self.Nbins, Nspl=Nt)
+            self.mean[mTag] = self.bins[mTag].mean()
+
+        # Integrated autocorrelation times of the momentum-averaged data, for all momenta and time slices at once
+        if self.autocorrPolicy['Enable']:
+            mTagList = [tags.momString(mom) for mom in self.momAvg]
+            tauList = autocorr.tauIntList([self.data[mTag].real for mTag in mTagList], S=self.autocorrPolicy['S'])
+            for mTag,tau in zip(mTagList,tauList):
+                self.tauInt[mTag] = tau
+            print('Maximum integrated autocorrelation time of the two-point functions: %.2f'%(np.nanmax([np.nanmax(tau[0],initial=0)
+                                                                                                        for tau in tauList])))
 
         print('Statistical evaluation completed')
     # End doStatistics() -------------
 
     def writeHDF5(self):
-        h5_file = h5py.File(self.dataInfo['HDF5 Output File'],'w')
 
-        for mom in self.moms:
-            mTag = tags.momString(mom)
-            mh5Tag = tags.momH5(mom)
-            t0List = self.dSetAttr[mTag]['t0']
-            Nrows = self.dSetAttr[mTag]['Nrows']
+        def writeTree(h5_file):
 
-            # Write the averaged data
-            avg_group = 'avg/%s'%(mh5Tag)
-            dset_name_data = avg_group + '/data'
-            dset_name_bins = avg_group + '/bins'
-            dset_name_mean = avg_group + '/mean'
+            for mom in self.moms:
+                mTag = tags.momString(mom)
+                mh5Tag = tags.momH5(mom)
+                t0List = self.dSetAttr[mTag]['t0']
+                Nrows = self.dSetAttr[mTag]['Nrows']
 
-            h5_file.create_dataset(dset_name_data, data = self.avgData[mTag])
-            h5_file.create_dataset(dset_name_bins, data = self.avgBins[mTag])
-            h5_file.create_dataset(dset_name_mean, data = self.avgMean[mTag],dtype='f')
+                # Write the averaged data
+                avg_group = 'avg/%s'%(mh5Tag)
+                dset_name_data = avg_group + '/data'
+                dset_name_bins = avg_group + '/bins'
+                dset_name_mean = avg_group + '/mean'
 
-            for t0 in t0List:
-                t0Tag = tags.t0(t0)
+                hdf5io.createDataset(h5_file, dset_name_data, self.avgData[mTag], self.outputPolicy)
+                hdf5io.createDataset(h5_file, dset_name_bins, self.avgBins[mTag].bins(), self.outputPolicy, bins=True)
+                hdf5io.createDataset(h5_file, dset_name_mean, self.avgMean[mTag], self.outputPolicy, dtype='f')
 
-                # Write cov. matrix mean
-                cov_group = 'cov/%s/%s'%(mh5Tag,t0Tag)
-                dset_name_covMean = cov_group + '/mean'
-                h5_file.create_dataset(dset_name_covMean, data = self.covMean[mTag][t0],dtype='f')
+                for t0 in t0List:
+                    t0Tag = tags.t0(t0)
 
-                for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
-                    opTag = tags.src_snk(opPair)
-                    for row in range(1,Nrows+1):
-                        rowTag = tags.row(row)
+                    # Write cov. matrix mean
+                    cov_group = 'cov/%s/%s'%(mh5Tag,t0Tag)
+                    dset_name_covMean = cov_group + '/mean'
+                    hdf5io.createDataset(h5_file, dset_name_covMean, self.covMean[mTag][t0], self.outputPolicy, dtype='f')
 
-                        dkey = (t0,iop,row)
+                    for iop,opPair in enumerate(self.dSetAttr[mTag]['intOpList']):
+                        opTag = tags.src_snk(opPair)
+                        for row in range(1,Nrows+1):
+                            rowTag = tags.row(row)
 
-                        # Write the plain data
-                        plain_group = 'plain/%s/%s/%s/%s'%(mh5Tag,t0Tag,opTag,rowTag)
-                        dset_name_plainData = plain_group + '/data'
-                        dset_name_plainBins = plain_group + '/bins'
-                        dset_name_plainMean = plain_group + '/mean'
+                            dkey = (t0,iop,row)
 
-                        h5_file.create_dataset(dset_name_plainData, data = self.plainData[mTag][dkey])
-                        h5_file.create_dataset(dset_name_plainBins, data = self.plainBins[mTag][dkey])
-                        h5_file.create_dataset(dset_name_plainMean, data = self.plainMean[mTag][dkey],dtype='f')                                
+                            # Write the plain data
+                            plain_group = 'plain/%s/%s/%s/%s'%(mh5Tag,t0Tag,opTag,rowTag)
+                            dset_name_plainData = plain_group + '/data'
+                            dset_name_plainBins = plain_group + '/bins'
+                            dset_name_plainMean = plain_group + '/mean'
 
+                            hdf5io.createDataset(h5_file, dset_name_plainData, self.plainData[mTag][dkey], self.outputPolicy)
+                            hdf5io.createDataset(h5_file, dset_name_plainBins, self.plainBins[mTag][dkey], self.outputPolicy, bins=True)
+                            hdf5io.createDataset(h5_file, dset_name_plainMean, self.plainMean[mTag][dkey], self.outputPolicy, dtype='f')                                
 
-        # Write the momentum-averaged data
-        for mom in self.momAvg:
-            mTag = tags.momString(mom)
-            mh5Tag = tags.momH5(mom)
 
-            momAvg_group = 'momAvg/%s'%(mh5Tag)
-            dset_name_momData = momAvg_group + '/data'
-            dset_name_momBins = momAvg_group + '/bins'
-            dset_name_momMean = momAvg_group + '/mean'
+            # Write the momentum-averaged data
+            for mom in self.momAvg:
+                mTag = tags.momString(mom)
+                mh5Tag = tags.momH5(mom)
+
+                momAvg_group = 'momAvg/%s'%(mh5Tag)
+                dset_name_momData = momAvg_group + '/data'
+                dset_name_momBins = momAvg_group + '/bins'
+                dset_name_momMean = momAvg_group + '/mean'
+
+                hdf5io.createDataset(h5_file, dset_name_momData, self.data[mTag], self.outputPolicy)
+                hdf5io.createDataset(h5_file, dset_name_momBins, self.bins[mTag].bins(), self.outputPolicy, bins=True)
+                hdf5io.createDataset(h5_file, dset_name_momMean, self.mean[mTag], self.outputPolicy, dtype='f')
+                if mTag in self.tauInt.keys():
+                    hdf5io.createDataset(h5_file, momAvg_group + '/tauInt', self.tauInt[mTag], self.outputPolicy, dtype='f')
+            #--------------------------------
+        # End writeTree() -------------
+
+        def writeDense(h5_file):
+            for mom in self.moms:
+                mTag = tags.momString(mom)
+                mh5Tag = tags.momH5(mom)
+                t0List = self.dSetAttr[mTag]['t0']
+                Nrows = self.dSetAttr[mTag]['Nrows']
+                Nop = self.dSetAttr[mTag]['Nop']
+
+                # The attributes of the plain data are the axes of the dense datasets
+                keyAxes = [t0List, list(range(Nop)), list(range(1,Nrows+1))]
+                axisNames = ['t0','op','row']
+
+                # Write the plain data
+                plain_group = 'plain/%s'%(mh5Tag)
+                hdf5io.writeAxes(h5_file, plain_group, {'t0' : t0List,
+                                                        'op' : [tags.src_snk(opPair) for opPair in self.dSetAttr[mTag]['intOpList']],
+                                                        'row': list(range(1,Nrows+1))})
+
+                plainData = hdf5io.stackDense(lambda t0,iop,row: self.plainData[mTag][(t0,iop,row)], keyAxes)
+                plainBins = hdf5io.stackDense(lambda t0,iop,row: self.plainBins[mTag][(t0,iop,row)], keyAxes)
+                plainMean = hdf5io.stackDense(lambda t0,iop,row: self.plainMean[mTag][(t0,iop,row)], keyAxes)
+                hdf5io.writeDense(h5_file, plain_group + '/data', plainData, axisNames + ['cfg','t'], policy=self.outputPolicy)
+                hdf5io.writeDense(h5_file, plain_group + '/bins', plainBins, axisNames + ['bin','t'], policy=self.outputPolicy, bins=True)
+                hdf5io.writeDense(h5_file, plain_group + '/mean', plainMean, axisNames + ['mean-err','t'], dtype='f', policy=self.outputPolicy)
+
+                # Write the averaged data
+                avg_group = 'avg/%s'%(mh5Tag)
+                hdf5io.writeDense(h5_file, avg_group + '/data', self.avgData[mTag], ['cfg','t'], policy=self.outputPolicy)
+                hdf5io.writeDense(h5_file, avg_group + '/bins', self.avgBins[mTag].bins(), ['bin','t'], policy=self.outputPolicy, bins=True)
+                hdf5io.writeDense(h5_file, avg_group + '/mean', np.array(self.avgMean[mTag]), ['mean-err','t'], dtype='f', policy=self.outputPolicy)
+
+                # Write cov. matrix mean
+                cov_group = 'cov/%s'%(mh5Tag)
+                hdf5io.writeAxes(h5_file, cov_group, {'t0': t0List})
+                covMean = hdf5io.stackDense(lambda t0: self.covMean[mTag][t0], [t0List])
+                hdf5io.writeDense(h5_file, cov_group + '/mean', covMean, ['t0','mean-err','t'], dtype='f', policy=self.outputPolicy)
+
+            # Write the momentum-averaged data
+            for mom in self.momAvg:
+                mTag = tags.momString(mom)
+                mh5Tag = tags.momH5(mom)
+
+                momAvg_group = 'momAvg/%s'%(mh5Tag)
+                hdf5io.writeDense(h5_file, momAvg_group + '/data', self.data[mTag], ['cfg','t'], policy=self.outputPolicy)
+                hdf5io.writeDense(h5_file, momAvg_group + '/bins', self.bins[mTag].bins(), ['bin','t'], policy=self.outputPolicy, bins=True)
+                hdf5io.writeDense(h5_file, momAvg_group + '/mean', np.array(self.mean[mTag]), ['mean-err','t'], dtype='f', policy=self.outputPolicy)
+                if mTag in self.tauInt.keys():
+                    hdf5io.writeDense(h5_file, momAvg_group + '/tauInt', np.array(self.tauInt[mTag]), ['tauInt-err','t'], dtype='f',
+                                      policy=self.outputPolicy)
+        # End writeDense() -------------
+
+        # The lazy plain data are read from the input file while they are written, so it cannot be overwritten
+        if self.h5Input is not None and os.path.realpath(self.dataInfo['HDF5 Output File']) == os.path.realpath(self.h5Input.filename):
+            raise ValueError('\n"HDF5 Output File" %s is the input file of the lazy plain data, write to a different file'%(
+                self.dataInfo['HDF5 Output File']))
+
+        h5_file = h5py.File(self.dataInfo['HDF5 Output File'],'w')
+        hdf5io.setLayout(h5_file, self.outputLayout)
 
-            h5_file.create_dataset(dset_name_momData, data = self.data[mTag])
-            h5_file.create_dataset(dset_name_momBins, data = self.bins[mTag])
-            h5_file.create_dataset(dset_name_momMean, data = self.mean[mTag],dtype='f')
-        #--------------------------------
+        if self.outputLayout == 'tree':
+            writeTree(h5_file)
+        elif self.outputLayout == 'dense':
+            writeDense(h5_file)
 
         h5_file.close()
         print('Two-point function data written in HDF5.')
@@ -0,0 +1,86 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+Read two- and three-point correlation functions and evaluate the Jackknife error of the averaged data for a list of binsizes,
+in a single pass over the configurations. The error-vs-binsize curves are written in HDF5, and a summary is printed for the
+two-point functions, used to choose the "Binsize" of the analysis
+'''
+
+import sys, os
+import optparse
+import numpy as np
+
+# Add package path to sys.path. This allows us to run this tests script from any directory, without import issues
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(file_path+'/../')
+fileName = __file__.split('/')[-1]
+
+# Import local modules
+import pymela.io.json_io as JSONio
+import pymela.io.io_conventions as ioConv
+import pymela.tools.tag_creators as tags
+from pymela.twopointcorr import TwoPointCorrelator
+from pymela.threepointcorr import ThreePointCorrelator
+from pymela.binsize_scan import BinsizeScan
+
+runType = 'Binsize Scan'
+
+# Avoid writing the compiled files
+sys.dont_write_bytecode = True
+
+
+# Parse command line options
+usage = "usage: %prog [options] "
+opt_parser = optparse.OptionParser(usage)
+
+opt_parser.add_option("-i", "--input_file", type="string", default='',
+                      help='Input file in JSON format')
+
+(options, args) = opt_parser.parse_args()
+
+input_file=options.input_file
+if input_file == '':
+    raise ValueError('--input_file option must be set')
+
+
+# Parse and print out the input file
+ioDict = JSONio.parse(input_file)
+JSONio.dumpDictObject(ioDict,'\n%s - Got the following Input:' %(fileName))
+
+# Make cheks on Input data
+JSONio.makeInputChecks(runType, ioDict)
+
+c2pt_dataInfo = ioDict[ioConv.c2ptDataInfoTag]
+c3pt_dataInfo = ioDict[ioConv.c3ptDataInfoTag]
+analysisInfo  = ioDict[ioConv.analysisInfoTag]
+scanInfo      = ioDict[ioConv.binsizeScanInfoTag]
+
+
+# Two- and three-point correlator analysis
+c2pt = TwoPointCorrelator(dataInfo = c2pt_dataInfo, analysisInfo = analysisInfo)
+c2pt.getData()
+c2pt.doStatistics()
+c2pt.close() # Releases the input file of lazy plain data
+
+c3pt = ThreePointCorrelator(dataInfo = c3pt_dataInfo, analysisInfo = analysisInfo)
+c3pt.getData()
+c3pt.doStatistics()
+c3pt.close()
+#-----------------------------------------------
+
+
+# Binsize scan of the averaged data
+scan = BinsizeScan(c2pt, c3pt, scanInfo, analysisInfo)
+scan.compute()
+scan.writeHDF5()
+
+# The error of each binsize relative to the one of the smallest binsize, averaged over the time slices
+# The error grows with the binsize while the bins are autocorrelated, and levels off once they are not
+print('\nTwo-point function error relative to the smallest binsize:')
+for mom in c2pt.moms:
+    mTag = tags.momString(mom)
+    ave,err = scan.mean2pt[mTag]
+    ratio = np.mean(err / err[0], axis=1)
+    print('  mom = %s: '%(mTag) + ', '.join(['%d: %.3f'%(binsize,r) for binsize,r in zip(scan.binsizes2pt[mTag],ratio)]))
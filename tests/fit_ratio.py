@@ -66,6 +66,7 @@ c2pt.doStatistics()
 # Write the output in HDF5 format
 if c2pt_dataInfo['Write HDF5 Output']:
     c2pt.writeHDF5()
+c2pt.close() # Releases the input file of lazy plain data
 #------------------------------------------------
 
 # Read the three-point functions, perform statistical/Jackknife analysis
@@ -77,6 +78,7 @@ c3pt.doStatistics()
 # Write the output in HDF5 format
 if c3pt_dataInfo['Write HDF5 Output']:
    c3pt.writeHDF5()
+c3pt.close()
 #------------------------------------------------
 
 # Define and evaluate the three- to two-point function ratios
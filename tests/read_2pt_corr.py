@@ -64,3 +64,4 @@ c2pt.doStatistics()
 # Write the output in HDF5 format
 if c2pt_dataInfo['Write HDF5 Output']:
     c2pt.writeHDF5()
+c2pt.close() # Releases the input file of lazy plain data
@@ -64,3 +64,4 @@ c3pt.doStatistics()
 # Write the output in HDF5 format
 if c3pt_dataInfo['Write HDF5 Output']:
    c3pt.writeHDF5()
+c3pt.close() # Releases the input file of lazy plain data
@@ -0,0 +1,105 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+Regression test for the Jackknife bins of the averaged data, which are derived from the bins of the data they are averaged from.
+The averaged two- and three-point data are sampled again here, and the test fails if the resampled bins deviate from the derived
+ones by more than the tolerance, relative to the largest bin of each level
+'''
+
+import sys, os
+import optparse
+import numpy as np
+
+# Add package path to sys.path. This allows us to run this tests script from any directory, without import issues
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(file_path+'/../')
+fileName = __file__.split('/')[-1]
+
+# Import local modules
+import pymela.io.json_io as JSONio
+import pymela.io.io_conventions as ioConv
+import pymela.tools.jackknife as jackknife
+import pymela.tools.precision as prec
+from pymela.twopointcorr import TwoPointCorrelator
+from pymela.threepointcorr import ThreePointCorrelator
+
+
+runType = 'Compute ratio'
+
+# Avoid writing the compiled files
+sys.dont_write_bytecode = True
+
+
+# Parse command line options
+usage = "usage: %prog [options] "
+opt_parser = optparse.OptionParser(usage)
+
+opt_parser.add_option("-i", "--input_file", type="string", default='',
+                      help='Input file in JSON format')
+opt_parser.add_option("-t", "--tolerance", type="float", default=1.0e-12,
+                      help='Maximum deviation of the derived bins, relative to the largest bin of each level [default: %default]')
+
+(options, args) = opt_parser.parse_args()
+
+input_file=options.input_file
+if input_file == '':
+    raise ValueError('--input_file option must be set')
+
+
+# Parse the input file
+ioDict = JSONio.parse(input_file)
+
+# Make cheks on Input data
+JSONio.makeInputChecks(runType, ioDict)
+
+c2pt_dataInfo = ioDict[ioConv.c2ptDataInfoTag]
+c3pt_dataInfo = ioDict[ioConv.c3ptDataInfoTag]
+analysisInfo  = ioDict[ioConv.analysisInfoTag]
+
+c2pt = TwoPointCorrelator(dataInfo = c2pt_dataInfo, analysisInfo = analysisInfo)
+c2pt.getData()
+c2pt.doStatistics()
+c2pt.close() # Releases the input file of lazy plain data
+
+c3pt = ThreePointCorrelator(dataInfo = c3pt_dataInfo, analysisInfo = analysisInfo)
+c3pt.getData()
+c3pt.doStatistics()
+c3pt.close()
+
+
+# The largest absolute value of the bins, held in nested dicts
+def largestBin(bins):
+    if isinstance(bins, dict):
+        return max([largestBin(b) for b in bins.values()])
+    return float(np.max(np.abs(jackknife.toBins(bins))))
+#------------------------------------------------
+
+# The derived bins of each level, and the bins of the data of the level sampled again
+levels = {}
+levels['Two-point averaged'] = (c2pt.avgBins, {mTag: jackknife.samplingArray(c2pt.avgData[mTag].real, c2pt.binsize)
+                                               for mTag in c2pt.avgBins.keys()})
+levels['Two-point mom-averaged'] = (c2pt.bins, {mTag: jackknife.samplingArray(c2pt.data[mTag].real, c2pt.binsize)
+                                                for mTag in c2pt.bins.keys()})
+for ri in c3pt.RI:
+    levels['Three-point averaged %s'%(ri)] = (c3pt.avgBins[ri], {mTag: {dkey: jackknife.samplingArray(data, c3pt.binsize)
+                                                                        for dkey,data in c3pt.avgData[ri][mTag].items()}
+                                                                 for mTag in c3pt.avgBins[ri].keys()})
+    levels['Three-point mom-averaged %s'%(ri)] = (c3pt.bins[ri], {mTag: {dkey: jackknife.samplingArray(data, c3pt.binsize)
+                                                                         for dkey,data in c3pt.data[ri][mTag].items()}
+                                                                  for mTag in c3pt.bins[ri].keys()})
+
+print('\n%s: Deviation of the resampled bins from the derived ones, with tolerance %.1e'%(fileName,options.tolerance))
+print('%-30s %14s %14s %14s'%('Level','Absolute','Relative','Largest bin'))
+failed = []
+for level,(derived,resampled) in levels.items():
+    absDev,relDev = prec.maxDeviation(derived, resampled)
+    binScale = largestBin(derived)
+    print('%-30s %14.3e %14.3e %14.3e'%(level,absDev,relDev,binScale))
+    if absDev > options.tolerance * binScale:
+        failed.append(level)
+
+if len(failed) > 0:
+    raise ValueError('\nDerived bins deviate from the resampled ones beyond the tolerance for: %s'%(failed))
+print('%s: All derived bins agree with the resampled ones'%(fileName))
@@ -0,0 +1,111 @@
+'''
+Created on Oct.17, 2026
+@author: Christos Kallidonis
+Copyright (C) 2020. All rights reserved.
+
+Validation of the "double" precision policy against the "extended" one. The two- and three-point functions, ratios and fits
+are evaluated in both precisions, and the maximum deviation of the double-precision results is reported for each stage
+'''
+
+import sys, os
+import copy
+import optparse
+
+# Add package path to sys.path. This allows us to run this tests script from any directory, without import issues
+file_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(file_path+'/../')
+fileName = __file__.split('/')[-1]
+
+# Import local modules
+import pymela.io.json_io as JSONio
+import pymela.io.io_conventions as ioConv
+import pymela.tools.precision as prec
+from pymela.twopointcorr import TwoPointCorrelator
+from pymela.threepointcorr import ThreePointCorrelator
+from pymela.ratio import ThreeToTwoPointCorrRatio
+from pymela.plateau_fit import PlateauFit
+from pymela.summation_fit import SummationFit
+
+
+runType = 'Compute rITD'
+
+# Avoid writing the compiled files
+sys.dont_write_bytecode = True
+
+
+# Parse command line options
+usage = "usage: %prog [options] "
+opt_parser = optparse.OptionParser(usage)
+
+opt_parser.add_option("-i", "--input_file", type="string", default='',
+                      help='Input file in JSON format')
+
+(options, args) = opt_parser.parse_args()
+
+input_file=options.input_file
+if input_file == '':
+    raise ValueError('--input_file option must be set')
+
+
+# Parse the input file
+ioDict = JSONio.parse(input_file)
+
+# Make cheks on Input data
+JSONio.makeInputChecks(runType, ioDict)
+
+c2pt_dataInfo = ioDict[ioConv.c2ptDataInfoTag]
+c3pt_dataInfo = ioDict[ioConv.c3ptDataInfoTag]
+ratioInfo     = ioDict[ioConv.ratioInfoTag]
+ratioFitInfo  = ioDict[ioConv.ratioFitInfoTag]
+
+
+# Run the analysis in the given precision, return the results of each stage
+def runAnalysis(precision):
+    analysisInfo = copy.deepcopy(ioDict[ioConv.analysisInfoTag])
+    analysisInfo['Precision'] = precision
+    print('\n%s: Running the analysis in %s precision'%(fileName,precision))
+
+    results = {}
+
+    c2pt = TwoPointCorrelator(dataInfo = c2pt_dataInfo, analysisInfo = analysisInfo)
+    c2pt.getData()
+    c2pt.doStatistics()
+    c2pt.close() # Releases the input file of lazy plain data
+    results['Two-point bins'] = c2pt.bins
+    results['Two-point mean'] = c2pt.mean
+
+    c3pt = ThreePointCorrelator(dataInfo = c3pt_dataInfo, analysisInfo = analysisInfo)
+    c3pt.getData()
+    c3pt.doStatistics()
+    c3pt.close()
+    results['Three-point bins'] = c3pt.bins
+    results['Three-point mean'] = c3pt.mean
+
+    ratio = ThreeToTwoPointCorrRatio(c2pt = c2pt, c3pt = c3pt, dataInfo = ratioInfo, analysisInfo = analysisInfo)
+    ratio.evaluate()
+    results['Ratio bins'] = ratio.bins
+    results['Ratio mean'] = ratio.mean
+
+    if 'Plateau' in ratioFitInfo:
+        plat = PlateauFit(ratio=ratio, ratioType='plain', fitInfo = ratioFitInfo['Plateau'], analysisInfo = analysisInfo)
+        plat.performFits()
+        results['Plateau fit bins'] = plat.Mbins
+        results['Plateau fit mean'] = plat.Mmean
+
+    if 'Summation' in ratioFitInfo:
+        summ = SummationFit(ratio=ratio, ratioType='sum', fitInfo = ratioFitInfo['Summation'], analysisInfo = analysisInfo)
+        summ.performFits()
+        results['Summation fit bins'] = summ.bins
+        results['Summation fit mean'] = summ.mean
+
+    return results
+#------------------------------------------------
+
+extended = runAnalysis('extended')
+double   = runAnalysis('double')
+
+print('\n%s: Maximum deviation of the double-precision results from the extended-precision ones'%(fileName))
+print('%-20s %14s %14s'%('Stage','Absolute','Relative'))
+for stage in extended.keys():
+    absDev,relDev = prec.maxDeviation(extended[stage], double[stage])
+    print('%-20s %14.3e %14.3e'%(stage,absDev,relDev))